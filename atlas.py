@@ -0,0 +1,277 @@
+''' precompute every trackbar setup of one room into .npy files:
+    python atlas.py OUT_DIR ROOM_WIDTH ROOM_HEIGHT [--hdeg-step 5] [--width-step 50] ...
+
+    distances.npy            (face_vdeg, height, 4) cal_theorical_min_max_distance()
+    person_distances.npy     (face_vdeg, height, p_height, 4) cal_min_max_distance_with_human_height()
+    footprint_vertices.npy   (face_vdeg, face_hdeg, height, width, FOOTPRINT_CAPACITY, 2) nan padded
+    footprint_counts.npy     (face_vdeg, face_hdeg, height, width) number of vertices
+    footprint_areas.npy      (face_vdeg, face_hdeg, height, width) area in m^2
+    atlas.json               room, FOV and axes
+
+    The distances use inf for 'Inf' and nan for 'Invalid' like fov_batch.py.
+    FovAtlas opens the files with np.load(mmap_mode='r'), so processes share the pages.
+'''
+import argparse
+import json
+import os
+import numpy as np
+
+from clipping import clip_convex_polygon_batch
+from fov_batch import cal_min_max_distance_with_human_height_batch
+from fov_batch import cal_theorical_min_max_distance_batch
+from fov_batch import get_rotate_polygon_batch
+from fov_batch import to_scalar_distance
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import get_room_polygon
+
+## Constants ##
+
+# (start, stop, step) of the trackbar axes, stop included
+FACE_VDEG_AXIS = (0, 90, 1)
+FACE_HDEG_AXIS = (0, 180, 5)
+# CamLoc_H 0 divides by zero in cal_min_max_distance_with_human_height(), the axis starts at the first step
+HEIGHT_AXIS = (10, 300, 10)
+P_HEIGHT_AXIS = (0, 200, 1)
+# CamLoc_W goes up to the room width in cm, only the step is fixed
+WIDTH_STEP = 50
+
+# a rotated trapezoid clipped by the room rectangle has at most 8 vertices
+FOOTPRINT_CAPACITY = 8
+
+# refuse to write an atlas larger than this, use bigger steps instead
+MAX_ATLAS_BYTES = 1 << 30
+
+# number of footprints clipped together
+BUILD_CHUNK_SIZE = 65536
+
+ATLAS_META_FILE = 'atlas.json'
+
+
+## functions ##
+def get_axis_values(axis):
+    ''' get the values of a (start, stop, step) axis, stop included '''
+    start, stop, step = axis
+    return np.arange(start, stop + 1, step)
+
+
+def get_atlas_shapes(face_vdeg_axis, face_hdeg_axis, height_axis, width_axis, p_height_axis):
+    ''' get the array shapes of an atlas.
+
+    Returns:
+        shapes (dict): file name -> (shape, dtype)
+
+    '''
+
+    n_vdeg, n_hdeg, n_height, n_width, n_p_height = (len(get_axis_values(a)) for a in
+        (face_vdeg_axis, face_hdeg_axis, height_axis, width_axis, p_height_axis))
+    footprint_shape = (n_vdeg, n_hdeg, n_height, n_width)
+    return {
+        'distances.npy': ((n_vdeg, n_height, 4), np.float64),
+        'person_distances.npy': ((n_vdeg, n_height, n_p_height, 4), np.float64),
+        'footprint_vertices.npy': (footprint_shape + (FOOTPRINT_CAPACITY, 2), np.float64),
+        'footprint_counts.npy': (footprint_shape, np.int8),
+        'footprint_areas.npy': (footprint_shape, np.float64),
+    }
+
+
+def get_atlas_bytes(shapes):
+    return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for shape, dtype in shapes.values())
+
+
+def build_atlas(directory, room_width, room_height, hfov=HFOV, vfov=VFOV,
+                face_vdeg_axis=FACE_VDEG_AXIS, face_hdeg_axis=FACE_HDEG_AXIS, height_axis=HEIGHT_AXIS,
+                width_axis=None, p_height_axis=P_HEIGHT_AXIS, max_bytes=MAX_ATLAS_BYTES):
+    ''' precompute the distances and the footprints of every setup on the axes into directory.
+
+    Args:
+        directory (str): output directory, created if missing
+        room_width (float): the room width in m
+        room_height (float): the room height in m
+        hfov (float): camera horizontal FOV in degree
+        vfov (float): camera vertical FOV in degree
+        face_vdeg_axis, face_hdeg_axis, height_axis, width_axis, p_height_axis (tuple):
+            (start, stop, step) of CamFacVDeg, CamFacHDeg, CamLoc_H, CamLoc_W and Person_H.
+            width_axis defaults to (0, room width in cm, WIDTH_STEP)
+        max_bytes (int): raise ValueError instead of writing more than this
+
+    Returns:
+        meta (dict): the content of atlas.json
+
+    '''
+
+    if width_axis is None:
+        width_axis = (0, int(room_width*100), WIDTH_STEP)
+    if height_axis[0] <= 0:
+        raise ValueError(f'height_axis starts at {height_axis[0]} cm, the person distances divide by the height')
+    axes = {
+        'face_vdeg': tuple(face_vdeg_axis),
+        'face_hdeg': tuple(face_hdeg_axis),
+        'height': tuple(height_axis),
+        'width': tuple(width_axis),
+        'p_height': tuple(p_height_axis),
+    }
+    shapes = get_atlas_shapes(axes['face_vdeg'], axes['face_hdeg'], axes['height'], axes['width'], axes['p_height'])
+    n_bytes = get_atlas_bytes(shapes)
+    if n_bytes > max_bytes:
+        raise ValueError(f'atlas needs {n_bytes/2**20:.0f} MiB, more than max_bytes ({max_bytes/2**20:.0f} MiB). '
+                         'Use bigger axis steps or raise max_bytes.')
+
+    half_hfov = hfov/2
+    half_vfov = vfov/2
+    vdeg_values, hdeg_values, height_values, width_values, p_height_values = (
+        get_axis_values(axes[name]) for name in ('face_vdeg', 'face_hdeg', 'height', 'width', 'p_height'))
+
+    os.makedirs(directory, exist_ok=True)
+    arrays = {name: np.lib.format.open_memmap(os.path.join(directory, name), mode='w+', dtype=dtype, shape=shape)
+              for name, (shape, dtype) in shapes.items()}
+
+    # distances only depend on (face_vdeg, height)
+    distances = cal_theorical_min_max_distance_batch(vdeg_values[:, None], height_values[None, :], half_vfov, half_hfov)
+    arrays['distances.npy'][...] = np.stack(distances, axis=-1)
+
+    room_polygon = get_room_polygon(room_width, room_height)
+    hdeg_chunk = max(1, BUILD_CHUNK_SIZE // (len(height_values) * len(width_values)))
+
+    for i in range(len(vdeg_values)):
+        # human height adjustment (height, p_height)
+        person_distances = cal_min_max_distance_with_human_height_batch(
+            p_height_values[None, :], height_values[:, None], distances[0][i][:, None], distances[1][i][:, None],
+            vdeg_values[i], half_vfov, half_hfov)
+        arrays['person_distances.npy'][i] = np.stack(person_distances, axis=-1)
+
+        # footprint (face_hdeg, height, width)
+        row_distances = [d[i][None, :, None] for d in distances]
+        for start in range(0, len(hdeg_values), hdeg_chunk):
+            stop = min(start + hdeg_chunk, len(hdeg_values))
+            rotate_polygon = get_rotate_polygon_batch(
+                (width_values / 100)[None, None, :], room_height, hdeg_values[start:stop, None, None],
+                height_values[None, :, None], half_hfov, *row_distances)
+            vertices, counts, areas = clip_convex_polygon_batch(rotate_polygon, room_polygon, FOOTPRINT_CAPACITY)
+            arrays['footprint_vertices.npy'][i, start:stop] = vertices
+            arrays['footprint_counts.npy'][i, start:stop] = counts
+            arrays['footprint_areas.npy'][i, start:stop] = areas
+
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    meta = {
+        'room_width': room_width,
+        'room_height': room_height,
+        'hfov': hfov,
+        'vfov': vfov,
+        'axes': axes,
+        'footprint_capacity': FOOTPRINT_CAPACITY,
+    }
+    with open(os.path.join(directory, ATLAS_META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class FovAtlas:
+    ''' read only lookups into an atlas written by build_atlas(), no trigonometry at runtime.
+        Setups that are not on the atlas grid return None, the caller calculates them.
+
+        atlas = FovAtlas('atlas_10x10')
+        distances = atlas.get_distances(45, 250)
+        visible_polygon = atlas.get_footprint(45, 90, 250, 500)
+
+    '''
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, ATLAS_META_FILE)) as f:
+            meta = json.load(f)
+        self.room_width = meta['room_width']
+        self.room_height = meta['room_height']
+        self.hfov = meta['hfov']
+        self.vfov = meta['vfov']
+        self.axes = {name: tuple(axis) for name, axis in meta['axes'].items()}
+
+        # memory mapped, the pages are only read when a setup is looked up
+        self.distances = np.load(os.path.join(directory, 'distances.npy'), mmap_mode='r')
+        self.person_distances = np.load(os.path.join(directory, 'person_distances.npy'), mmap_mode='r')
+        self.footprint_vertices = np.load(os.path.join(directory, 'footprint_vertices.npy'), mmap_mode='r')
+        self.footprint_counts = np.load(os.path.join(directory, 'footprint_counts.npy'), mmap_mode='r')
+        self.footprint_areas = np.load(os.path.join(directory, 'footprint_areas.npy'), mmap_mode='r')
+
+    def _index(self, name, value):
+        start, stop, step = self.axes[name]
+        if value < start or value > stop or (value - start) % step:
+            return None
+        return int((value - start) // step)
+
+    def _indices(self, **values):
+        indices = tuple(self._index(name, value) for name, value in values.items())
+        return None if None in indices else indices
+
+    def _min_cant_measure(self, face_vdeg):
+        # cal_theorical_min_max_distance() returns the int 0 as min vertical distance, it is stored as 0.0
+        half_vfov = self.vfov/2
+        return face_vdeg > half_vfov and face_vdeg + half_vfov > 90
+
+    def get_distances(self, face_vdeg, height):
+        ''' cal_theorical_min_max_distance() of a setup on the grid, None if it is not on the grid '''
+        indices = self._indices(face_vdeg=face_vdeg, height=height)
+        if indices is None:
+            return None
+        distances = [to_scalar_distance(d) for d in self.distances[indices]]
+        if self._min_cant_measure(face_vdeg):
+            distances[0] = 0
+        return tuple(distances)
+
+    def get_person_distances(self, face_vdeg, height, p_height):
+        ''' cal_min_max_distance_with_human_height() of a setup on the grid, None if it is not on the grid '''
+        indices = self._indices(face_vdeg=face_vdeg, height=height, p_height=p_height)
+        if indices is None:
+            return None
+        distances = [to_scalar_distance(d) for d in self.person_distances[indices]]
+        # a camera higher than the person keeps the min vertical distance
+        if p_height < height and self._min_cant_measure(face_vdeg) and distances[0] == 0:
+            distances[0] = 0
+        return tuple(distances)
+
+    def get_footprint(self, face_vdeg, face_hdeg, height, width):
+        ''' the visible polygon ([[x,y],...] in m) of a setup on the grid, None if it is not on the grid '''
+        indices = self._indices(face_vdeg=face_vdeg, face_hdeg=face_hdeg, height=height, width=width)
+        if indices is None:
+            return None
+        count = int(self.footprint_counts[indices])
+        return self.footprint_vertices[indices][:count].tolist()
+
+    def get_footprint_area(self, face_vdeg, face_hdeg, height, width):
+        ''' the visible area in m^2 of a setup on the grid, None if it is not on the grid '''
+        indices = self._indices(face_vdeg=face_vdeg, face_hdeg=face_hdeg, height=height, width=width)
+        if indices is None:
+            return None
+        return float(self.footprint_areas[indices])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='precompute the FOV atlas of one room')
+    parser.add_argument('directory')
+    parser.add_argument('room_width', type=float, help='m')
+    parser.add_argument('room_height', type=float, help='m')
+    parser.add_argument('--hfov', type=float, default=HFOV)
+    parser.add_argument('--vfov', type=float, default=VFOV)
+    parser.add_argument('--vdeg-step', type=int, default=FACE_VDEG_AXIS[2])
+    parser.add_argument('--hdeg-step', type=int, default=FACE_HDEG_AXIS[2])
+    parser.add_argument('--height-step', type=int, default=HEIGHT_AXIS[2])
+    parser.add_argument('--width-step', type=int, default=WIDTH_STEP)
+    parser.add_argument('--p-height-step', type=int, default=P_HEIGHT_AXIS[2])
+    parser.add_argument('--max-mb', type=float, default=MAX_ATLAS_BYTES / 2**20)
+    args = parser.parse_args()
+
+    meta = build_atlas(
+        args.directory,
+        args.room_width,
+        args.room_height,
+        args.hfov,
+        args.vfov,
+        face_vdeg_axis=FACE_VDEG_AXIS[:2] + (args.vdeg_step,),
+        face_hdeg_axis=FACE_HDEG_AXIS[:2] + (args.hdeg_step,),
+        height_axis=(args.height_step, HEIGHT_AXIS[1], args.height_step),
+        width_axis=(0, int(args.room_width*100), args.width_step),
+        p_height_axis=P_HEIGHT_AXIS[:2] + (args.p_height_step,),
+        max_bytes=int(args.max_mb * 2**20))
+    print(f'atlas written to {args.directory}: {meta["axes"]}')
@@ -0,0 +1,250 @@
+''' calculate the distances and footprints of every row of a CSV / JSONL file:
+    python batch_cli.py INPUT OUTPUT [--processes N] [--chunk-size 10000]
+
+    INPUT / OUTPUT are .csv or .jsonl files, '-' for stdin / stdout (use --input-format / --output-format).
+    Input columns (keys), same units as the GUI:
+        room_width, room_height   m
+        face_vdeg, face_hdeg      degree (CamFacVDeg, CamFacHDeg)
+        height, width, p_height   cm (CamLoc_H, CamLoc_W, Person_H)
+        hfov, vfov                degree, optional (default HFOV, VFOV)
+        model                     optional, a camera model id of cameras.json, its effective FOV is the default hfov, vfov
+        id                        optional, copied to the output
+    Output columns: id, the 8 distances ('Inf', 'Invalid' as in the GUI), footprint ([[x,y],...] JSON) and area (m^2),
+    error when the row could not be read. The rows are written in input order while the chunks run in a process pool,
+    only a few chunks are held in memory at a time.
+'''
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from math import inf
+
+import numpy as np
+
+from clipping import clip_convex_polygon
+from clipping import clip_convex_polygon_batch
+from camera_catalog import get_fov
+from clipping import polygon_signed_area
+from fov_batch import cal_distances_batch
+from fov_batch import get_rotate_polygon_batch
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import get_room_polygon
+
+## Constants ##
+
+INPUT_COLUMNS = ('room_width', 'room_height', 'face_vdeg', 'face_hdeg', 'height', 'width', 'p_height')
+DISTANCE_COLUMNS = (
+    'min_v_distance', 'max_v_distance', 'min_h_distance', 'max_h_distance',
+    'min_v_distance_person', 'max_v_distance_person', 'min_h_distance_person', 'max_h_distance_person')
+OUTPUT_COLUMNS = ('id',) + DISTANCE_COLUMNS + ('footprint', 'area', 'error')
+
+DEFAULT_CHUNK_SIZE = 10000
+# chunks submitted but not written yet, per worker process
+IN_FLIGHT_PER_PROCESS = 2
+
+# rooms with fewer rows than this in a chunk are clipped one row at a time
+MIN_BATCH_ROOM_ROWS = 8
+
+
+## functions ##
+def _get_row_fov(row):
+    # (hfov, vfov) of a row: its own, else the ones of its camera model, else HFOV / VFOV
+    hfov, vfov = get_fov(row['model']) if row.get('model') else (HFOV, VFOV)
+    return float(row.get('hfov') or hfov), float(row.get('vfov') or vfov)
+
+
+def _parse_rows(rows):
+    # rows are dicts of strings (CSV) or values (JSONL), bad rows get an error instead of values
+    values = np.full((len(rows), len(INPUT_COLUMNS) + 2), np.nan)
+    errors = [None] * len(rows)
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[i] = f'not a row: {row!r:.100}'
+            continue
+        try:
+            values[i, :len(INPUT_COLUMNS)] = [float(row[c]) for c in INPUT_COLUMNS]
+            values[i, -2:] = _get_row_fov(row)
+        except (KeyError, TypeError, ValueError) as e:
+            errors[i] = f'{type(e).__name__}: {e}'
+    return values, errors
+
+
+def _to_scalar_distances(distance):
+    return [('Invalid' if d != d else 'Inf' if d == inf else d) for d in distance.tolist()]
+
+
+def process_rows(rows):
+    ''' calculate one chunk of rows.
+
+    Args:
+        rows (list): dicts with the INPUT_COLUMNS keys
+
+    Returns:
+        results (list): one dict of OUTPUT_COLUMNS per row, in order
+
+    '''
+
+    values, errors = _parse_rows(rows)
+    ok = np.array([e is None for e in errors])
+    room_width, room_height, face_vdeg, face_hdeg, height, width, p_height, hfov, vfov = np.where(ok[:, None], values, 0).T
+
+    distances = cal_distances_batch(face_vdeg, height, p_height, vfov/2, hfov/2)
+    rotate_polygon = get_rotate_polygon_batch(width/100, room_height, face_hdeg, height, hfov/2, *distances[:4])
+
+    # one clip polygon per room, rows of the same room are clipped together
+    footprints = [None] * len(rows)
+    rooms = np.stack([room_width, room_height], axis=1)
+    unique_rooms, inverse = np.unique(rooms, axis=0, return_inverse=True)
+    for k, (w, h) in enumerate(unique_rooms.tolist()):
+        index = np.flatnonzero(inverse.ravel() == k)
+        room_polygon = get_room_polygon(w, h)
+        if len(index) >= MIN_BATCH_ROOM_ROWS:
+            vertices, counts, _ = clip_convex_polygon_batch(rotate_polygon[index], room_polygon)
+            for i, v, c in zip(index, vertices, counts):
+                footprints[i] = v[:c].tolist()
+        else:
+            for i in index:
+                footprints[i] = clip_convex_polygon(rotate_polygon[i].tolist(), room_polygon)
+
+    # to_scalar_distance() of whole columns, plain floats are much faster than one numpy scalar at a time
+    distance_columns = [_to_scalar_distances(distance) for distance in distances]
+
+    results = []
+    for i, row in enumerate(rows):
+        result = {'id': row.get('id', '') if isinstance(row, dict) else ''}
+        if errors[i] is None:
+            for column, distance in zip(DISTANCE_COLUMNS, distance_columns):
+                result[column] = distance[i]
+            result['footprint'] = footprints[i]
+            # same area whichever way the row was clipped, so the output does not depend on the chunk size
+            result['area'] = abs(polygon_signed_area(footprints[i])) if footprints[i] else 0.0
+            result['error'] = ''
+        else:
+            result.update({column: '' for column in DISTANCE_COLUMNS})
+            result.update(footprint=[], area='', error=errors[i])
+        results.append(result)
+    return results
+
+
+def _format_chunk(task):
+    # runs in the worker, returns the text to write so the main process only copies strings
+    rows, output_format = task
+    results = process_rows(rows)
+    out = io.StringIO()
+    if output_format == 'csv':
+        writer = csv.DictWriter(out, OUTPUT_COLUMNS, lineterminator='\n')
+        for result in results:
+            writer.writerow(dict(result, footprint=json.dumps(result['footprint'])))
+    else:
+        for result in results:
+            out.write(json.dumps(result) + '\n')
+    return out.getvalue()
+
+
+def read_rows(f, input_format):
+    ''' stream the rows of an open CSV / JSONL file as dicts, a JSONL line that is not JSON as the string '''
+    if input_format == 'csv':
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # reported as an error row, the other rows go on
+                    yield line
+
+
+def read_chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(input_file, output_file, input_format, output_format, processes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    ''' stream input_file through process_rows() into output_file.
+
+    Args:
+        input_file (file): open text file
+        output_file (file): open text file
+        input_format (str): 'csv' or 'jsonl'
+        output_format (str): 'csv' or 'jsonl'
+        processes (int): worker processes, None for all cores, 1 to run in this process
+        chunk_size (int): rows per task
+
+    Returns:
+        n_rows (int): number of rows written
+
+    '''
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if output_format == 'csv':
+        output_file.write(','.join(OUTPUT_COLUMNS) + '\n')
+
+    n_rows = 0
+    tasks = ((chunk, output_format) for chunk in read_chunks(read_rows(input_file, input_format), chunk_size))
+    if processes == 1:
+        for task in tasks:
+            output_file.write(_format_chunk(task))
+            n_rows += len(task[0])
+        return n_rows
+
+    # a bounded queue of futures: the oldest is written first, so the output keeps the input order
+    # and at most max_in_flight chunks are in memory
+    max_in_flight = processes * IN_FLIGHT_PER_PROCESS
+    in_flight = deque()
+    with ProcessPoolExecutor(processes) as executor:
+        for task in tasks:
+            if len(in_flight) >= max_in_flight:
+                output_file.write(in_flight.popleft().result())
+            in_flight.append(executor.submit(_format_chunk, task))
+            n_rows += len(task[0])
+        while in_flight:
+            output_file.write(in_flight.popleft().result())
+    return n_rows
+
+
+def _get_format(path, given):
+    if given:
+        return given
+    if path.endswith('.jsonl') or path.endswith('.json'):
+        return 'jsonl'
+    if path.endswith('.csv'):
+        return 'csv'
+    raise ValueError(f'can not tell the format of {path}, use --input-format / --output-format')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='calculate the distances and footprints of every row of a CSV / JSONL file')
+    parser.add_argument('input', help="input file, '-' for stdin")
+    parser.add_argument('output', help="output file, '-' for stdout")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--output-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    input_format = _get_format(args.input, args.input_format)
+    output_format = _get_format(args.output, args.output_format)
+    input_file = sys.stdin if args.input == '-' else open(args.input, newline='')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        n_rows = run_batch(input_file, output_file, input_format, output_format, args.processes, args.chunk_size)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    print(f'{n_rows} rows written', file=sys.stderr)
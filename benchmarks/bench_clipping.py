@@ -0,0 +1,69 @@
+''' compare the footprint clipping paths over random rooms and camera angles:
+    python benchmarks/bench_clipping.py [n_setups]
+
+    old: intersect() + get_visible_range_points_in_room()
+    new: clip_convex_polygon()
+'''
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from clipping import clip_convex_polygon
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import cal_theorical_min_max_distance
+from fov_checker import get_room_polygon
+from fov_checker import get_rotate_polygon
+from fov_checker import get_visible_range_points_in_room
+from fov_checker import intersect
+
+
+def make_setups(n_setups, seed=0):
+    ''' random (rotate_polygon, room_polygon) pairs within the trackbar ranges '''
+    rng = random.Random(seed)
+    setups = []
+    for _ in range(n_setups):
+        room_width = rng.uniform(1.0, 30.0)
+        room_height = rng.uniform(1.0, 30.0)
+        face_vdeg = rng.randint(0, 90)
+        face_hdeg = rng.randint(0, 180)
+        height = rng.randint(150, 300)
+        width = rng.randint(0, int(room_width*100))
+        distances = cal_theorical_min_max_distance(face_vdeg, height, VFOV/2, HFOV/2)
+        rotate_polygon = get_rotate_polygon(width/100, room_height, face_hdeg, height, HFOV/2, *distances)
+        setups.append((rotate_polygon, get_room_polygon(room_width, room_height)))
+    return setups
+
+
+def old_path(rotate_polygon, room_polygon):
+    rotate_polygon_intersection = intersect(room_polygon, rotate_polygon)
+    return get_visible_range_points_in_room(rotate_polygon, room_polygon, rotate_polygon_intersection)
+
+
+def new_path(rotate_polygon, room_polygon):
+    return clip_convex_polygon(rotate_polygon, room_polygon)
+
+
+def time_path(path, setups, repeat=3):
+    ''' best of repeat, in seconds per setup '''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for rotate_polygon, room_polygon in setups:
+            path(rotate_polygon, room_polygon)
+        best = min(best, time.perf_counter() - start)
+    return best / len(setups)
+
+
+if __name__ == '__main__':
+    n_setups = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    setups = make_setups(n_setups)
+    old_time = time_path(old_path, setups)
+    new_time = time_path(new_path, setups)
+    print(f'setups: {n_setups}')
+    print(f'intersect + get_visible_range_points_in_room: {old_time*1e6:.1f} us/setup')
+    print(f'clip_convex_polygon: {new_time*1e6:.1f} us/setup')
+    print(f'speedup: {old_time/new_time:.1f}x')
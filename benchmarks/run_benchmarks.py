@@ -0,0 +1,378 @@
+''' time the math, geometry, pipeline and rendering hot paths and compare them with a stored baseline:
+    python benchmarks/run_benchmarks.py [--filter clip] [--output results.json] [--baseline benchmarks/baseline.json]
+
+    Every benchmark calls one function over n random inputs (fixed seed) and keeps the per call time
+    of each of repeat rounds. The results are written as JSON, with --baseline each benchmark is compared
+    with the same name in the baseline file and the script exits with 1 if one got slower than --threshold.
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from bench_clipping import make_setups
+from bench_clipping import new_path
+from bench_clipping import old_path
+from edge import Edge
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import _point_in_polygon
+from fov_checker import _sort_vertices_anti_clockwise_and_remove_duplicates
+from fov_checker import cal_h_distance
+from fov_checker import cal_min_max_distance_with_human_height
+from fov_checker import cal_theorical_min_max_distance
+from fov_checker import cal_v_max_distance
+from fov_checker import cal_v_min_distance
+from fov_checker import compute_footprint
+from fov_checker import draw_info_panel
+from fov_checker import draw_room
+from fov_checker import intersect
+from frustum import project_frustum_batch
+from info_panel import InfoPanelRenderer
+from pipeline import FramePipeline
+from room_renderer import RoomRenderer
+
+## Constants ##
+
+DEFAULT_N = 500
+DEFAULT_REPEAT = 5
+DEFAULT_SEED = 0
+# a benchmark is reported as slower when its time / baseline time is above this
+DEFAULT_THRESHOLD = 1.10
+
+# the room sizes of the rendering benchmarks, m
+RENDER_ROOM_SIZES = (1, 5, 10, 20, 30)
+
+# name -> (group, function(rng, n) returning (func, [args, ...]))
+BENCHMARKS = {}
+
+
+## functions ##
+def benchmark(group, name):
+    ''' register a function that builds the calls of a benchmark '''
+    def register(make_calls):
+        BENCHMARKS[f'{group}.{name}'] = (group, make_calls)
+        return make_calls
+    return register
+
+
+def _random_camera(rng):
+    # (face_vdeg, height, p_height) within the trackbar ranges
+    return rng.randint(0, 90), rng.randint(150, 300), rng.randint(100, 200)
+
+
+def _random_frame(rng):
+    # every pipeline input within the trackbar / room ranges
+    room_width = round(rng.uniform(1.0, 30.0), 1)
+    room_height = round(rng.uniform(1.0, 30.0), 1)
+    return {
+        'face_vdeg': rng.randint(0, 90),
+        'face_hdeg': rng.randint(0, 180),
+        'height': rng.randint(150, 300),
+        'width': rng.randint(0, int(room_width*100)),
+        'p_height': rng.randint(100, 200),
+        'room_width': room_width,
+        'room_height': room_height,
+    }
+
+
+@benchmark('distance', 'cal_v_max_distance')
+def _(rng, n):
+    return cal_v_max_distance, [(height, face_vdeg, VFOV/2) for face_vdeg, height, _ in (_random_camera(rng) for _ in range(n))]
+
+
+@benchmark('distance', 'cal_v_min_distance')
+def _(rng, n):
+    return cal_v_min_distance, [(height, face_vdeg, VFOV/2) for face_vdeg, height, _ in (_random_camera(rng) for _ in range(n))]
+
+
+@benchmark('distance', 'cal_h_distance')
+def _(rng, n):
+    return cal_h_distance, [(rng.uniform(0.0, 30.0), HFOV/2, rng.randint(150, 300)) for _ in range(n)]
+
+
+@benchmark('distance', 'cal_theorical_min_max_distance')
+def _(rng, n):
+    return cal_theorical_min_max_distance, [(face_vdeg, height, VFOV/2, HFOV/2) for face_vdeg, height, _ in (_random_camera(rng) for _ in range(n))]
+
+
+@benchmark('distance', 'cal_min_max_distance_with_human_height')
+def _(rng, n):
+    calls = []
+    for _ in range(n):
+        face_vdeg, height, p_height = _random_camera(rng)
+        min_v_distance, max_v_distance, _, _ = cal_theorical_min_max_distance(face_vdeg, height, VFOV/2, HFOV/2)
+        calls.append((p_height, height, min_v_distance, max_v_distance, face_vdeg, VFOV/2, HFOV/2))
+    return cal_min_max_distance_with_human_height, calls
+
+
+@benchmark('geometry', 'edge_intersection')
+def _(rng, n):
+    def get_intersection_point(edge1, edge2):
+        return edge1.get_intersection_point(edge2)
+    def random_edge():
+        return Edge([rng.uniform(0, 10), rng.uniform(0, 10)], [rng.uniform(0, 10), rng.uniform(0, 10)])
+    return get_intersection_point, [(random_edge(), random_edge()) for _ in range(n)]
+
+
+@benchmark('geometry', 'intersect')
+def _(rng, n):
+    return intersect, [(room_polygon, rotate_polygon) for rotate_polygon, room_polygon in make_setups(n, rng.random())]
+
+
+@benchmark('geometry', 'point_in_polygon')
+def _(rng, n):
+    calls = []
+    for rotate_polygon, room_polygon in make_setups(n, rng.random()):
+        calls.append(([rng.uniform(-1.0, 31.0), rng.uniform(-1.0, 31.0)], rotate_polygon))
+    return _point_in_polygon, calls
+
+
+@benchmark('geometry', 'sort_vertices')
+def _(rng, n):
+    # the clipping results are sorted again, with a duplicate point to remove
+    calls = []
+    for rotate_polygon, room_polygon in make_setups(n, rng.random()):
+        points = old_path(rotate_polygon, room_polygon).tolist()
+        points = points + points[:1]
+        rng.shuffle(points)
+        calls.append((points,))
+    return _sort_vertices_anti_clockwise_and_remove_duplicates, calls
+
+
+@benchmark('clipping', 'intersect_and_room_points')
+def _(rng, n):
+    return old_path, make_setups(n, rng.random())
+
+
+@benchmark('clipping', 'clip_convex_polygon')
+def _(rng, n):
+    return new_path, make_setups(n, rng.random())
+
+
+@benchmark('pipeline', 'compute_footprint')
+def _(rng, n):
+    calls = []
+    for _ in range(n):
+        frame = _random_frame(rng)
+        calls.append(((frame['room_width'], frame['room_height']),
+                      (frame['face_vdeg'], frame['face_hdeg'], frame['height'], frame['width']), (HFOV, VFOV)))
+    return compute_footprint, calls
+
+
+@benchmark('pipeline', 'project_frustum_batch')
+def _(rng, n):
+    # one call with the n cameras of compute_footprint, the person height plane included
+    frames = [_random_frame(rng) for _ in range(n)]
+    cameras = [(f['face_vdeg'], f['face_hdeg'], f['height'], min(f['width'], 1000)) for f in frames]
+    p_height = [f['p_height'] for f in frames]
+    return project_frustum_batch, [((10.0, 10.0), cameras, (HFOV, VFOV), p_height)]
+
+
+@benchmark('pipeline', 'frame_geometry')
+def _(rng, n):
+    # every input changes every frame, nothing is reused
+    pipeline = FramePipeline()
+    def frame(inputs):
+        pipeline.update(**inputs)
+        return pipeline.get('clipping')
+    return frame, [(_random_frame(rng),) for _ in range(n)]
+
+
+@benchmark('pipeline', 'frame_slider')
+def _(rng, n):
+    # one slider moves, the stages before it are reused
+    pipeline = FramePipeline()
+    inputs = _random_frame(rng)
+    def frame(face_hdeg):
+        pipeline.update(**dict(inputs, face_hdeg=face_hdeg))
+        pipeline.get('text_layer')
+        return pipeline.get('room_layer')
+    return frame, [(rng.randint(0, 180),) for _ in range(n)]
+
+
+@benchmark('pipeline', 'frame_full')
+def _(rng, n):
+    # the GUI frame: all stages and both layers
+    pipeline = FramePipeline()
+    def frame(inputs):
+        pipeline.update(**inputs)
+        pipeline.get('text_layer')
+        return pipeline.get('room_layer')
+    return frame, [(_random_frame(rng),) for _ in range(n)]
+
+
+@benchmark('render', 'draw_info_panel')
+def _(rng, n):
+    calls = []
+    for _ in range(n):
+        face_vdeg, height, p_height = _random_camera(rng)
+        distances = cal_theorical_min_max_distance(face_vdeg, height, VFOV/2, HFOV/2)
+        calls.append(distances + cal_min_max_distance_with_human_height(p_height, height, distances[0], distances[1], face_vdeg, VFOV/2, HFOV/2))
+    return draw_info_panel, calls
+
+
+@benchmark('render', 'info_panel_renderer')
+def _(rng, n):
+    # every frame has new distances, so only the static layer is reused
+    _, calls = BENCHMARKS['render.draw_info_panel'][1](rng, n)
+    return InfoPanelRenderer().render, calls
+
+
+def _make_render_benchmark(size, get_draw):
+    def make_calls(rng, n):
+        calls = []
+        for _ in range(n):
+            camera = (rng.randint(0, 90), rng.randint(0, 180), rng.randint(150, 300), rng.randint(0, size*100))
+            calls.append((size, size, compute_footprint((size, size), camera, (HFOV, VFOV))))
+        return get_draw(), calls
+    return make_calls
+
+
+for _size in RENDER_ROOM_SIZES:
+    benchmark('render', f'draw_room_{_size}m')(_make_render_benchmark(_size, lambda: draw_room))
+    benchmark('render', f'room_renderer_{_size}m')(_make_render_benchmark(_size, lambda: RoomRenderer().render))
+
+
+def run_benchmark(name, n=DEFAULT_N, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED):
+    ''' time one benchmark.
+
+    Args:
+        name (str): key of BENCHMARKS
+        n (int): calls per round
+        repeat (int): rounds
+        seed (int): seed of the random inputs, the inputs only depend on seed and name
+
+    Returns:
+        result (dict): 'group', 'n', 'repeat', 'min_us', 'median_us' per call,
+                       or 'group', 'error' when the benchmark failed
+
+    '''
+
+    group, make_calls = BENCHMARKS[name]
+    rng = random.Random(f'{seed}:{name}')
+    try:
+        func, calls = make_calls(rng, n)
+        # one warm up call, e.g. for the lazy cv2 import
+        func(*calls[0])
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for args in calls:
+                func(*args)
+            times.append((time.perf_counter() - start) / len(calls))
+    except Exception as e:
+        message = str(e).strip().splitlines()[-1] if str(e).strip() else ''
+        return {'group': group, 'error': f'{type(e).__name__}: {message}'}
+    return {
+        'group': group,
+        'n': len(calls),
+        'repeat': repeat,
+        'min_us': min(times) * 1e6,
+        'median_us': statistics.median(times) * 1e6,
+    }
+
+
+def get_environment():
+    ''' the versions and the machine the results were taken on '''
+    try:
+        import cv2
+        cv2_version = cv2.__version__
+    except ImportError:
+        cv2_version = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2_version,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.system(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def run_benchmarks(names=None, n=DEFAULT_N, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, log=None):
+    ''' run_benchmark() of every name (default all) and collect them with the environment '''
+    results = {}
+    for name in (names if names is not None else BENCHMARKS):
+        results[name] = run_benchmark(name, n, repeat, seed)
+        if log:
+            log(format_result(name, results[name]))
+    return {'environment': get_environment(), 'n': n, 'repeat': repeat, 'seed': seed, 'results': results}
+
+
+def format_result(name, result):
+    if 'error' in result:
+        return f'{name:<50} failed: {result["error"]}'
+    return f'{name:<50} {result["min_us"]:>12.1f} us {result["median_us"]:>12.1f} us (min, median)'
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    ''' compare the min time of each benchmark with the baseline.
+
+    Args:
+        results (dict): from run_benchmarks()
+        baseline (dict): from run_benchmarks(), e.g. loaded from a file
+        threshold (float): ratio above which a benchmark is slower
+
+    Returns:
+        comparison (list): [(name, baseline us, us, ratio, 'slower'/'faster'/'same'), ...]
+                           for the benchmarks timed in both
+
+    '''
+
+    comparison = []
+    for name, result in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None or 'error' in base or 'error' in result:
+            continue
+        ratio = result['min_us'] / base['min_us']
+        if ratio > threshold:
+            status = 'slower'
+        elif ratio < 1 / threshold:
+            status = 'faster'
+        else:
+            status = 'same'
+        comparison.append((name, base['min_us'], result['min_us'], ratio, status))
+    return comparison
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='time the math, geometry, pipeline and rendering hot paths')
+    parser.add_argument('--filter', default='', help='only run the benchmarks whose name contains this')
+    parser.add_argument('--n', type=int, default=DEFAULT_N, help='calls per round')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='rounds')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', help='write the results as JSON, e.g. to make a new baseline')
+    parser.add_argument('--baseline', help='JSON of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--list', action='store_true', help='print the benchmark names')
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print('\n'.join(names))
+        sys.exit(0)
+
+    results = run_benchmarks(names, args.n, args.repeat, args.seed, log=print)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare_results(results, baseline, args.threshold)
+        print()
+        for name, base_us, us, ratio, status in comparison:
+            print(f'{name:<50} {base_us:>12.1f} us -> {us:>12.1f} us {ratio:>6.2f}x {status}')
+        if any(status == 'slower' for *_, status in comparison):
+            sys.exit(1)
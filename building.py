@@ -0,0 +1,170 @@
+from math import ceil
+from math import floor
+from math import sqrt
+
+import numpy as np
+
+from clipping import clip_convex_polygon
+from clipping import polygon_signed_area
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import cal_theorical_min_max_distance
+from fov_checker import get_rotate_polygon
+
+## Constants ##
+
+# rooms per index cell on average when no cell size is given
+ROOMS_PER_INDEX_CELL = 2
+
+
+## functions ##
+def get_camera_trapezoid(camera_pos, camera, fov=(HFOV, VFOV)):
+    ''' the visible trapezoid of a camera anywhere in a building, not clipped by any room.
+
+    Args:
+        camera_pos (tuple): (x, y) of the camera in m
+        camera (tuple): (face_vdeg, face_hdeg, cam_height) degree, degree, cm, face_hdeg as in the GUI
+        fov (tuple): (HFOV, VFOV) in degree
+
+    Returns:
+        rotate_polygon (list): [left_top, left_bottom, right_bottom, right_top] as [x,y] in m
+
+    '''
+
+    face_vdeg, face_hdeg, height = camera
+    h_fov, v_fov = fov
+    distances = cal_theorical_min_max_distance(face_vdeg, height, v_fov/2, h_fov/2)
+    return get_rotate_polygon(camera_pos[0], camera_pos[1], face_hdeg, height, h_fov/2, *distances)
+
+
+class Building:
+    ''' many room polygons behind a uniform grid index, a footprint is only clipped
+        against the rooms whose bounding boxes it overlaps.
+
+        building = Building({'A': [[0,0],[0,5],[8,5],[8,0]], 'B': [[8,0],[8,5],[12,5],[12,0]]})
+        for room_id, parts in building.iter_room_footprints(footprints):
+            ...
+
+    '''
+
+    def __init__(self, rooms, cell_size=None):
+        ''' Args:
+            rooms (dict/list): room id -> [[x,y],...] polygon in m (concave is fine), a list uses the index as id
+            cell_size (float): index cell size in m, default so that there are ~ROOMS_PER_INDEX_CELL rooms per cell
+        '''
+
+        if not isinstance(rooms, dict):
+            rooms = dict(enumerate(rooms))
+        self.room_ids = list(rooms)
+        self.rooms = [[[float(x), float(y)] for x, y in rooms[room_id]] for room_id in self.room_ids]
+        self.boxes = np.array([[*np.min(room, axis=0), *np.max(room, axis=0)] for room in self.rooms]).reshape(-1, 4)
+
+        self.x_min, self.y_min = self.boxes[:, :2].min(axis=0) if len(self.rooms) else (0.0, 0.0)
+        self.x_max, self.y_max = self.boxes[:, 2:].max(axis=0) if len(self.rooms) else (0.0, 0.0)
+        if cell_size is None:
+            area = max((self.x_max - self.x_min) * (self.y_max - self.y_min), 1e-9)
+            cell_size = sqrt(area * ROOMS_PER_INDEX_CELL / max(len(self.rooms), 1))
+        self.cell_size = cell_size
+        self.n_cols = max(int(ceil((self.x_max - self.x_min) / cell_size)), 1)
+        self.n_rows = max(int(ceil((self.y_max - self.y_min) / cell_size)), 1)
+
+        # (row, col) -> room indices whose bounding box touches the cell
+        self.cells = {}
+        for i, box in enumerate(self.boxes):
+            col0, row0, col1, row1 = self._cell_range(box)
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    self.cells.setdefault((row, col), []).append(i)
+
+    def _cell_range(self, box):
+        # cells touched by box, clamped to the building so huge ('Inf') footprints stay cheap
+        col0 = min(max(int(floor((box[0] - self.x_min) / self.cell_size)), 0), self.n_cols - 1)
+        row0 = min(max(int(floor((box[1] - self.y_min) / self.cell_size)), 0), self.n_rows - 1)
+        col1 = min(max(int(floor((box[2] - self.x_min) / self.cell_size)), 0), self.n_cols - 1)
+        row1 = min(max(int(floor((box[3] - self.y_min) / self.cell_size)), 0), self.n_rows - 1)
+        return col0, row0, col1, row1
+
+    def _footprint_box(self, footprint):
+        # the finite vertices of footprint and their bounding box clipped to the building,
+        # None when fewer than 3 vertices are finite or the box is outside the building
+        points = np.asarray(footprint, dtype=float).reshape(-1, 2)
+        points = points[np.isfinite(points).all(axis=1)]
+        if len(points) < 3:
+            return None
+        x0, y0 = np.maximum(points.min(axis=0), (self.x_min, self.y_min))
+        x1, y1 = np.minimum(points.max(axis=0), (self.x_max, self.y_max))
+        if x0 > x1 or y0 > y1:
+            return None
+        return points, (x0, y0, x1, y1)
+
+    def query(self, box):
+        ''' get the indices of the rooms whose bounding box overlaps box.
+
+        Args:
+            box (tuple): (x_min, y_min, x_max, y_max) in m
+
+        Returns:
+            rooms (list): sorted room indices (positions in room_ids)
+
+        '''
+
+        col0, row0, col1, row1 = self._cell_range(box)
+        found = set()
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                found.update(self.cells.get((row, col), ()))
+        return sorted(i for i in found if self.boxes[i, 0] <= box[2] and self.boxes[i, 2] >= box[0]
+                      and self.boxes[i, 1] <= box[3] and self.boxes[i, 3] >= box[1])
+
+    def clip_footprint(self, footprint):
+        ''' clip one convex footprint against the rooms it overlaps.
+
+        Args:
+            footprint (list): [[x,y],...] convex polygon in m, e.g. from get_camera_trapezoid()
+
+        Returns:
+            parts (generator): (room_id, [[x,y],...]) for every room that sees a part with an area
+
+        '''
+
+        footprint_box = self._footprint_box(footprint)
+        if footprint_box is None:
+            return
+        points, box = footprint_box
+        for i in self.query(box):
+            # the footprint is the convex clip, so concave rooms work too
+            polygon = clip_convex_polygon(self.rooms[i], points)
+            if polygon:
+                yield self.room_ids[i], polygon
+
+    def iter_room_footprints(self, footprints):
+        ''' stream the footprints room by room, only clipping the room / footprint pairs whose bounding boxes overlap.
+
+        Args:
+            footprints (list): [[[x,y],...], ...] convex polygons in m, e.g. from get_camera_trapezoid()
+
+        Returns:
+            rooms (generator): (room_id, [(footprint index, polygon, area m^2), ...]) for every room seen
+                               by at least one footprint, in room order. Each room is clipped when it is reached.
+
+        '''
+
+        # pairing only looks at the bounding boxes, the clipping is left for the room's turn
+        room_footprints = {}
+        finite_footprints = {}
+        for j, footprint in enumerate(footprints):
+            footprint_box = self._footprint_box(footprint)
+            if footprint_box is None:
+                continue
+            finite_footprints[j], box = footprint_box
+            for i in self.query(box):
+                room_footprints.setdefault(i, []).append(j)
+
+        for i in sorted(room_footprints):
+            parts = []
+            for j in room_footprints[i]:
+                polygon = clip_convex_polygon(self.rooms[i], finite_footprints[j])
+                if polygon:
+                    parts.append((j, polygon, abs(polygon_signed_area(polygon))))
+            if parts:
+                yield self.room_ids[i], parts
@@ -0,0 +1,259 @@
+import json
+import os
+from functools import lru_cache
+from math import pi
+from math import tan
+
+import numpy as np
+
+from clipping import clip_convex_polygon_batch
+from fov_batch import cal_distances_batch
+from fov_batch import get_rotate_polygon_batch
+from fov_checker import get_room_polygon
+from frustum import project_frustum_batch
+from polygon import PolygonBatch
+
+## Constants ##
+
+DEFAULT_CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cameras.json')
+
+# the CamFacVDeg trackbar values, the tan tables have one entry per degree.
+# There are no cos tables: the FOV only enters the distances through tan, the cos / sin of
+# get_rotate_polygon() are of CamFacHDeg and the same for every model.
+TILT_DEGREES = np.arange(0, 91)
+
+
+## functions ##
+class CameraModel:
+    ''' one camera model: its FOVs and the math.tan tables of the integer tilts.
+
+        model = CameraModel('default', 120, 52, effective_hfov=90)
+        compute_footprint((10.0, 10.0), (45, 90, 250, 500), model)   # unpacks as (HFOV, VFOV)
+        FramePipeline(model.half_hfov, model.half_vfov)
+
+        The calculations use the effective FOV, e.g. the measured one or the one of the rectified image of a
+        lens with distortion, the nominal hfov / vfov are only kept for reference. Without an effective FOV
+        in the catalog it is the nominal one.
+
+    '''
+
+    def __init__(self, model_id, hfov, vfov, effective_hfov=None, effective_vfov=None, name=None, note=None):
+        self.model_id = model_id
+        self.name = name if name is not None else model_id
+        self.note = note
+        self.hfov = hfov
+        self.vfov = vfov
+        self.effective_hfov = effective_hfov if effective_hfov is not None else hfov
+        self.effective_vfov = effective_vfov if effective_vfov is not None else vfov
+        self.half_hfov = self.effective_hfov / 2
+        self.half_vfov = self.effective_vfov / 2
+
+        # the tangents of cal_v_max_distance(), cal_v_min_distance(), the camera lower than person case of
+        # cal_min_max_distance_with_human_height() and cal_h_distance(), same expressions as there
+        half_hfov, half_vfov = self.half_hfov, self.half_vfov
+        self.tan_max_v = np.array([tan((90 - (face_vdeg - half_vfov)) * pi / 180) for face_vdeg in TILT_DEGREES.tolist()])
+        self.tan_min_v = np.array([tan((90 - (face_vdeg + half_vfov)) * pi / 180) for face_vdeg in TILT_DEGREES.tolist()])
+        self.tan_lower = np.array([tan((half_vfov - face_vdeg) * pi / 180) for face_vdeg in TILT_DEGREES.tolist()])
+        self.tan_half_hfov = tan(half_hfov * pi / 180)
+
+    @property
+    def fov(self):
+        ''' (HFOV, VFOV) in degree, the effective ones '''
+        return (self.effective_hfov, self.effective_vfov)
+
+    def __iter__(self):
+        # a model can be passed as the fov=(HFOV, VFOV) argument
+        return iter(self.fov)
+
+    def __repr__(self):
+        return f'CameraModel({self.model_id!r}, hfov={self.effective_hfov}, vfov={self.effective_vfov})'
+
+
+class CameraCatalog:
+    ''' the camera models of a catalog file, and the batch calculations of many models at once.
+
+        catalog = load_catalog('cameras.json')
+        catalog['default'].fov
+        distances = catalog.cal_distances(['default', 'wide-110'], 45, 250, 170)
+        areas = catalog.evaluate_room((10.0, 10.0), [(45, 90, 250, 500), (30, 45, 280, 0)])
+
+        Every model id argument can be one id or one id per setup, broadcast against the other arguments.
+
+    '''
+
+    def __init__(self, models):
+        self.models = {}
+        for model in models:
+            if model.model_id in self.models:
+                raise ValueError(f'camera model {model.model_id!r} is in the catalog twice')
+            self.models[model.model_id] = model
+        self.ids = list(self.models)
+        self._index = {model_id: i for i, model_id in enumerate(self.ids)}
+
+        # the tables of all models stacked, (models, TILT_DEGREES) and (models,)
+        models = list(self.models.values())
+        self.half_hfov = np.array([m.half_hfov for m in models], dtype=float)
+        self.half_vfov = np.array([m.half_vfov for m in models], dtype=float)
+        self.tan_max_v = np.array([m.tan_max_v for m in models]).reshape(-1, len(TILT_DEGREES))
+        self.tan_min_v = np.array([m.tan_min_v for m in models]).reshape(-1, len(TILT_DEGREES))
+        self.tan_lower = np.array([m.tan_lower for m in models]).reshape(-1, len(TILT_DEGREES))
+        self.tan_half_hfov = np.array([m.tan_half_hfov for m in models], dtype=float)
+
+    def __len__(self):
+        return len(self.models)
+
+    def __iter__(self):
+        return iter(self.models.values())
+
+    def __contains__(self, model_id):
+        return model_id in self.models
+
+    def __getitem__(self, model_id):
+        try:
+            return self.models[model_id]
+        except KeyError:
+            raise KeyError(f'unknown camera model: {model_id!r}, the catalog has {self.ids}') from None
+
+    def index(self, model_ids):
+        ''' the row of every model id in the stacked tables, same shape as model_ids.
+            Integer arrays are taken as rows already, every method below takes either.
+        '''
+        model_ids = np.asarray(model_ids)
+        if np.issubdtype(model_ids.dtype, np.integer):
+            return model_ids
+        # the dict lookups only for the distinct ids
+        unique_ids, inverse = np.unique(model_ids, return_inverse=True)
+        rows = np.array([self._index[self[model_id].model_id] for model_id in unique_ids.tolist()], dtype=np.intp)
+        return rows[inverse].reshape(model_ids.shape)
+
+    def get_half_fov(self, model_ids):
+        ''' (half_hfov, half_vfov) arrays of the model ids in degree '''
+        index = self.index(model_ids)
+        return self.half_hfov[index], self.half_vfov[index]
+
+    def get_tangents(self, model_ids, face_vdeg):
+        ''' look up the tangents of cal_distances_batch() from the tables.
+
+        Args:
+            model_ids (str/array_like): model id(s)
+            face_vdeg (array_like): the vertical camera face degree, broadcast against model_ids
+
+        Returns:
+            tangents (tuple): (tan_max_v, tan_min_v, tan_lower, tan_half_hfov),
+                              None if a face_vdeg is not an integer of TILT_DEGREES
+
+        '''
+
+        face_vdeg = np.asarray(face_vdeg, dtype=float)
+        tilt = face_vdeg.astype(np.intp)
+        if np.any(tilt != face_vdeg) or np.any((tilt < TILT_DEGREES[0]) | (tilt > TILT_DEGREES[-1])):
+            return None
+        index, tilt = np.broadcast_arrays(self.index(model_ids), tilt - TILT_DEGREES[0])
+        return self.tan_max_v[index, tilt], self.tan_min_v[index, tilt], self.tan_lower[index, tilt], self.tan_half_hfov[index]
+
+    def cal_distances(self, model_ids, face_vdeg, height, p_height):
+        ''' fov_batch.cal_distances_batch() with the FOV and tan tables of every model id.
+
+        Args:
+            model_ids (str/array_like): model id(s)
+            face_vdeg (array_like): the vertical camera face degree. valid range: 0-90 degree
+            height (array_like): the height to set the camera. valid range: 150-300 cm
+            p_height (array_like): human height. valid range: 100-200 cm
+
+        Returns:
+            distances (tuple): the 8 arrays of cal_distances_batch()
+
+        '''
+
+        index = self.index(model_ids)
+        half_hfov, half_vfov = self.get_half_fov(index)
+        tangents = self.get_tangents(index, face_vdeg)
+        return cal_distances_batch(face_vdeg, height, p_height, half_vfov, half_hfov, tangents)
+
+    def compute_footprints(self, room, model_ids, cameras):
+        ''' compute_footprint() of many (model, camera) setups at once.
+
+        Args:
+            room (tuple): (room_width, room_height) in m
+            model_ids (str/array_like): one model id or one per camera
+            cameras (array_like): [(face_vdeg, face_hdeg, cam_height, cam_width), ...] same as compute_footprint()
+
+        Returns:
+            footprints (PolygonBatch): the visible polygon of every camera, count 0 if nothing is visible
+
+        '''
+
+        room_width, room_height = room
+        face_vdeg, face_hdeg, height, width = np.asarray(cameras, dtype=float).reshape(-1, 4).T
+        index = self.index(model_ids)
+        half_hfov, _ = self.get_half_fov(index)
+        distances = self.cal_distances(index, face_vdeg, height, 0)[:4]
+        rotate_polygon = get_rotate_polygon_batch(width/100, room_height, face_hdeg, height, half_hfov, *distances)
+        vertices, counts, _ = clip_convex_polygon_batch(rotate_polygon, get_room_polygon(room_width, room_height))
+        return PolygonBatch(vertices, counts)
+
+    def project_frustum(self, room, model_ids, cameras, p_height=None, roll_deg=0):
+        ''' frustum.project_frustum_batch() with the FOV of every model id, one model id or one per camera '''
+        half_hfov, half_vfov = self.get_half_fov(model_ids)
+        return project_frustum_batch(room, cameras, (2*half_hfov, 2*half_vfov), p_height, roll_deg)
+
+    def evaluate_room(self, room, cameras, p_height=None, roll_deg=0):
+        ''' the visible floor area of every model at every camera setup, in one batched call.
+
+        Args:
+            room (tuple): (room_width, room_height) in m
+            cameras (array_like): [(face_vdeg, face_hdeg, cam_height, cam_width), ...] same as compute_footprint()
+            p_height (float): human height in cm, only count the floor where the whole person is in frame.
+                              None for the floor only
+            roll_deg (float): the camera roll in degree
+
+        Returns:
+            areas (ndarray): (models, cameras) visible area in m^2 from the frustum projection,
+                             the rows in the order of ids
+
+        '''
+
+        cameras = np.asarray(cameras, dtype=float).reshape(-1, 4)
+        index = np.repeat(np.arange(len(self)), len(cameras))
+        footprints = self.project_frustum(room, index, np.tile(cameras, (len(self), 1)), p_height, roll_deg)
+        return footprints.areas().reshape(len(self), len(cameras))
+
+
+def load_catalog(path=DEFAULT_CATALOG_FILE):
+    ''' read a camera catalog file:
+        {"cameras": [{"id": ..., "hfov": ..., "vfov": ..., "effective_hfov": ..., "effective_vfov": ...,
+                      "name": ..., "note": ...}, ...]}
+        The effective FOVs, name and note can be left out.
+
+    Args:
+        path (str): the JSON file, cameras.json next to this module by default
+
+    Returns:
+        catalog (CameraCatalog): the models in the order of the file
+
+    '''
+
+    with open(path) as f:
+        entries = json.load(f)['cameras']
+    return CameraCatalog([CameraModel(
+        entry['id'], entry['hfov'], entry['vfov'],
+        effective_hfov=entry.get('effective_hfov'),
+        effective_vfov=entry.get('effective_vfov'),
+        name=entry.get('name'),
+        note=entry.get('note')) for entry in entries])
+
+
+@lru_cache(maxsize=1)
+def get_default_catalog():
+    ''' the catalog of cameras.json, read once per process '''
+    return load_catalog()
+
+
+def get_fov(fov):
+    ''' get the (HFOV, VFOV) of a fov argument:
+        a model id of the default catalog, a CameraModel or (HFOV, VFOV) in degree.
+        An unknown model id raises KeyError.
+    '''
+    if isinstance(fov, str):
+        return get_default_catalog()[fov].fov
+    return tuple(fov)
@@ -0,0 +1,275 @@
+import numpy as np
+
+
+## Constants ##
+
+# points closer than this (in m) to a clip edge are treated as lying on it
+CLIP_TOLERANCE = 1e-9
+
+
+## functions ##
+def polygon_signed_area(polygon):
+    ''' get the signed area of a polygon (shoelace formula).
+
+    Args:
+        polygon (list): [[x,y],...] polygon vertices
+
+    Returns:
+        area (float): > 0 for anti-clockwise, < 0 for clockwise vertices (y axis up)
+
+    '''
+
+    area = 0.0
+    for i in range(len(polygon)):
+        x1, y1 = polygon[i-1][0], polygon[i-1][1]
+        x2, y2 = polygon[i][0], polygon[i][1]
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def _clip_by_edge(subject, a, b, orientation, tolerance):
+    # Sutherland-Hodgman step: keep the part of subject on the inner side of the line a->b
+    ax, ay = a
+    ex, ey = b[0] - ax, b[1] - ay
+    tolerance = tolerance * (abs(ex) + abs(ey))
+
+    output = []
+    prev = subject[-1]
+    prev_side = orientation * (ex * (prev[1] - ay) - ey * (prev[0] - ax))
+    for cur in subject:
+        cur_side = orientation * (ex * (cur[1] - ay) - ey * (cur[0] - ax))
+        cur_inside = cur_side >= -tolerance
+        prev_inside = prev_side >= -tolerance
+        if cur_inside != prev_inside:
+            # the edge prev->cur crosses the line, the crossing is taken from the side values
+            t = prev_side / (prev_side - cur_side)
+            output.append((prev[0] + t * (cur[0] - prev[0]), prev[1] + t * (cur[1] - prev[1])))
+        if cur_inside:
+            output.append(cur)
+        prev, prev_side = cur, cur_side
+    return output
+
+
+def _remove_repeated_vertices(polygon, tolerance):
+    # touching vertices and shared edges give the same point twice in a row
+    result = []
+    for p in polygon:
+        if not result or abs(p[0] - result[-1][0]) > tolerance or abs(p[1] - result[-1][1]) > tolerance:
+            result.append(p)
+    while len(result) > 1 and abs(result[0][0] - result[-1][0]) <= tolerance and abs(result[0][1] - result[-1][1]) <= tolerance:
+        result.pop()
+    return result
+
+
+def clip_convex_polygon(subject, clip, tolerance=CLIP_TOLERANCE):
+    ''' clip a polygon with a convex polygon (Sutherland-Hodgman), in one pass over the clip edges:
+        clip_convex_polygon(rotate_polygon, room_polygon)
+
+    Args:
+        subject (list): [[x,y],...] (or (N,2) array, Polygon) the polygon to clip, any vertex order.
+                        The result is exact for a convex subject.
+        clip (list): [[x,y],...] (or (N,2) array, Polygon) convex polygon, any vertex order
+        tolerance (float): points within this distance of a clip edge count as inside
+
+    Returns:
+        clipped_polygon (list): [[x,y],...] the ordered anti-clockwise (y axis up) vertices of the
+                                intersection, [] if it has no area
+
+    '''
+
+    # arrays and polygon.Polygon are turned into lists in one call, not vertex by vertex
+    clip = [(float(p[0]), float(p[1])) for p in (clip.tolist() if hasattr(clip, 'tolist') else clip)]
+    subject = [(float(p[0]), float(p[1])) for p in (subject.tolist() if hasattr(subject, 'tolist') else subject)]
+    clip_area = polygon_signed_area(clip)
+    if clip_area == 0 or len(subject) < 3:
+        return []
+    orientation = 1 if clip_area > 0 else -1
+
+    for i in range(len(clip)):
+        subject = _clip_by_edge(subject, clip[i-1], clip[i], orientation, tolerance)
+        if not subject:
+            return []
+
+    subject = _remove_repeated_vertices(subject, tolerance)
+    area = polygon_signed_area(subject)
+    if len(subject) < 3 or abs(area) <= tolerance:
+        return []
+    if area < 0:
+        subject.reverse()
+    return [[x, y] for x, y in subject]
+
+
+def _signed_area_batch(points, counts):
+    # same summation order as polygon_signed_area(), padding beyond counts is skipped
+    k = np.arange(points.shape[1])
+    prev_idx = np.where(k == 0, counts[:, None] - 1, k - 1) % np.maximum(counts, 1)[:, None]
+    prev = np.take_along_axis(points, prev_idx[:, :, None], axis=1)
+    area = np.zeros(len(points))
+    for i in range(points.shape[1]):
+        term = prev[:, i, 0] * points[:, i, 1] - points[:, i, 0] * prev[:, i, 1]
+        area += np.where(i < counts, term, 0.0)
+    return area / 2
+
+
+def _clip_by_edge_batch(points, counts, a, b, orientation, tolerance):
+    ax, ay = a
+    ex, ey = b[0] - ax, b[1] - ay
+    tolerance = tolerance * (abs(ex) + abs(ey))
+    with np.errstate(invalid='ignore'):
+        side = orientation * (ex * (points[:, :, 1] - ay) - ey * (points[:, :, 0] - ax))
+    return _keep_inner_side_batch(points, counts, side, tolerance)
+
+
+def _clip_by_halfplane_batch(points, counts, halfplanes, tolerance):
+    # keep the part of every polygon where a*x + b*y + c >= 0, one (a, b, c) per row
+    a, b, c = halfplanes[:, 0:1], halfplanes[:, 1:2], halfplanes[:, 2:3]
+    # scaled to the distance from the line, a line with a = b = 0 is all inside or all outside by the sign of c
+    norm = np.hypot(a, b)
+    norm[norm == 0] = 1.0
+    with np.errstate(invalid='ignore'):
+        side = (a * points[:, :, 0] + b * points[:, :, 1] + c) / norm
+    return _keep_inner_side_batch(points, counts, side, tolerance)
+
+
+def _keep_inner_side_batch(points, counts, side, tolerance):
+    # Sutherland-Hodgman step of every row, side >= -tolerance is inside
+    n_rows, capacity = points.shape[:2]
+    k = np.arange(capacity)
+    valid = k < counts[:, None]
+    prev_idx = np.where(k == 0, counts[:, None] - 1, k - 1) % np.maximum(counts, 1)[:, None]
+    prev = np.take_along_axis(points, prev_idx[:, :, None], axis=1)
+
+    prev_side = np.take_along_axis(side, prev_idx, axis=1)
+    cur_inside = side >= -tolerance
+    prev_inside = prev_side >= -tolerance
+
+    cross = valid & (cur_inside != prev_inside)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = prev_side / (prev_side - side)
+        cross_points = prev + t[:, :, None] * (points - prev)
+
+    # every vertex gives [crossing, itself] like the append order of _clip_by_edge()
+    candidates = np.stack([cross_points, points], axis=2).reshape(n_rows, 2 * capacity, 2)
+    keep = np.stack([cross, valid & cur_inside], axis=2).reshape(n_rows, 2 * capacity)
+    new_counts = keep.sum(axis=1)
+    if np.any(new_counts > capacity):
+        raise ValueError(f'clipped polygon has more than {capacity} vertices, is the subject convex?')
+
+    order = np.argsort(~keep, axis=1, kind='stable')[:, :capacity]
+    return np.take_along_axis(candidates, order[:, :, None], axis=1), new_counts
+
+
+def _finish_clip_batch(points, counts, tolerance):
+    # the end of clip_convex_polygon(): _remove_repeated_vertices(), drop the results without area,
+    # make the rest anti-clockwise
+    capacity = points.shape[1]
+    rows = np.arange(len(points))
+    result = np.full_like(points, np.nan)
+    result_counts = np.zeros(len(points), dtype=int)
+    last = np.full((len(points), 2), np.nan)
+    for i in range(capacity):
+        p = points[:, i]
+        append = (i < counts) & ((result_counts == 0) | np.any(np.abs(p - last) > tolerance, axis=1))
+        result[rows[append], result_counts[append]] = p[append]
+        last[append] = p[append]
+        result_counts += append
+    first = result[:, 0]
+    for _ in range(capacity):
+        last = result[rows, np.maximum(result_counts - 1, 0)]
+        pop = (result_counts > 1) & np.all(np.abs(first - last) <= tolerance, axis=1)
+        if not pop.any():
+            break
+        result[rows[pop], result_counts[pop] - 1] = np.nan
+        result_counts -= pop
+
+    areas = _signed_area_batch(result, result_counts)
+    empty = (result_counts < 3) | (np.abs(areas) <= tolerance)
+    result_counts[empty] = 0
+    result[empty] = np.nan
+    areas[empty] = 0.0
+
+    # reverse the clockwise ones
+    k = np.arange(capacity)
+    reverse_idx = np.where((areas < 0)[:, None] & (k < result_counts[:, None]), result_counts[:, None] - 1 - k, k)
+    result = np.take_along_axis(result, reverse_idx[:, :, None], axis=1)
+
+    return result, result_counts, np.abs(areas)
+
+
+def clip_convex_polygon_batch(subjects, clip, capacity=None, tolerance=CLIP_TOLERANCE):
+    ''' batch version of clip_convex_polygon() for many convex subjects and one clip polygon.
+        The vertices are returned in fixed-capacity arrays padded with nan.
+
+    Args:
+        subjects (array_like): (..., K, 2) convex polygons, K vertices each
+        clip (list): [[x,y],...] convex polygon, any vertex order
+        capacity (int): max vertices of a result, default K + number of clip vertices
+        tolerance (float): points within this distance of a clip edge count as inside
+
+    Returns:
+        vertices (ndarray): (..., capacity, 2) anti-clockwise (y axis up) vertices, nan after counts
+        counts (ndarray): (...) number of vertices, 0 if the intersection has no area
+        areas (ndarray): (...) area of the intersection, 0 if it has no area
+
+    '''
+
+    clip = [(float(p[0]), float(p[1])) for p in clip]
+    subjects = np.asarray(subjects, dtype=float)
+    shape = subjects.shape[:-2]
+    n_vertices = subjects.shape[-2]
+    if capacity is None:
+        capacity = n_vertices + len(clip)
+    capacity = max(capacity, n_vertices)
+
+    points = np.full((int(np.prod(shape, dtype=int)), capacity, 2), np.nan)
+    points[:, :n_vertices] = subjects.reshape(-1, n_vertices, 2)
+    counts = np.full(len(points), n_vertices if n_vertices >= 3 else 0)
+
+    clip_area = polygon_signed_area(clip)
+    if clip_area == 0:
+        counts[:] = 0
+    orientation = 1 if clip_area > 0 else -1
+
+    if counts.any():
+        for i in range(len(clip)):
+            points, counts = _clip_by_edge_batch(points, counts, clip[i-1], clip[i], orientation, tolerance)
+
+    result, result_counts, areas = _finish_clip_batch(points, counts, tolerance)
+    return result.reshape(shape + (capacity, 2)), result_counts.reshape(shape), areas.reshape(shape)
+
+
+def clip_convex_polygon_by_halfplanes_batch(subject, halfplanes, tolerance=CLIP_TOLERANCE):
+    ''' clip one convex polygon with a different set of half-planes for every row:
+        the room polygon with the side planes of many camera frustums.
+
+    Args:
+        subject (list): [[x,y],...] (or (N,2) array, Polygon) convex polygon, any vertex order
+        halfplanes (array_like): (..., H, 3) (a, b, c) per row, the inside is a*x + b*y + c >= 0
+        tolerance (float): points within this distance of a line count as inside
+
+    Returns:
+        vertices (ndarray): (..., N + H, 2) anti-clockwise (y axis up) vertices, nan after counts
+        counts (ndarray): (...) number of vertices, 0 if the intersection has no area
+        areas (ndarray): (...) area of the intersection, 0 if it has no area
+
+    '''
+
+    subject = np.asarray(subject, dtype=float).reshape(-1, 2)
+    halfplanes = np.asarray(halfplanes, dtype=float)
+    shape = halfplanes.shape[:-2]
+    n_halfplanes = halfplanes.shape[-2]
+    halfplanes = halfplanes.reshape(-1, n_halfplanes, 3)
+    # a convex polygon gains at most one vertex per half-plane
+    capacity = len(subject) + n_halfplanes
+
+    points = np.full((len(halfplanes), capacity, 2), np.nan)
+    points[:, :len(subject)] = subject
+    counts = np.full(len(points), len(subject) if len(subject) >= 3 else 0)
+
+    for i in range(n_halfplanes):
+        if not counts.any():
+            break
+        points, counts = _clip_by_halfplane_batch(points, counts, halfplanes[:, i], tolerance)
+
+    result, result_counts, areas = _finish_clip_batch(points, counts, tolerance)
+    return result.reshape(shape + (capacity, 2)), result_counts.reshape(shape), areas.reshape(shape)
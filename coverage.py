@@ -0,0 +1,147 @@
+from math import ceil
+
+import numpy as np
+
+from clipping import polygon_signed_area
+
+## Constants ##
+
+# default cell size in m
+DEFAULT_CELL_SIZE = 0.05
+
+# cell centers closer than this (in m) to a polygon edge count as inside
+RASTER_TOLERANCE = 1e-9
+
+
+## functions ##
+def rasterize_convex_polygon(polygon, cell_size, n_rows, n_cols, tolerance=RASTER_TOLERANCE):
+    ''' get the grid cells whose center is inside a convex polygon.
+        Only the cells of the polygon bounding box are tested, each row is one run of columns.
+
+    Args:
+        polygon (list): [[x,y],...] convex polygon in m, any vertex order
+        cell_size (float): cell size in m, cell (row, col) has its center at ((col+0.5)*cell_size, (row+0.5)*cell_size)
+        n_rows (int): number of cells along y
+        n_cols (int): number of cells along x
+        tolerance (float): centers within this distance of an edge count as inside
+
+    Returns:
+        row0 (int): first row of mask
+        col0 (int): first column of mask
+        mask (ndarray): bool (rows, cols) of the bounding box, empty if the polygon is outside the grid
+
+    '''
+
+    empty = (0, 0, np.zeros((0, 0), dtype=bool))
+    if len(polygon) < 3:
+        return empty
+    area = polygon_signed_area(polygon)
+    if area == 0:
+        return empty
+    orientation = 1 if area > 0 else -1
+
+    points = np.asarray(polygon, dtype=float)
+    # cells whose center can be inside: (i+0.5)*cell_size in [min, max]
+    col0 = max(int(ceil(points[:, 0].min() / cell_size - 0.5 - tolerance)), 0)
+    col1 = min(int(np.floor(points[:, 0].max() / cell_size - 0.5 + tolerance)) + 1, n_cols)
+    row0 = max(int(ceil(points[:, 1].min() / cell_size - 0.5 - tolerance)), 0)
+    row1 = min(int(np.floor(points[:, 1].max() / cell_size - 0.5 + tolerance)) + 1, n_rows)
+    if col0 >= col1 or row0 >= row1:
+        return empty
+
+    # a convex polygon covers one run of columns per row, get it from the edges as
+    # left <= x <= right and only compare the column centers with the two bounds
+    y = (np.arange(row0, row1) + 0.5) * cell_size
+    left = np.full(len(y), -np.inf)
+    right = np.full(len(y), np.inf)
+    for i in range(len(points)):
+        ax, ay = points[i-1]
+        ex, ey = points[i] - points[i-1]
+        length = np.hypot(ex, ey)
+        if length == 0:
+            continue
+        # signed distance to the edge (> 0 on the inner side) is (a + b*x) / length
+        a = orientation * (ex * (y - ay) + ey * ax)
+        b = -orientation * ey
+        bound = (-tolerance * length - a)
+        if b > 0:
+            left = np.maximum(left, bound / b)
+        elif b < 0:
+            right = np.minimum(right, bound / b)
+        else:
+            right[a < -tolerance * length] = -np.inf
+
+    x = (np.arange(col0, col1) + 0.5) * cell_size
+    mask = (x[None, :] >= left[:, None]) & (x[None, :] <= right[:, None])
+    return row0, col0, mask
+
+
+class CoverageGrid:
+    ''' per cell visibility counts of a room, cell (row, col) covers
+        x in [col*cell_size, (col+1)*cell_size), y in [row*cell_size, (row+1)*cell_size) in the
+        coordinates of get_room_polygon(). A cell is covered by a footprint when its center is inside.
+
+        grid = CoverageGrid(10.0, 10.0, cell_size=0.05)
+        grid.add_footprint(compute_footprint((10.0, 10.0), (45, 90, 250, 500), (90, 52)))
+        print(grid.coverage_ratio())
+
+    '''
+
+    def __init__(self, room_width, room_height, cell_size=DEFAULT_CELL_SIZE, dtype=np.int32):
+        if cell_size <= 0:
+            raise ValueError(f'cell_size must be > 0, got {cell_size}')
+        self.room_width = room_width
+        self.room_height = room_height
+        self.cell_size = cell_size
+        # the last row / column may stick out of the room when the size is not a multiple of cell_size
+        self.n_rows = max(int(ceil(room_height / cell_size - RASTER_TOLERANCE)), 1)
+        self.n_cols = max(int(ceil(room_width / cell_size - RASTER_TOLERANCE)), 1)
+        self.counts = np.zeros((self.n_rows, self.n_cols), dtype=dtype)
+        self.n_footprints = 0
+
+    def add_footprint(self, polygon, weight=1):
+        ''' add one footprint, only the cells of its bounding box are touched.
+
+        Args:
+            polygon (list): [[x,y],...] convex polygon in m, e.g. from compute_footprint()
+            weight (int): added to the count of every covered cell, -1 removes a footprint
+
+        Returns:
+            n_cells (int): number of cells covered by the footprint
+
+        '''
+
+        row0, col0, mask = rasterize_convex_polygon(polygon, self.cell_size, self.n_rows, self.n_cols)
+        if mask.size:
+            view = self.counts[row0:row0 + mask.shape[0], col0:col0 + mask.shape[1]]
+            np.add(view, weight, out=view, where=mask, casting='unsafe')
+        self.n_footprints += 1 if weight > 0 else -1
+        return int(mask.sum())
+
+    def remove_footprint(self, polygon):
+        ''' remove a footprint added before '''
+        return self.add_footprint(polygon, weight=-1)
+
+    def clear(self):
+        self.counts[...] = 0
+        self.n_footprints = 0
+
+    def visible(self):
+        ''' get the bool (n_rows, n_cols) mask of the cells seen by at least one footprint '''
+        return self.counts > 0
+
+    def covered_cells(self, min_count=1):
+        ''' number of cells seen by at least min_count footprints '''
+        return int(np.count_nonzero(self.counts >= min_count))
+
+    def covered_area(self, min_count=1):
+        ''' area in m^2 of the cells seen by at least min_count footprints '''
+        return self.covered_cells(min_count) * self.cell_size ** 2
+
+    def coverage_ratio(self, min_count=1):
+        ''' covered part of the grid, 0-1 '''
+        return self.covered_cells(min_count) / self.counts.size
+
+    def cell_centers(self):
+        ''' get the x (n_cols,) and y (n_rows,) coordinates of the cell centers in m '''
+        return (np.arange(self.n_cols) + 0.5) * self.cell_size, (np.arange(self.n_rows) + 0.5) * self.cell_size
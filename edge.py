@@ -1,5 +1,7 @@
 import numpy as np
 
+from polygon import previous_vertices
+
 class Edge:
     # (x1,y1)--------------------(x2,y2)
     # support_vector = (x1,y1)
@@ -31,4 +33,68 @@ class Edge:
         	return None
         b = np.subtract(self._support_vector, other._support_vector)
         x = np.linalg.solve(A, b)
-        return x[0] if 0 <= x[0] <= 1 and 0 <= x[1] <= 1 else None
\ No newline at end of file
+        return x[0] if 0 <= x[0] <= 1 and 0 <= x[1] <= 1 else None
+
+# x= x1+t1(x2-x1) = x3 + t2 (x4-x3)
+# y= y1+t1(y2-y1) = y3 + t2 (y4-y3)
+# same system as Edge._get_intersection_parameter, solved with 2D cross products
+# for all edge pairs at once
+def get_edge_intersection_points_batch(polygons1, polygons2):
+    ''' get the intersection points of every edge of polygons1 with every edge of polygons2.
+        The leading dimensions of the polygons are broadcast, so many polygon pairs
+        can be done in one call.
+
+    Args:
+        polygons1 (array_like): (..., M, 2) polygon vertices
+        polygons2 (array_like): (..., N, 2) polygon vertices
+
+    Returns:
+        points (ndarray): (..., M, N, 2) intersection point of edge i of polygons1
+                          (from vertex i-1 to i) with edge j of polygons2
+        valid (ndarray): (..., M, N) bool, False when the edges do not intersect or are parallel
+
+    '''
+
+    polygons1 = np.asarray(polygons1, dtype=float)
+    polygons2 = np.asarray(polygons2, dtype=float)
+    support1 = previous_vertices(polygons1)[..., :, None, :]
+    support2 = previous_vertices(polygons2)[..., None, :, :]
+    direction1 = polygons1[..., :, None, :] - support1
+    direction2 = polygons2[..., None, :, :] - support2
+    b = support1 - support2
+
+    d1x, d1y = direction1[..., 0], direction1[..., 1]
+    d2x, d2y = direction2[..., 0], direction2[..., 1]
+    bx, by = b[..., 0], b[..., 1]
+    det = d2x * d1y - d1x * d2y
+
+    # rank of A = [-d1, d2] is < 2 when its smaller singular value is below
+    # the tolerance of np.linalg.matrix_rank
+    norm2 = d1x**2 + d1y**2 + d2x**2 + d2y**2
+    max_singular2 = (norm2 + np.sqrt(np.maximum(norm2**2 - 4 * det**2, 0))) / 2
+    parallel = np.abs(det) <= 2 * np.finfo(float).eps * max_singular2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (bx * d2y - d2x * by) / det
+        t2 = (bx * d1y - d1x * by) / det
+        valid = ~parallel & (0 <= t1) & (t1 <= 1) & (0 <= t2) & (t2 <= 1)
+        points = support1 + t1[..., None] * direction1
+    return points, valid
+
+
+def get_edge_intersection_points(polygon1, polygon2):
+    ''' get the intersection points of the edges of 2 polygons, in the same order as
+        checking Edge(polygon1[i-1], polygon1[i]) against Edge(polygon2[j-1], polygon2[j])
+        in nested loops.
+
+    Args:
+        polygon1 (array_like): (M, 2) polygon vertices
+        polygon2 (array_like): (N, 2) polygon vertices
+
+    Returns:
+        points (ndarray): (K, 2) intersection points
+
+    '''
+
+    points, valid = get_edge_intersection_points_batch(polygon1, polygon2)
+    return points[valid]
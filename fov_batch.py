@@ -0,0 +1,514 @@
+from functools import lru_cache
+from math import cos
+from math import pi
+from math import sin
+from math import tan
+
+import numpy as np
+
+from fov_checker import MAX_NUM_INF
+from fov_checker import cal_h_distance
+
+## Constants ##
+
+# 'Inf' and 'Invalid' of the scalar functions are stored in the float arrays as
+DISTANCE_INF = np.inf
+DISTANCE_INVALID = np.nan
+
+# np.tan may differ from math.tan in the last bits, a result computed from it that lies
+# this close to a rounding boundary is checked against math.tan
+TAN_AMBIGUOUS_TOLERANCE = 1e-6
+
+# integer face_vdeg 0 .. TABLE_DEGREES-1 (the CamFacVDeg trackbar) read their tangents from a math.tan table,
+# with an integer height 0 .. TABLE_HEIGHTS-1 (the CamLoc_H trackbar) also their theorical distances
+TABLE_DEGREES = 91
+TABLE_HEIGHTS = 301
+# FOVs whose tables are kept, a distance table is 4 * TABLE_DEGREES * TABLE_HEIGHTS floats (~0.9 MB)
+TAN_TABLE_CACHE_SIZE = 64
+DISTANCE_TABLE_CACHE_SIZE = 16
+
+# number of setups evaluated together, small enough for the temporaries to stay in cache
+CHUNK_SIZE = 16384
+
+
+## functions ##
+def get_distance_status(distance):
+    ''' get the status masks of a batch distance array.
+
+    Args:
+        distance (ndarray): distances returned by the *_batch functions
+
+    Returns:
+        finite (ndarray): bool mask, True for normal distance
+        infinite (ndarray): bool mask, True for 'Inf'
+        invalid (ndarray): bool mask, True for 'Invalid'
+
+    '''
+
+    distance = np.asarray(distance, dtype=float)
+    return np.isfinite(distance), np.isinf(distance), np.isnan(distance)
+
+
+def to_scalar_distance(distance):
+    ''' convert one value of a batch distance array back to the scalar representation.
+
+    Args:
+        distance (float): value from a batch distance array
+
+    Returns:
+        distance (float/str): 0-Infinite,'Inf','Invalid'
+
+    '''
+
+    if np.isnan(distance):
+        return 'Invalid'
+    if np.isinf(distance):
+        return 'Inf'
+    return float(distance)
+
+
+def _round_1(values, ambiguous=None):
+    # np.rint matches round(x,1) of python unless x*10 lands exactly on a .5,
+    # python rounds the exact binary value of x half to even there
+    values = np.atleast_1d(values)
+    to_rounded = values * 10
+    rounded = np.rint(to_rounded)
+    to_rounded -= rounded
+    np.abs(to_rounded, out=to_rounded)
+
+    if ambiguous is None:
+        ties = np.flatnonzero(to_rounded == 0.5)
+    else:
+        near_half = np.flatnonzero(to_rounded >= 0.5 - TAN_AMBIGUOUS_TOLERANCE)
+        ambiguous[near_half if rounded.size == ambiguous.size else slice(None)] = True
+        ties = near_half[to_rounded[near_half] == 0.5]
+    if ties.size:
+        # x*10 = x*8 + x*2 exactly, get the error of the float sum
+        x8 = values[ties] * 8
+        x2 = values[ties] * 2
+        scaled = values[ties] * 10
+        b_virtual = scaled - x8
+        error = (x8 - (scaled - b_virtual)) + (x2 - b_virtual)
+        floor = np.floor(scaled)
+        half_floor = floor * 0.5
+        rounded[ties] = floor + ((error > 0) | ((error == 0) & (np.floor(half_floor) != half_floor)))
+    rounded /= 10
+    return rounded
+
+
+def _math_tan(degrees):
+    # math.tan of every degree, same expression as the scalar functions
+    degrees = np.asarray(degrees, dtype=float)
+    return np.array([tan(d * pi / 180) for d in degrees.ravel().tolist()]).reshape(degrees.shape)
+
+
+def _math_tangents(face_vdeg, half_vfov, half_hfov):
+    # (tan_max_v, tan_min_v, tan_lower, tan_half_hfov) with math.tan
+    face_vdeg, half_vfov, half_hfov = np.broadcast_arrays(face_vdeg, half_vfov, half_hfov)
+    return (_math_tan(90 - (face_vdeg - half_vfov)), _math_tan(90 - (face_vdeg + half_vfov)),
+            _math_tan(half_vfov - face_vdeg), _math_tan(half_hfov))
+
+
+@lru_cache(maxsize=TAN_TABLE_CACHE_SIZE)
+def get_tan_tables(half_vfov, half_hfov):
+    ''' the math.tan values of the integer face_vdeg 0-90 of one FOV.
+
+    Args:
+        half_vfov (float): the half of camera vertical FOV in degree
+        half_hfov (float): the half of camera horizontal FOV in degree
+
+    Returns:
+        tan_max_v, tan_min_v, tan_lower (ndarray): (TABLE_DEGREES,) indexed by face_vdeg
+        tan_half_hfov (float): tan of half_hfov
+
+    '''
+
+    tan_max_v, tan_min_v, tan_lower, _ = _math_tangents(np.arange(TABLE_DEGREES, dtype=float), half_vfov, half_hfov)
+    return tan_max_v, tan_min_v, tan_lower, tan(half_hfov * pi / 180)
+
+
+@lru_cache(maxsize=DISTANCE_TABLE_CACHE_SIZE)
+def get_distance_tables(half_vfov, half_hfov):
+    ''' the theorical distances of the integer face_vdeg 0-90 and height 0-300 of one FOV.
+
+    Args:
+        half_vfov (float): the half of camera vertical FOV in degree
+        half_hfov (float): the half of camera horizontal FOV in degree
+
+    Returns:
+        distances (tuple): the 4 results of cal_theorical_min_max_distance_batch(),
+            (TABLE_DEGREES, TABLE_HEIGHTS) read-only arrays indexed by [face_vdeg, height]
+
+    '''
+
+    face_vdeg, height = np.meshgrid(np.arange(TABLE_DEGREES), np.arange(TABLE_HEIGHTS), indexing='ij')
+    distances = _run_in_chunks(_theorical_kernel, 4, face_vdeg, height, half_vfov, half_hfov,
+                               *_select(_lookup_tangents(face_vdeg, half_vfov, half_hfov), 0, 1))
+    for distance in distances:
+        distance.flags.writeable = False
+    return distances
+
+
+def _table_index(values, stop):
+    # values as an index of 0 .. stop-1, None when they are not all integers of that range
+    values = np.asarray(values)
+    index = values.astype(np.intp, copy=False)
+    if index.size and (index.min() < 0 or index.max() >= stop):
+        return None
+    if values.dtype.kind not in 'iub' and not np.array_equal(index, values):
+        return None
+    return index
+
+
+def _lookup_tangents(face_vdeg, half_vfov, half_hfov):
+    # the tangents of get_tan_tables() for one FOV and integer face_vdeg, None for other setups
+    if np.ndim(half_vfov) or np.ndim(half_hfov):
+        return None
+    index = _table_index(face_vdeg, TABLE_DEGREES)
+    if index is None:
+        return None
+    tan_max_v, tan_min_v, tan_lower, tan_half_hfov = get_tan_tables(float(half_vfov), float(half_hfov))
+    return tan_max_v[index], tan_min_v[index], tan_lower[index], tan_half_hfov
+
+
+def _lookup_distances(face_vdeg, height, half_vfov, half_hfov):
+    # the theorical distances of get_distance_tables() for one FOV, integer face_vdeg and height, None for other setups
+    if np.ndim(half_vfov) or np.ndim(half_hfov):
+        return None
+    degree_index = _table_index(face_vdeg, TABLE_DEGREES)
+    height_index = None if degree_index is None else _table_index(height, TABLE_HEIGHTS)
+    if height_index is None:
+        return None
+    # a flat take is a lot faster than indexing with 2 arrays, the index is checked so clip skips the buffered out=
+    index = degree_index * TABLE_HEIGHTS + height_index
+    distances = np.empty((4,) + index.shape)
+    for table, distance in zip(get_distance_tables(float(half_vfov), float(half_hfov)), distances):
+        table.take(index, out=distance, mode='clip')
+    return tuple(distances)
+
+
+def _tan(radians, tangents):
+    # keep every (radians, tan) pair so the ambiguous rows can be checked against math.tan
+    tangent = np.tan(radians)
+    tangents.append((radians, tangent))
+    return tangent
+
+
+def _tan_differs(tangents, ambiguous):
+    # rows whose result could change if np.tan was replaced with math.tan
+    index = np.flatnonzero(ambiguous)
+    differs = np.zeros(index.shape, dtype=bool)
+    for radians, tangent in tangents:
+        radians = np.broadcast_to(radians, ambiguous.shape)[index]
+        exact = np.fromiter((tan(r) for r in radians), dtype=float, count=index.size)
+        differs |= exact != np.broadcast_to(tangent, ambiguous.shape)[index]
+    return index[differs]
+
+
+def _take(values, index, size):
+    # the rows of index, single values stay single so the tan tables still apply
+    return values if np.ndim(values) == 0 else np.broadcast_to(values, size)[index]
+
+
+def _full(values, size):
+    return values if np.shape(values) == (size,) else np.array(np.broadcast_to(values, size))
+
+
+def _cal_v_max_distance_batch(height, facedeg, v_fov, ambiguous, tangents, tangent=None):
+    # tangent: a math.tan value (get_tan_tables(), camera_catalog), it needs no check
+    if tangent is None:
+        tangent = _tan((90 - (facedeg - v_fov)) * pi / 180, tangents)
+    max_d = height * tangent
+    max_d /= 100
+    return _round_1(max_d, ambiguous)
+
+
+def _cal_v_min_distance_batch(height, facedeg, v_fov, ambiguous, tangents, tangent=None):
+    if tangent is None:
+        tangent = _tan((90 - (facedeg + v_fov)) * pi / 180, tangents)
+    min_d = height * tangent
+    min_d /= 100
+    return _round_1(min_d, ambiguous)
+
+
+def _cal_h_distance_batch(v_distance, h_fov, cam_height_cm, ambiguous, tangents, tangent=None):
+    if tangent is None:
+        tangent = _tan(h_fov * pi / 180, tangents)
+    cam_height_m = cam_height_cm / 100
+    hor_distance = v_distance**2
+    hor_distance += cam_height_m**2
+    # in place: sqrt, then 2 * distance * tangent
+    np.sqrt(hor_distance, out=hor_distance)
+    hor_distance *= 2
+    hor_distance *= tangent
+    return _round_1(hor_distance, ambiguous)
+
+
+def _theorical_kernel(size, face_vdeg, height, half_vfov, half_hfov, tan_max_v=None, tan_min_v=None, tan_half_hfov=None):
+    if tan_half_hfov is None and np.ndim(half_hfov) == 0:
+        tan_half_hfov = tan(half_hfov * pi / 180)
+    # only the rows of np.tan values near a rounding boundary are checked
+    exact = tan_max_v is not None and tan_min_v is not None and tan_half_hfov is not None
+    ambiguous = None if exact else np.zeros(size, dtype=bool)
+    tangents = []
+
+    max_cant_measure = np.broadcast_to(face_vdeg <= half_vfov, size)
+    min_cant_measure = ~max_cant_measure & (face_vdeg + half_vfov > 90)
+
+    max_v_distance = _cal_v_max_distance_batch(height, face_vdeg, half_vfov, ambiguous, tangents, tan_max_v)
+    max_v_distance = _full(np.where(max_cant_measure, DISTANCE_INF, max_v_distance), size)
+    min_v_distance = _cal_v_min_distance_batch(height, face_vdeg, half_vfov, ambiguous, tangents, tan_min_v)
+    min_v_distance = _full(np.where(min_cant_measure, 0, min_v_distance), size)
+
+    max_h_distance = _cal_h_distance_batch(max_v_distance, half_hfov, height, ambiguous, tangents, tan_half_hfov)
+    max_h_distance = _full(np.where(max_cant_measure, DISTANCE_INF, max_h_distance), size)
+    min_h_distance = _full(_cal_h_distance_batch(min_v_distance, half_hfov, height, ambiguous, tangents, tan_half_hfov), size)
+
+    results = (min_v_distance, max_v_distance, min_h_distance, max_h_distance)
+    if not exact:
+        # calculate the rows where np.tan differs from math.tan again, with the math.tan values
+        index = _tan_differs(tangents, ambiguous)
+        if index.size:
+            args = [_take(a, index, size) for a in (face_vdeg, height, half_vfov, half_hfov)]
+            math_tan_max_v, math_tan_min_v, _, math_tan_half_hfov = _math_tangents(args[0], args[2], args[3])
+            exact_results = _theorical_kernel(index.size, *args, math_tan_max_v, math_tan_min_v, math_tan_half_hfov)
+            for result, exact_result in zip(results, exact_results):
+                result[index] = exact_result
+    return results
+
+
+def _human_height_kernel(size, p_height, height, min_v_distance, max_v_distance, face_vdeg, half_vfov, half_hfov, min_h_distance=None,
+                         tan_lower=None, tan_half_hfov=None):
+    if tan_half_hfov is None and np.ndim(half_hfov) == 0:
+        tan_half_hfov = tan(half_hfov * pi / 180)
+    ambiguous = None if tan_half_hfov is not None else np.zeros(size, dtype=bool)
+    tangents = []
+
+    lower = _full(p_height > height, size)
+    max_cant_measure = face_vdeg <= half_vfov
+    min_can_measure_lower = face_vdeg < half_vfov
+
+    # camera higher than person, only change max distance
+    max_v_distance_person = _full(max_v_distance / height, size)
+    max_v_distance_person *= p_height
+    max_v_distance_person = _round_1(np.subtract(max_v_distance, max_v_distance_person, out=max_v_distance_person))
+    max_v_distance_person = np.where(max_cant_measure | lower, DISTANCE_INF, max_v_distance_person)
+
+    # check if max is larger than min distance, the min distance only changes for the lower rows
+    invalid = (p_height < height) & (max_v_distance_person < min_v_distance)
+    invalid |= (p_height == height) & ~max_cant_measure
+    invalid |= lower & ~min_can_measure_lower
+    # x * 1 is exactly x and x * nan is nan, cheaper than a np.where() per result
+    invalid_scale = np.where(invalid, DISTANCE_INVALID, 1.0)
+    max_v_distance_person *= invalid_scale
+    min_v_distance_person = _full(min_v_distance * invalid_scale, size)
+
+    max_h_distance_person = _full(_cal_h_distance_batch(max_v_distance_person, half_hfov, height, ambiguous, tangents, tan_half_hfov), size)
+    # 'Inf' stays inf through a positive tangent
+    if tan_half_hfov is None or np.any(tan_half_hfov <= 0):
+        max_h_distance_person = np.where(max_v_distance_person == DISTANCE_INF, DISTANCE_INF, max_h_distance_person)
+    # the min distance is kept, so is its horizontal distance when it is already known
+    if min_h_distance is None:
+        min_h_distance = _cal_h_distance_batch(min_v_distance, half_hfov, height, ambiguous, tangents, tan_half_hfov)
+    min_h_distance_person = _full(min_h_distance * invalid_scale, size)
+
+    # camera lower than person, only change min distance
+    fallback = []
+    lower_index = np.flatnonzero(lower & min_can_measure_lower)
+    if lower_index.size:
+        p_height_l, height_l, face_vdeg_l, half_vfov_l, half_hfov_l = (_take(a, lower_index, size)
+            for a in (p_height, height, face_vdeg, half_vfov, half_hfov))
+        if tan_lower is None:
+            tan_lower_l = _lookup_tangents(face_vdeg_l, half_vfov_l, half_hfov_l)
+            tan_lower_l = None if tan_lower_l is None else tan_lower_l[2]
+        else:
+            tan_lower_l = _take(tan_lower, lower_index, size)
+        tan_half_hfov_l = None if tan_half_hfov is None else _take(tan_half_hfov, lower_index, size)
+        lower_exact = tan_lower_l is not None and tan_half_hfov_l is not None
+        lower_ambiguous = None if lower_exact else np.zeros(lower_index.size, dtype=bool)
+        lower_tangents = []
+        if tan_lower_l is None:
+            tan_lower_l = _tan((half_vfov_l - face_vdeg_l) * pi / 180, lower_tangents)
+        min_v_distance_person[lower_index] = min_v_lower = _round_1((p_height_l - height_l) / tan_lower_l, lower_ambiguous)
+        min_h_distance_person[lower_index] = _cal_h_distance_batch(
+            min_v_lower, half_hfov_l, height_l, lower_ambiguous, lower_tangents, tan_half_hfov_l)
+        if not lower_exact:
+            fallback.append(lower_index[_tan_differs(lower_tangents, lower_ambiguous)])
+
+    results = (min_v_distance_person, max_v_distance_person, min_h_distance_person, max_h_distance_person)
+    if ambiguous is not None:
+        fallback.append(_tan_differs(tangents, ambiguous))
+    if fallback:
+        index = np.unique(np.concatenate(fallback))
+        if index.size:
+            args = [_take(a, index, size) for a in (p_height, height, min_v_distance, max_v_distance, face_vdeg, half_vfov, half_hfov)]
+            min_h = None if min_h_distance is None else _take(min_h_distance, index, size)
+            _, _, math_tan_lower, math_tan_half_hfov = _math_tangents(args[4], args[5], args[6])
+            exact_results = _human_height_kernel(index.size, *args, min_h, math_tan_lower, math_tan_half_hfov)
+            for result, exact_result in zip(results, exact_results):
+                result[index] = exact_result
+    return results
+
+
+def _run_in_chunks(kernel, n_results, *args):
+    # work on cache sized pieces, the kernels make a lot of temporary arrays.
+    # single values (e.g. the FOV) are passed on as they are instead of being repeated
+    shape = np.broadcast_shapes(*(np.shape(a) for a in args))
+    size = int(np.prod(shape))
+    # the other arguments are converted to float chunk by chunk, no full size copies
+    args = [np.array(a, dtype=float).reshape(()) if np.size(a) == 1 and size > 1 else
+            np.broadcast_to(a, shape).ravel() for a in args]
+    # one block for all results, large enough blocks are backed by huge pages
+    results = np.empty((n_results, size))
+
+    with np.errstate(invalid='ignore', over='ignore', divide='ignore'):
+        for start in range(0, size, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, size)
+            chunk_args = [a[start:stop].astype(float, copy=False) if a.ndim else a for a in args]
+            for result, chunk_result in zip(results, kernel(stop - start, *chunk_args)):
+                result[start:stop] = chunk_result
+    return tuple(result.reshape(shape) for result in results)
+
+
+def _select(tangents, *index):
+    # the tangents a kernel takes, () when they have to be calculated
+    return () if tangents is None else tuple(tangents[i] for i in index)
+
+
+def cal_theorical_min_max_distance_batch(face_vdeg, height, half_vfov, half_hfov, tangents=None):
+    '''batch version of cal_theorical_min_max_distance().
+       All arguments are broadcast against each other.
+
+    Args:
+        face_vdeg (array_like): the vertical camera face degree. valid range: 0-90 degree
+        height (array_like): the height to set the camera. valid range: 150-300 cm
+        half_vfov (array_like): the half of camera vertical FOV. valid range: 0-180 degree
+        half_hfov (array_like): the half of camera horizontal FOV. valid range: 0-180 degree
+        tangents (tuple): (tan_max_v, tan_min_v, tan_lower, tan_half_hfov) math.tan values of the setups,
+                          from camera_catalog.CameraCatalog.get_tangents(). None to calculate them
+
+    Returns:
+        min_v_distance (ndarray): the minimum visible vertical distance of camera, inf for 'Inf'
+        max_v_distance (ndarray): the maximum visible vertical distance of camera, inf for 'Inf'
+        min_h_distance (ndarray): the minimum visible horizontal distance of camera, inf for 'Inf'
+        max_h_distance (ndarray): the minimum visible horizontal distance of camera, inf for 'Inf'
+
+    '''
+
+    if tangents is None:
+        distances = _lookup_distances(face_vdeg, height, half_vfov, half_hfov)
+        if distances is not None:
+            return distances
+        tangents = _lookup_tangents(face_vdeg, half_vfov, half_hfov)
+    return _run_in_chunks(_theorical_kernel, 4, face_vdeg, height, half_vfov, half_hfov, *_select(tangents, 0, 1, 3))
+
+
+def cal_min_max_distance_with_human_height_batch(p_height, height, min_v_distance, max_v_distance, face_vdeg, half_vfov, half_hfov):
+    '''batch version of cal_min_max_distance_with_human_height().
+       All arguments are broadcast against each other.
+
+    Args:
+        p_height (array_like): human height. valid range: 100-200 cm
+        height (array_like): the height to set the camera. valid range: 150-300 cm
+        min_v_distance (array_like): the minimum visible vertical distance of camera, inf for 'Inf'
+        max_v_distance (array_like): the maximum visible vertical distance of camera, inf for 'Inf'
+        face_vdeg (array_like): the vertical camera face degree. valid range: 0-90 degree
+        half_vfov (array_like): the half of camera vertical FOV. valid range: 0-180 degree
+        half_hfov (array_like): the half of camera horizontal FOV. valid range: 0-180 degree
+
+    Returns:
+        min_v_distance_person (ndarray): inf for 'Inf', nan for 'Invalid'
+        max_v_distance_person (ndarray): inf for 'Inf', nan for 'Invalid'
+        min_h_distance_person (ndarray): inf for 'Inf', nan for 'Invalid'
+        max_h_distance_person (ndarray): inf for 'Inf', nan for 'Invalid'
+
+    '''
+
+    return _run_in_chunks(_human_height_kernel, 4,
+        p_height, height, min_v_distance, max_v_distance, face_vdeg, half_vfov, half_hfov)
+
+
+def cal_distances_batch(face_vdeg, height, p_height, half_vfov, half_hfov, tangents=None):
+    '''calculate the theorical and the human height distances of many setups at once.
+
+    Args:
+        face_vdeg (array_like): the vertical camera face degree. valid range: 0-90 degree
+        height (array_like): the height to set the camera. valid range: 150-300 cm
+        p_height (array_like): human height. valid range: 100-200 cm
+        half_vfov (array_like): the half of camera vertical FOV. valid range: 0-180 degree
+        half_hfov (array_like): the half of camera horizontal FOV. valid range: 0-180 degree
+        tangents (tuple): see cal_theorical_min_max_distance_batch()
+
+    Returns:
+        distances (tuple): the 4 results of cal_theorical_min_max_distance_batch()
+            followed by the 4 results of cal_min_max_distance_with_human_height_batch().
+            The first 4 are read-only broadcast views, they do not depend on p_height.
+
+    '''
+
+    # the theorical distances do not depend on p_height, only work them out once for
+    # every camera setup of the (broadcast) input
+    min_v_distance, max_v_distance, min_h_distance, max_h_distance = cal_theorical_min_max_distance_batch(
+        face_vdeg, height, half_vfov, half_hfov, tangents)
+    person_distances = _run_in_chunks(_human_height_kernel, 4,
+        p_height, height, min_v_distance, max_v_distance, face_vdeg, half_vfov, half_hfov, min_h_distance, *_select(tangents, 2, 3))
+
+    shape = person_distances[0].shape
+    theorical_distances = tuple(np.broadcast_to(d, shape) for d in (min_v_distance, max_v_distance, min_h_distance, max_h_distance))
+    return theorical_distances + person_distances
+
+
+def _cos_sin_deg(deg):
+    # math.cos/math.sin of the few distinct degrees, same bits as get_rotate_polygon()
+    unique_deg, inverse = np.unique(deg, return_inverse=True)
+    rad = [d * pi / 180 for d in unique_deg.tolist()]
+    cos_values = np.array([cos(r) for r in rad])[inverse].reshape(np.shape(deg))
+    sin_values = np.array([sin(r) for r in rad])[inverse].reshape(np.shape(deg))
+    return cos_values, sin_values
+
+
+def _inf_to_max_num(v_distance, h_distance, half_hfov, height):
+    # 'Inf' is drawn as MAX_NUM_INF like get_rotate_polygon()
+    v_distance, h_distance, half_hfov, height = np.broadcast_arrays(v_distance, h_distance, half_hfov, height)
+    h_distance = np.array(h_distance, dtype=float)
+    index = np.flatnonzero(np.isinf(h_distance))
+    inf_h_distance = {}
+    for i in index:
+        key = (float(half_hfov.flat[i]), float(height.flat[i]))
+        if key not in inf_h_distance:
+            inf_h_distance[key] = cal_h_distance(MAX_NUM_INF, *key)
+        h_distance.flat[i] = inf_h_distance[key]
+    return np.where(np.isinf(v_distance), MAX_NUM_INF, v_distance), h_distance
+
+
+def get_rotate_polygon_batch(cam_x_pos, cam_y_pos, face_hdeg, height, half_hfov, min_v_distance, max_v_distance, min_h_distance, max_h_distance):
+    '''batch version of get_rotate_polygon(). All arguments are broadcast against each other.
+       The trapezoid is rotated around (0,0) and then moved to the camera, like pipeline.FramePipeline.
+
+    Args:
+        cam_x_pos (array_like): x position of the camera in m
+        cam_y_pos (array_like): y position of the camera in m
+        face_hdeg (array_like): the horizontal camera face degree. valid range: 0-180 degree
+        height (array_like): the height to set the camera. valid range: 150-300 cm
+        half_hfov (array_like): the half of camera horizontal FOV. valid range: 0-180 degree
+        min_v_distance ... max_h_distance (array_like): distances of the *_batch functions,
+            inf for 'Inf'. nan ('Invalid') gives nan vertices, clip_convex_polygon_batch() drops them.
+
+    Returns:
+        rotate_polygon (ndarray): (..., 4, 2) left_top, left_bottom, right_bottom, right_top in m
+
+    '''
+
+    min_v_distance, min_h_distance = _inf_to_max_num(min_v_distance, min_h_distance, half_hfov, height)
+    max_v_distance, max_h_distance = _inf_to_max_num(max_v_distance, max_h_distance, half_hfov, height)
+
+    # left_top, left_bottom, right_bottom, right_top around the camera at (0,0)
+    dx = np.stack(np.broadcast_arrays(-max_h_distance/2, -min_h_distance/2, min_h_distance/2, max_h_distance/2), axis=-1)
+    dy = np.stack(np.broadcast_arrays(-max_v_distance, -min_v_distance, -min_v_distance, -max_v_distance), axis=-1)
+
+    rotate_cos, rotate_sin = _cos_sin_deg(face_hdeg * (-1) + 90)
+    rotate_cos = rotate_cos[..., None]
+    rotate_sin = rotate_sin[..., None]
+    x = (dx * rotate_cos + dy * rotate_sin) + np.asarray(cam_x_pos)[..., None]
+    y = (-dx * rotate_sin + dy * rotate_cos) + np.asarray(cam_y_pos)[..., None]
+    return np.stack(np.broadcast_arrays(x, y), axis=-1)
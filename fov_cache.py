@@ -0,0 +1,144 @@
+from collections import OrderedDict
+
+from camera_catalog import get_fov
+from fov_checker import cal_min_max_distance_with_human_height
+from fov_checker import cal_theorical_min_max_distance
+from fov_checker import compute_footprint
+
+## Constants ##
+
+# results kept per function, measured with tracemalloc a distance entry (key and result) is ~0.35 KB
+# and a footprint ~1 KB, so the default stays below ~7 MB
+DEFAULT_CACHE_SIZE = 4096
+
+
+## functions ##
+class LRUCache:
+    ''' a bounded dict that drops the least recently used key first.
+
+        cache = LRUCache(1024)
+        value = cache.get(key)
+        if value is None:
+            cache.put(key, calculate())
+
+    '''
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        if maxsize < 0:
+            raise ValueError(f'maxsize must be >= 0, got {maxsize}')
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        ''' get the value of key and mark it as recently used, counts a hit or a miss '''
+        if key in self.data:
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        ''' store value, evicting the least recently used keys when the cache is full '''
+        if self.maxsize == 0:
+            return
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        ''' drop all values and reset the counters '''
+        self.data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        ''' get the counters.
+
+        Returns:
+            stats (dict): hits, misses, evictions, size, maxsize and hit_rate (0-1)
+
+        '''
+
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self.data)
+
+
+class FovCache:
+    ''' memoized versions of the distance and footprint functions of fov_checker.
+        The key is the exact argument tuple, so different rooms and FOV never share results.
+
+        cache = FovCache(maxsize=1024)
+        distances = cache.cal_theorical_min_max_distance(45, 250, 26, 45)
+        visible_polygon = cache.compute_footprint((10.0, 10.0), (45, 90, 250, 500), (90, 52))
+        print(cache.stats())
+
+    '''
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, distance_maxsize=None, person_maxsize=None, footprint_maxsize=None):
+        self.distances = LRUCache(maxsize if distance_maxsize is None else distance_maxsize)
+        self.person_distances = LRUCache(maxsize if person_maxsize is None else person_maxsize)
+        self.footprints = LRUCache(maxsize if footprint_maxsize is None else footprint_maxsize)
+
+    def cal_theorical_min_max_distance(self, face_vdeg, height, half_vfov, half_hfov):
+        ''' same as fov_checker.cal_theorical_min_max_distance() '''
+        key = (face_vdeg, height, half_vfov, half_hfov)
+        result = self.distances.get(key)
+        if result is None:
+            result = cal_theorical_min_max_distance(face_vdeg, height, half_vfov, half_hfov)
+            self.distances.put(key, result)
+        return result
+
+    def cal_min_max_distance_with_human_height(self, p_height, height, min_v_distance, max_v_distance, face_vdeg, half_vfov, half_hfov):
+        ''' same as fov_checker.cal_min_max_distance_with_human_height() '''
+        key = (p_height, height, min_v_distance, max_v_distance, face_vdeg, half_vfov, half_hfov)
+        result = self.person_distances.get(key)
+        if result is None:
+            result = cal_min_max_distance_with_human_height(p_height, height, min_v_distance, max_v_distance, face_vdeg, half_vfov, half_hfov)
+            self.person_distances.put(key, result)
+        return result
+
+    def compute_footprint(self, room, camera, fov, frustum=False):
+        ''' same as fov_checker.compute_footprint(), the returned list is a copy '''
+        # a model id and its (HFOV, VFOV) share the entry
+        fov = get_fov(fov)
+        # the trapezoid and the frustum footprint of a setup differ, frustum is part of the key
+        key = (tuple(room), tuple(camera), fov, bool(frustum))
+        result = self.footprints.get(key)
+        if result is None:
+            result = compute_footprint(room, camera, fov, frustum)
+            self.footprints.put(key, result)
+        # callers may change the points, the cached ones must stay as they are
+        return [list(p) for p in result]
+
+    def clear(self):
+        for cache in (self.distances, self.person_distances, self.footprints):
+            cache.clear()
+
+    def stats(self):
+        ''' get the counters of every function.
+
+        Returns:
+            stats (dict): {'distances': ..., 'person_distances': ..., 'footprints': ...} of LRUCache.stats()
+
+        '''
+
+        return {
+            'distances': self.distances.stats(),
+            'person_distances': self.person_distances.stats(),
+            'footprints': self.footprints.stats(),
+        }
@@ -2,14 +2,17 @@ from math import pi
 from math import tan
 from math import cos
 from math import sin
-from math import atan
-from math import degrees
 from math import sqrt
 
-import cv2
 import numpy as np
-import tkinter as tk
-from edge import Edge
+from clipping import clip_convex_polygon
+from edge import get_edge_intersection_points
+from polygon import Polygon
+from polygon import as_points
+from polygon import previous_vertices
+from stage_timer import NULL_TIMER
+# cv2 and tkinter are only imported by the GUI functions, the calculations
+# (e.g. compute_footprint) can run headless
 ## Constants ##
 
 MAX_NUM_INF = 1e9
@@ -27,6 +30,13 @@ H_HFOV = HFOV/2
 H_VFOV = VFOV/2
 
 WINDOW_NAME = 'FOV Checker'
+ROOM_WINDOW_NAME = 'ROOM'
+
+# how long the GUI loop waits for events (ms) before checking trackbar_dirty again
+IDLE_WAIT_MS = 50
+
+# stages listed under the frame time when the GUI runs with --profile
+TIMING_OVERLAY_STAGES = 6
 
 # the default value for maximum distance for VFOV
 # when camera placement degree smaller than VHOV/2, should always use this value
@@ -44,6 +54,8 @@ cam_height = 250
 # global variables
 room_width = 10.0
 room_height = 10.0
+# set by the trackbar callbacks, the GUI loop only recalculates and redraws when it is True
+trackbar_dirty = True
 
 
 
@@ -52,6 +64,10 @@ room_height = 10.0
 def nothing(pos):
     pass
 
+def mark_dirty(pos):
+    global trackbar_dirty
+    trackbar_dirty = True
+
 def cal_v_max_distance(height,facedeg,v_fov):
     max_d = height * (tan( (90- (facedeg - v_fov)) *pi/180 )) 
     return round(max_d/100,1)
@@ -90,15 +106,16 @@ def window_init(window_name):
 
     '''                  
 
+    import cv2
     global room_width
 
     # create window
     cv2.namedWindow(window_name,cv2.WINDOW_NORMAL)#WINDOW_AUTOSIZE, WINDOW_NORMAL
-    cv2.createTrackbar('CamFacVDeg', window_name, 0, 90, nothing)
-    cv2.createTrackbar('CamFacHDeg', window_name, 0, 180, nothing)    
-    cv2.createTrackbar('CamLoc_H', window_name, 0, 300, nothing)
-    cv2.createTrackbar('CamLoc_W', window_name, 0, int(room_width*100), nothing)
-    cv2.createTrackbar('Person_H', window_name, 0, 200, nothing)
+    cv2.createTrackbar('CamFacVDeg', window_name, 0, 90, mark_dirty)
+    cv2.createTrackbar('CamFacHDeg', window_name, 0, 180, mark_dirty)    
+    cv2.createTrackbar('CamLoc_H', window_name, 0, 300, mark_dirty)
+    cv2.createTrackbar('CamLoc_W', window_name, 0, int(room_width*100), mark_dirty)
+    cv2.createTrackbar('Person_H', window_name, 0, 200, mark_dirty)
 
     # set default value
     cv2.setTrackbarPos('CamFacVDeg', window_name, 45)
@@ -127,6 +144,7 @@ def get_trackbar_values(window_name):
 
     '''
 
+    import cv2
     face_vdeg = cv2.getTrackbarPos('CamFacVDeg', window_name)
     face_hdeg = cv2.getTrackbarPos('CamFacHDeg', window_name)    
     cam_height = cv2.getTrackbarPos('CamLoc_H', window_name)
@@ -292,91 +310,110 @@ def intersect(polygon1, polygon2):
     """
     The given polygons must be convex and their vertices must be in anti-clockwise order (this is not checked!)
     Example: polygon1 = [[0,0], [0,1], [1,1]]
+    Lists, (N,2) arrays and Polygon all work, the result is a Polygon
     """
-    polygon3 = list()
-    polygon3.extend(_get_vertices_lying_in_the_other_polygon(polygon1, polygon2))
-    polygon3.extend(_get_edge_intersection_points(polygon1, polygon2))
+    polygon1 = as_points(polygon1)
+    polygon2 = as_points(polygon2)
+    polygon3 = np.concatenate([
+        _get_vertices_lying_in_the_other_polygon(polygon1, polygon2),
+        _get_edge_intersection_points(polygon1, polygon2)])
     return _sort_vertices_anti_clockwise_and_remove_duplicates(polygon3)
 
 
 def _get_vertices_lying_in_the_other_polygon(polygon1, polygon2):
-    vertices_lying_in_the_other_polygon = list()
-    for corner in polygon1:
-        if _polygon_contains_point(polygon2, corner):
-            vertices_lying_in_the_other_polygon.append(corner)
-    for corner in polygon2:
-        if _polygon_contains_point(polygon1, corner):
-            vertices_lying_in_the_other_polygon.append(corner)
-    return vertices_lying_in_the_other_polygon
+    polygon1 = as_points(polygon1)
+    polygon2 = as_points(polygon2)
+    return np.concatenate([
+        polygon1[_polygon_contains_points(polygon2, polygon1)],
+        polygon2[_polygon_contains_points(polygon1, polygon2)]])
 
 
 def _get_edge_intersection_points(polygon1, polygon2):
-    intersection_points = list()
-    for i in range(len(polygon1)):
-        edge1 = Edge(polygon1[i-1], polygon1[i])
-        for j in range(len(polygon2)):
-            edge2 = Edge(polygon2[j-1], polygon2[j])
-            intersection_point = edge1.get_intersection_point(edge2)
-            if intersection_point is not None:
-                intersection_points.append(intersection_point)
-    return intersection_points
+    return get_edge_intersection_points(polygon1, polygon2).reshape(-1, 2)
+
+
+def _polygon_contains_points(polygon, points):
+    # _polygon_contains_point() of (M,2) points at once: no edge may have a point on its right
+    polygon = as_points(polygon)
+    previous = previous_vertices(polygon)
+    a = polygon - previous
+    b = as_points(points)[:, None, :] - previous
+    # z of edge x (point - edge start), < 0 when the point is right of the edge, outside an anti-clockwise polygon
+    cross = a[:, 0] * b[..., 1] - a[:, 1] * b[..., 0]
+    return ~(cross < 0).any(axis=1)
 
 
 def _polygon_contains_point(polygon, point):
+    # plain floats, one tolist() for an array / Polygon instead of numpy calls per vertex
+    polygon = polygon.tolist() if hasattr(polygon, 'tolist') else polygon
+    point_x, point_y = point[0], point[1]
     for i in range(len(polygon)):
-        a = np.subtract(polygon[i], polygon[i-1])
-        b = np.subtract(point, polygon[i-1])
-        # why
-        if np.cross(a,b) < 0:
+        a_x, a_y = polygon[i][0] - polygon[i-1][0], polygon[i][1] - polygon[i-1][1]
+        b_x, b_y = point_x - polygon[i-1][0], point_y - polygon[i-1][1]
+        # negative cross product means the point lies right of an edge, so it is outside the anti-clockwise polygon
+        if a_x * b_y - a_y * b_x < 0:
             return False
     return True
 
 
 def _sort_vertices_anti_clockwise_and_remove_duplicates(polygon, tolerance=1e-7):
-    polygon = sorted(polygon, key=lambda p: _get_angle_in_radians(_get_inner_point(polygon), p))
-
-    def vertex_not_similar_to_previous(polygon, i):
-        diff = np.subtract(polygon[i-1], polygon[i])
-        return i==0 or np.linalg.norm(diff, np.inf) > tolerance
-
-    return [p for i, p in enumerate(polygon) if vertex_not_similar_to_previous(polygon, i)]
+    polygon = as_points(polygon)
+    if not len(polygon):
+        return Polygon()
+    inner_point = _get_inner_point(polygon)
+    polygon = polygon[np.argsort(_get_angle_in_radians(inner_point, polygon.T), kind='stable')]
+
+    # a vertex is kept when it is not similar to the previous one, the first one always
+    diff = np.abs(polygon - previous_vertices(polygon)).max(axis=1)
+    keep = diff > tolerance
+    keep[0] = True
+    return Polygon(polygon[keep])
 
 def _get_angle_in_radians(p1, p2):
     return np.arctan2(p2[1]-p1[1], p2[0]-p1[0])
 
 
 def _get_inner_point(polygon):
-    x_coords = [p[0] for p in polygon]
-    y_coords = [p[1] for p in polygon]
+    polygon = as_points(polygon)
+    x_coords = polygon[:, 0]
+    y_coords = polygon[:, 1]
     return [(np.max(x_coords)+np.min(x_coords)) / 2.,(np.max(y_coords)+np.min(y_coords)) / 2.]
 
 
 def get_visible_range_points_in_room (rotate_polygon,room_polygon,intersection_polygon):
+    rotate_polygon = as_points(rotate_polygon)
+    room_polygon = as_points(room_polygon)
+
     # keep the points in the room of the rotate_polygon 
-    rotate_polygon_in_room_list = []
-    for point in rotate_polygon:
-        if _point_in_polygon(point,room_polygon):
-            rotate_polygon_in_room_list.append(point)
+    rotate_polygon_in_room = rotate_polygon[_points_in_polygon(rotate_polygon, room_polygon)]
 
     # keep the room point which is in the rotate_polygon
-    room_point_in_rotate_polygon_list = []
-    for point in room_polygon:
-        if _point_in_polygon(point,rotate_polygon):
-            room_point_in_rotate_polygon_list.append(point)       
-
-
+    room_point_in_rotate_polygon = room_polygon[_points_in_polygon(room_polygon, rotate_polygon)]
 
     # keep the points in the rotate_polygon of the room
-
-    rotate_final_list = []
-    rotate_final_list.extend(rotate_polygon_in_room_list)
-    rotate_final_list.extend(room_point_in_rotate_polygon_list)
-    rotate_final_list.extend(intersection_polygon)
-    rotate_final_list=_sort_vertices_anti_clockwise_and_remove_duplicates(rotate_final_list)
-
-    return rotate_final_list
+    rotate_final = np.concatenate([rotate_polygon_in_room, room_point_in_rotate_polygon, as_points(intersection_polygon)])
+    return _sort_vertices_anti_clockwise_and_remove_duplicates(rotate_final)
+
+def _points_in_polygon(points, polygon):
+    # _point_in_polygon() of (M,2) points at once
+    points = as_points(points)
+    polygon = as_points(polygon)
+    poly1_x, poly1_y = polygon[:, 0], polygon[:, 1]
+    previous = previous_vertices(polygon)
+    poly2_x, poly2_y = previous[:, 0], previous[:, 1]
+    point_x, point_y = points[:, 0:1], points[:, 1:2]
+    result = ( point_y - poly1_y ) * (poly2_x - poly1_x) - (point_x - poly1_x) * (poly2_y - poly1_y)
+
+    # point lies on left / right of every edge
+    num_poly = len(polygon)
+    pos_cnt = (result > 0).sum(axis=1)
+    neg_cnt = (result < 0).sum(axis=1)
+    # all in same direction indicates point in the polygon
+    return (pos_cnt == num_poly) | (neg_cnt == num_poly)
 
 def _point_in_polygon(point,polygon):
+    # plain floats, one tolist() for an array / Polygon instead of numpy scalars per vertex
+    polygon = polygon.tolist() if hasattr(polygon, 'tolist') else polygon
     point_x , point_y = point[0], point[1]
     pos_cnt = neg_cnt = 0
     num_poly = len(polygon)
@@ -393,15 +430,307 @@ def _point_in_polygon(point,polygon):
             neg_cnt +=1
         else:
             pass        
-    # all in same direction indicates point out of the polygon
+    # all in same direction indicates point in the polygon
     if (pos_cnt == num_poly) or (neg_cnt == num_poly):
         return True
     else:
         return False 
 
 
+def get_room_polygon(room_width, room_height):
+    ''' get the polygon of the room, the camera is placed on the y = room_height side.
+
+    Args:
+        room_width (float): the room width. valid range: 0.0-30.0 m
+        room_height (float): the room height. valid range: 0.0-30.0 m
+
+    Returns:
+        room_polygon (list): [[x,y],...] the 4 corners of the room in m
+
+    '''
+
+    return [[0,0],[0,room_height],[room_width,room_height],[room_width,0]]
+
+
+def _rotate_point(point, center, deg):
+    # rotate point around center by -deg (clockwise)
+    dx = point[0] - center[0]
+    dy = point[1] - center[1]
+    rad = deg * pi / 180
+    return [center[0] + dx * cos(rad) + dy * sin(rad),
+            center[1] - dx * sin(rad) + dy * cos(rad)]
+
+
+def get_rotate_polygon(cam_x_pos, cam_y_pos, face_hdeg, height, half_hfov, min_v_distance, max_v_distance, min_h_distance, max_h_distance):
+    ''' get the visible trapezoid on the floor, rotated to the horizontal camera face degree.
+
+    Args:
+        cam_x_pos (float): x position of the camera in m
+        cam_y_pos (float): y position of the camera in m
+        face_hdeg (int): the horizontal camera face degree. valid range: 0-180 degree
+        height (int): the height to set the camera. valid range: 150-300 cm
+        half_hfov (float): the half of camera horizontal FOV. valid range: 0-180 degree
+        min_v_distance (float/str): from cal_theorical_min_max_distance()
+        max_v_distance (float/str): from cal_theorical_min_max_distance()
+        min_h_distance (float/str): from cal_theorical_min_max_distance()
+        max_h_distance (float/str): from cal_theorical_min_max_distance()
+
+    Returns:
+        rotate_polygon (list): [left_top, left_bottom, right_bottom, right_top] as [x,y] in m
+
+    '''
+
+    #change value for Inf to MAX_NUM_INF
+    if min_v_distance == 'Inf':
+        min_v_distance = MAX_NUM_INF
+    if min_h_distance == 'Inf':
+        min_h_distance = cal_h_distance(min_v_distance,half_hfov,height)
+    if max_v_distance == 'Inf':
+        max_v_distance = MAX_NUM_INF
+    if max_h_distance == 'Inf':
+        max_h_distance = cal_h_distance(max_v_distance,half_hfov,height)
+
+    # user chosen camera face horizontal degree
+    # face_hdeg       : 0    45    90   135   180
+    # rotate_deg_user : 90   45    0    -45   -90
+    rotate_deg_user = (face_hdeg * (-1) + 90)
+
+    left_bottom_y = right_bottom_y = (cam_y_pos - min_v_distance)
+    left_bottom_x = cam_x_pos - min_h_distance/2
+    right_bottom_x = cam_x_pos + min_h_distance/2
+
+    left_top_y = right_top_y = cam_y_pos - max_v_distance
+    left_top_x = cam_x_pos - max_h_distance/2
+    right_top_x = cam_x_pos + max_h_distance/2
+
+    cam_pos = [cam_x_pos, cam_y_pos]
+    return [ _rotate_point([left_top_x,left_top_y], cam_pos, rotate_deg_user),\
+             _rotate_point([left_bottom_x,left_bottom_y], cam_pos, rotate_deg_user),\
+             _rotate_point([right_bottom_x,right_bottom_y], cam_pos, rotate_deg_user),\
+             _rotate_point([right_top_x,right_top_y], cam_pos, rotate_deg_user) ]
+
+
+def get_visible_polygon(rotate_polygon, room_polygon):
+    ''' clip the rotated trapezoid with the room.
+
+    Args:
+        rotate_polygon (list): from get_rotate_polygon()
+        room_polygon (list): from get_room_polygon(), must be convex
+
+    Returns:
+        visible_polygon (list): [[x,y],...] the visible range in the room, [] if nothing is visible
+
+    '''
+
+    # one Sutherland-Hodgman pass replaces intersect() + get_visible_range_points_in_room(),
+    # the vertices come out ordered so no angular sort is needed
+    return clip_convex_polygon(rotate_polygon, room_polygon)
+
+
+def compute_footprint(room, camera, fov, frustum=False):
+    ''' calculate the visible floor range of one camera without any GUI:
+        compute_footprint((10.0, 10.0), (45, 90, 250, 500), (90, 52))
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        camera (tuple): (face_vdeg, face_hdeg, cam_height, cam_width) same as the trackbar values,
+                        degree, degree, cm, cm. The camera is placed on the y = room_height side.
+        fov (tuple/str): (HFOV, VFOV) in degree, a CameraModel or a model id of cameras.json
+        frustum (bool): intersect the real camera frustum with the floor (frustum.project_frustum_batch())
+                        instead of the trapezoid of get_rotate_polygon()
+
+    Returns:
+        visible_polygon (list): [[x,y],...] the visible range in the room in m, [] if nothing is visible
+
+    '''
+
+    if isinstance(fov, str):
+        # camera_catalog imports this module
+        from camera_catalog import get_fov
+        fov = get_fov(fov)
+    if frustum:
+        # frustum imports this module
+        from frustum import compute_frustum_footprint
+        return compute_frustum_footprint(room, camera, fov)
+
+    room_width, room_height = room
+    face_vdeg, face_hdeg, height, width = camera
+    h_fov, v_fov = fov
+
+    distances = cal_theorical_min_max_distance(face_vdeg, height, v_fov/2, h_fov/2)
+    rotate_polygon = get_rotate_polygon(width/100, room_height, face_hdeg, height, h_fov/2, *distances)
+    return get_visible_polygon(rotate_polygon, get_room_polygon(room_width, room_height))
+
+
+def compute_person_footprint(room, camera, fov, p_height):
+    ''' calculate the floor range where a person of p_height is visible, without any GUI:
+        compute_person_footprint((10.0, 10.0), (45, 90, 250, 500), (90, 52), 170)
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        camera (tuple): (face_vdeg, face_hdeg, cam_height, cam_width) same as compute_footprint()
+        fov (tuple/str): (HFOV, VFOV) in degree, a CameraModel or a model id of cameras.json
+        p_height (int): human height. valid range: 100-200 cm
+
+    Returns:
+        visible_polygon (list): [[x,y],...] in m, [] if nothing is visible or the distances are 'Invalid'
+
+    '''
+
+    if isinstance(fov, str):
+        from camera_catalog import get_fov
+        fov = get_fov(fov)
+    room_width, room_height = room
+    face_vdeg, face_hdeg, height, width = camera
+    h_fov, v_fov = fov
+
+    min_v_distance, max_v_distance, min_h_distance, max_h_distance = cal_theorical_min_max_distance(face_vdeg, height, v_fov/2, h_fov/2)
+    person_distances = cal_min_max_distance_with_human_height(p_height, height, min_v_distance, max_v_distance, face_vdeg, v_fov/2, h_fov/2)
+    if 'Invalid' in person_distances:
+        return []
+    rotate_polygon = get_rotate_polygon(width/100, room_height, face_hdeg, height, h_fov/2, *person_distances)
+    return get_visible_polygon(rotate_polygon, get_room_polygon(room_width, room_height))
+
+def draw_info_panel(min_v_distance, max_v_distance, min_h_distance, max_h_distance, min_v_distance_person, max_v_distance_person, min_h_distance_person, max_h_distance_person):
+    ''' draw the distances as text for the WINDOW_NAME window.
+
+    Args:
+        min_v_distance ... max_h_distance (float/str): from cal_theorical_min_max_distance()
+        min_v_distance_person ... max_h_distance_person (float/str): from cal_min_max_distance_with_human_height()
+
+    Returns:
+        base_img (ndarray): the image of the info panel
+
+    '''
+
+    import cv2
+    base_img = np.zeros((400,1400,3),np.uint8)
+
+    # Get the color of each distance
+    max_v_color, min_v_color, max_h_color, min_h_color, max_v_person_color, min_v_person_color, max_h_person_color, min_h_person_color = set_min_max_distance_colormap(
+        max_v_distance,
+        min_v_distance,
+        max_h_distance,
+        min_h_distance,
+        max_v_distance_person,
+        min_v_distance_person,
+        max_h_distance_person,
+        min_h_distance_person)
+
+    cv2.putText(base_img, f'Horizontal FOV: {HFOV} degree, Vertical FOV: {VFOV} degree', (20,20), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 255, 255), 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'==== Before Consider human height ====', (20,60), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255,255,255), 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'the max vertical distance is {max_v_distance} m', (20,100), cv2.FONT_HERSHEY_SIMPLEX, 0.75, max_v_color, 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'the min vertical distance is {min_v_distance} m', (20,140), cv2.FONT_HERSHEY_SIMPLEX, 0.75, min_v_color, 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'the max horizontal distance is {max_h_distance} m', (20,180), cv2.FONT_HERSHEY_SIMPLEX, 0.75, max_h_color, 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'the min horizontal distance is {min_h_distance} m', (20,220), cv2.FONT_HERSHEY_SIMPLEX, 0.75, min_h_color, 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'==== After Consider human height ====', (600,60), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0,155,255), 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'the max vertical distance is {max_v_distance_person} m', (600,100), cv2.FONT_HERSHEY_SIMPLEX, 0.75, max_v_person_color, 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'the min vertical distance is {min_v_distance_person} m', (600,140), cv2.FONT_HERSHEY_SIMPLEX, 0.75, min_v_person_color, 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'the max horizontal distance is {max_h_distance_person} m', (600,180), cv2.FONT_HERSHEY_SIMPLEX, 0.75, max_h_person_color, 1, cv2.LINE_AA)
+    cv2.putText(base_img, f'the min horizontal distance is {min_h_distance_person} m', (600,220), cv2.FONT_HERSHEY_SIMPLEX, 0.75, min_h_person_color, 1, cv2.LINE_AA)
+    return base_img
+
+
+def draw_room(room_width, room_height, visible_polygon, timer=NULL_TIMER):
+    ''' draw the room and the visible range for the ROOM_WINDOW_NAME window.
+
+    Args:
+        room_width (float): the room width in m
+        room_height (float): the room height in m
+        visible_polygon (list/ndarray/Polygon): [[x,y],...] from get_visible_polygon()
+        timer (StageTimer): times the fill, text and resize steps
+
+    Returns:
+        new_img (ndarray): the image of the room, about 600 pixel on the longer side
+
+    '''
+
+    import cv2
+
+    # plot for visible range
+    window_height_bias = room_height * 100 * WINDOW_BIAS_PERCENTAGE / 100
+    window_width_bias = room_width * 100 * WINDOW_BIAS_PERCENTAGE /100
+    window_bias = max(window_height_bias,window_width_bias)
+    room_line_bias = window_bias * ROOM_LINE_BIAS_PERCENTAGE /100
+
+    window_height = int(room_height*100+window_bias)
+    window_width = int(room_width*100+window_bias)
+
+    new_img = np.zeros((window_height,window_width,3),np.uint8)
+
+    # map the min, max distance to x,y axis
+    room_list_arr = np.array(get_room_polygon(room_width, room_height),dtype=float)
+    room_pts = room_list_arr*100 + room_line_bias
+    room_pts = room_pts.astype(np.int32)
+    # map coordinate to (頂點數量, 1, 2) array
+    room_pts = room_pts.reshape((-1, 1, 2))
+
+    # # plot the visible range
+    if len(visible_polygon):
+        rot_point_arr = np.asarray(visible_polygon, dtype=float)
+        rot_point_pts = rot_point_arr*100 + room_line_bias
+        rot_point_pts = rot_point_pts.astype(np.int32)
+        rot_point_pts = rot_point_pts.reshape((-1,1,2))
+        with timer.stage('draw_room.fill'):
+            cv2.polylines(new_img, [rot_point_pts], True, (255, 50, 255), 4)
+            cv2.fillPoly(new_img, [rot_point_pts], (255,50,255))
+
+    # get scale of font size
+    ratio = 600 / max(window_height,window_width)
+    resize_window_width = round(window_width * ratio)
+    resize_window_height = round(window_height * ratio)
+    fontScale = 1/ratio
+
+    if max(window_height,window_width) < 512:
+        font_thickness = 1
+    elif max(window_height,window_width) < 1024:
+        font_thickness = 2
+    elif max(window_height,window_width) < 2048:
+        font_thickness = 4
+    else:
+        font_thickness = 8
+
+    with timer.stage('draw_room.text'):
+        # print rotation coordinate
+        if len(visible_polygon):
+            for i in range(len(rot_point_arr)):
+                cv2.putText(new_img, f'({rot_point_arr[i][0]:.1f},{rot_point_arr[i][1]:.1f}) ', tuple(rot_point_pts[i][0]), cv2.FONT_HERSHEY_COMPLEX_SMALL, fontScale,  (0,0,255), font_thickness, cv2.LINE_AA)
+
+        # print room coordinate
+        for i in range(len(room_list_arr)):
+            cv2.putText(new_img, f'({room_list_arr[i][0]:.1f},{room_list_arr[i][1]:.1f}) ', tuple(room_pts[i][0]), cv2.FONT_HERSHEY_COMPLEX_SMALL, fontScale,  (0,0,255), font_thickness, cv2.LINE_AA)
+
+    cv2.polylines(new_img, [room_pts], True, (255, 255, 255), 4)
+
+    with timer.stage('draw_room.resize'):
+        return cv2.resize(new_img, (resize_window_width,resize_window_height),interpolation=cv2.INTER_CUBIC)
+
+
+def draw_timing_overlay(img, timer):
+    ''' write the frame time / FPS and the slowest stages of the last frame at the bottom of the info panel.
+
+    Args:
+        img (ndarray): from draw_info_panel(), not changed
+        timer (StageTimer): the timer of the GUI loop
+
+    Returns:
+        new_img (ndarray): a copy of img with the timings
+
+    '''
+
+    import cv2
+    new_img = img.copy()
+    cv2.putText(new_img, f'frame {timer.frame_time_ms:.2f} ms ({timer.fps:.0f} FPS)', (20,300), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255,255,255), 1, cv2.LINE_AA)
+    # the stages that ran in the last frame, slowest first
+    stages = sorted(timer.last_frame.items(), key=lambda item: -item[1])[:TIMING_OVERLAY_STAGES]
+    text = ', '.join(f'{name} {duration/1e6:.2f}' for name, duration in stages)
+    cv2.putText(new_img, f'ms: {text}', (20,340), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255,255,255), 1, cv2.LINE_AA)
+    return new_img
+
+
 class TkApp:
     def __init__(self, master):
+        import tkinter as tk
         self.master = master
         master.title("Room Parameter Controller")
 
@@ -467,6 +796,35 @@ class TkApp:
 
 # main thread
 if __name__ == '__main__':
+    import argparse
+    import cv2
+    import tkinter as tk
+    from fov_cache import FovCache
+    from pipeline import FramePipeline
+    from stage_timer import StageTimer
+
+    # python fov_checker.py [ATLAS_DIR] [--camera MODEL_ID [--catalog cameras.json]] [--frustum] [--profile] [--trace trace.json]
+    parser = argparse.ArgumentParser(description='check the visible range of a camera in a room')
+    parser.add_argument('atlas', nargs='?', help='read the distances from an atlas built by atlas.py')
+    parser.add_argument('--camera', help='use the FOV of this camera model of the catalog instead of HFOV / VFOV')
+    parser.add_argument('--catalog', help='the camera catalog file of --camera, default cameras.json')
+    parser.add_argument('--frustum', action='store_true', help='draw the floor cut of the camera frustum instead of the trapezoid')
+    parser.add_argument('--profile', action='store_true', help='time every stage and show the frame time in the info panel')
+    parser.add_argument('--trace', help='with --profile, write a Chrome trace (chrome://tracing, ui.perfetto.dev) here on exit')
+    args = parser.parse_args()
+
+    half_hfov, half_vfov = H_HFOV, H_VFOV
+    if args.camera:
+        from camera_catalog import DEFAULT_CATALOG_FILE
+        from camera_catalog import load_catalog
+        model = load_catalog(args.catalog or DEFAULT_CATALOG_FILE)[args.camera]
+        half_hfov, half_vfov = model.half_hfov, model.half_vfov
+
+    atlas = None
+    if args.atlas:
+        from atlas import FovAtlas
+        atlas = FovAtlas(args.atlas)
+    timer = StageTimer(enabled=args.profile or bool(args.trace))
 
     # create Tk window to let user input room size
     root = tk.Tk()
@@ -475,212 +833,44 @@ if __name__ == '__main__':
 
     # Create window and setup the initial values of the trackbar in window
     window_init(WINDOW_NAME)
+    cv2.namedWindow(ROOM_WINDOW_NAME, cv2.WINDOW_KEEPRATIO | cv2.WINDOW_AUTOSIZE)
+    pipeline = FramePipeline(half_hfov, half_vfov, atlas, FovCache(), timer, frustum=args.frustum)
 
     while (True):
-        base_img = np.zeros((400,1400,3))
+        # block in waitKey until a GUI event comes, the trackbar callbacks set trackbar_dirty
+        if cv2.waitKey(IDLE_WAIT_MS) == ord('q'):
+            break
+        if not trackbar_dirty:
+            continue
+        trackbar_dirty = False
 
         # read back trackbar values (face_vdeg, face_hdeg, height, width, p_height)
         face_vdeg, face_hdeg, height, width, p_height =  get_trackbar_values(WINDOW_NAME)
 
-        # Calculate the theorical range of the camera visible area
-        min_v_distance ,max_v_distance, min_h_distance, max_h_distance = cal_theorical_min_max_distance(
-            face_vdeg,
-            height,
-            H_VFOV,
-            H_HFOV)
-
-        # Calculate the range consider with human height
-        min_v_distance_person, max_v_distance_person,min_h_distance_person, max_h_distance_person = cal_min_max_distance_with_human_height(
-            p_height,
-            height,
-            min_v_distance,
-            max_v_distance,
-            face_vdeg,
-            H_VFOV,
-            H_HFOV)
-
-        # Get the color of each distance
-        max_v_color, min_v_color, max_h_color, min_h_color, max_v_person_color, min_v_person_color, max_h_person_color, min_h_person_color = set_min_max_distance_colormap(
-            max_v_distance,
-            min_v_distance,
-            max_h_distance,
-            min_h_distance,
-            max_v_distance_person,
-            min_v_distance_person,
-            max_h_distance_person,
-            min_h_distance_person)
-
-        cv2.putText(base_img, f'Horizontal FOV: {HFOV} degree, Vertical FOV: {VFOV} degree', (20,20), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 255, 255), 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'==== Before Consider human height ====', (20,60), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255,255,255), 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'the max vertical distance is {max_v_distance} m', (20,100), cv2.FONT_HERSHEY_SIMPLEX, 0.75, max_v_color, 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'the min vertical distance is {min_v_distance} m', (20,140), cv2.FONT_HERSHEY_SIMPLEX, 0.75, min_v_color, 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'the max horizontal distance is {max_h_distance} m', (20,180), cv2.FONT_HERSHEY_SIMPLEX, 0.75, max_h_color, 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'the min horizontal distance is {min_h_distance} m', (20,220), cv2.FONT_HERSHEY_SIMPLEX, 0.75, min_h_color, 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'==== After Consider human height ====', (600,60), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0,155,255), 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'the max vertical distance is {max_v_distance_person} m', (600,100), cv2.FONT_HERSHEY_SIMPLEX, 0.75, max_v_person_color, 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'the min vertical distance is {min_v_distance_person} m', (600,140), cv2.FONT_HERSHEY_SIMPLEX, 0.75, min_v_person_color, 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'the max horizontal distance is {max_h_distance_person} m', (600,180), cv2.FONT_HERSHEY_SIMPLEX, 0.75, max_h_person_color, 1, cv2.LINE_AA)
-        cv2.putText(base_img, f'the min horizontal distance is {min_h_distance_person} m', (600,220), cv2.FONT_HERSHEY_SIMPLEX, 0.75, min_h_person_color, 1, cv2.LINE_AA)
-        # Start to calculate visible range for coordinate point
-
-        cam_x_pos =  width/100 # x position in m
-        cam_y_pos =  room_height
-        left_top_add_en = 0
-        right_top_add_en = 0
-
-
-        ## Greg test
-
-        #change value for Inf to MAX_NUM_INF
-        if min_v_distance == 'Inf':
-            min_v_distance = MAX_NUM_INF
-        if min_h_distance == 'Inf':
-            min_h_distance = cal_h_distance(min_v_distance,H_HFOV,height)
-        if max_v_distance == 'Inf':
-            max_v_distance = MAX_NUM_INF
-        if max_h_distance == 'Inf':
-            max_h_distance = cal_h_distance(max_v_distance,H_HFOV,height)
-
-        # user chosen camera face horizontal degree
-        # face_hdeg       : 0    45    90   135   180
-        # rotate_deg_user : 90   45    0    -45   -90
-        rotate_deg_user = (face_hdeg * (-1) + 90) 
-
-        left_bottom_y = right_bottom_y = (cam_y_pos - min_v_distance)
-        left_bottom_x = cam_x_pos - min_h_distance/2
-        right_bottom_x = cam_x_pos + min_h_distance/2
-
-        left_top_y = right_top_y = cam_y_pos - max_v_distance
-        left_top_x = cam_x_pos - max_h_distance/2
-        right_top_x = cam_x_pos + max_h_distance/2
-
-        # calculate right_bottom x,y after rotation
-        try:
-            deg = degrees(atan((right_bottom_y*(1)-cam_y_pos*(1))/(right_bottom_x - cam_x_pos)))
-        except:
-            print('degree error')    
-        rotate_deg = ( (deg-rotate_deg_user) *pi /180)
-        distance = sqrt((right_bottom_y -cam_y_pos)**2 + (right_bottom_x - cam_x_pos )**2) 
-
-        rotate_right_bottom_x = cam_x_pos + (distance) * cos(rotate_deg)
-        rotate_right_bottom_y = cam_y_pos + (distance) * sin(rotate_deg)
-        
-
-        # calculate right_top x,y after rotation
-        try:
-            deg = degrees(atan((right_top_y*(1)-cam_y_pos*(1))/(right_top_x - cam_x_pos)))
-        except:
-            print('degree error')        
-        rotate_deg = ( (deg-rotate_deg_user) *pi /180)
-        distance = sqrt((right_top_y -cam_y_pos)**2 + (right_top_x - cam_x_pos )**2) 
-
-        rotate_right_top_x = cam_x_pos + (distance) * cos(rotate_deg)
-        rotate_right_top_y = cam_y_pos + (distance) * sin(rotate_deg)
-
-        # calculate left_bottom x,y after rotation
-        try:
-            deg = degrees(atan((left_bottom_y*(1)-cam_y_pos*(1))/(left_bottom_x - cam_x_pos)))
-        except:
-            print('degree error')    
-        rotate_deg = ( (deg-rotate_deg_user) *pi /180)
-        distance = sqrt((left_bottom_y -cam_y_pos)**2 + (left_bottom_x - cam_x_pos )**2) 
-        rotate_left_bottom_x = cam_x_pos - (distance) * cos(rotate_deg)
-        rotate_left_bottom_y = cam_y_pos - (distance) * sin(rotate_deg)
-
-
-        # calculate left_top x,y after rotation
-        try:
-            deg = degrees(atan((left_top_y*(1)-cam_y_pos*(1))/(left_top_x - cam_x_pos)))
-        except:
-            print('degree error')     
-        rotate_deg = ( (deg-rotate_deg_user) *pi /180)
-        distance = sqrt((left_top_y -cam_y_pos)**2 + (left_top_x - cam_x_pos )**2) 
-        rotate_left_top_x = cam_x_pos - (distance) * cos(rotate_deg)
-        rotate_left_top_y = cam_y_pos - (distance) * sin(rotate_deg)
-
-        # find intersection with room and rotate_polygon!!!
-        room_polygon = [[0,0],[0,room_height],[room_width,room_height],[room_width,0]]
-        rotate_polygon = [ [rotate_left_top_x,rotate_left_top_y],\
-                           [rotate_left_bottom_x,rotate_left_bottom_y],\
-                           [rotate_right_bottom_x,rotate_right_bottom_y],\
-                           [rotate_right_top_x,rotate_right_top_y] ]
-
-        rotate_polygon_intersection = intersect(room_polygon, rotate_polygon)
-        rotate_final_list = get_visible_range_points_in_room (rotate_polygon,room_polygon,rotate_polygon_intersection)
-        ## Greg Test Done        
-
-        cv2.imshow(WINDOW_NAME, base_img)
-        if cv2.waitKey(1) == ord('q'):
-            break
-
-
-        # plot for visible range
-        window_height_bias = room_height * 100 * WINDOW_BIAS_PERCENTAGE / 100
-        window_width_bias = room_width * 100 * WINDOW_BIAS_PERCENTAGE /100
-        window_bias = max(window_height_bias,window_width_bias)
-        room_line_bias = window_bias * ROOM_LINE_BIAS_PERCENTAGE /100
-        poly_line_bias = window_bias * POLY_LINE_BIAS_PERCENTAGE /100 
-
-        
-        window_height = int(room_height*100+window_bias)
-        window_width = int(room_width*100+window_bias)
-
-        new_img = np.zeros((window_height,window_width,3),np.uint8)
-        room_height_cm_int = int(room_height*100)
-        room_width_cm_int = int(room_width*100)
-
-
-        # map the min, max distance to x,y axis
-        room_list_arr = np.array([ [0,0],[0,room_height],[room_width,room_height],[room_width,0] ],dtype=float)
-        room_pts = room_list_arr*100 + room_line_bias
-        room_pts = room_pts.astype(np.int32)
-        # map coordinate to (頂點數量, 1, 2) array
-        room_pts = room_pts.reshape((-1, 1, 2))
-
-        cv2.namedWindow('ROOM', cv2.WINDOW_KEEPRATIO | cv2.WINDOW_AUTOSIZE)
-        # # plot the visible range
-        if rotate_final_list:
-            rot_point_arr = np.array(rotate_final_list)
-            rot_point_pts = rot_point_arr*100 + room_line_bias
-            rot_point_pts = rot_point_pts.astype(np.int32)
-            rot_point_pts = rot_point_pts.reshape((-1,1,2))
-            cv2.polylines(new_img, [rot_point_pts], True, (255, 50, 255), 4)
-            cv2.fillPoly(new_img, [rot_point_pts], (255,50,255)) 
-
-
-        # get scale of font size
-
-        ratio = 600 / max(window_height,window_width)
-        resize_window_width = round(window_width * ratio)
-        resize_window_height = round(window_height * ratio)
-        fontScale = 1/ratio
-
-        if max(window_height,window_width) < 512:
-            font_thickness = 1
-        elif max(window_height,window_width) < 1024:
-            font_thickness = 2
-        elif max(window_height,window_width) < 2048:
-            font_thickness = 4    
-        else:
-            font_thickness = 8    
-
-        # print rotation coordinate
-        if rotate_final_list:
-            for i in range(len(rot_point_arr)):
-                cv2.putText(new_img, f'({rot_point_arr[i][0]:.1f},{rot_point_arr[i][1]:.1f}) ', tuple(rot_point_pts[i][0]), cv2.FONT_HERSHEY_COMPLEX_SMALL, fontScale,  (0,0,255), font_thickness, cv2.LINE_AA)
-
-        # print room coordinate
-        for i in range(len(room_list_arr)):
-            cv2.putText(new_img, f'({room_list_arr[i][0]:.1f},{room_list_arr[i][1]:.1f}) ', tuple(room_pts[i][0]), cv2.FONT_HERSHEY_COMPLEX_SMALL, fontScale,  (0,0,255), font_thickness, cv2.LINE_AA)
-
-        cv2.polylines(new_img, [room_pts], True, (255, 255, 255), 4)
-
-
-        new_img = cv2.resize(new_img, (resize_window_width,resize_window_height),interpolation=cv2.INTER_CUBIC)
-
-        cv2.imshow('ROOM', new_img)
-        if cv2.waitKey(1) == ord('q'):
-            break        
+        # only the stages after the changed trackbar are calculated again
+        changed = pipeline.update(
+            face_vdeg=face_vdeg,
+            face_hdeg=face_hdeg,
+            height=height,
+            width=width,
+            p_height=p_height,
+            room_width=room_width,
+            room_height=room_height)
+        if not changed:
+            continue
+
+        with timer.frame():
+            text_layer = pipeline.get('text_layer')
+            room_layer = pipeline.get('room_layer')
+            with timer.stage('imshow'):
+                cv2.imshow(ROOM_WINDOW_NAME, room_layer)
+
+        # the timings of the frame that just ended go under the distances
+        if timer.enabled:
+            text_layer = draw_timing_overlay(text_layer, timer)
+        cv2.imshow(WINDOW_NAME, text_layer)
 
 
     cv2.destroyAllWindows()
+    if args.trace:
+        timer.export_chrome_trace(args.trace)
@@ -0,0 +1,388 @@
+''' a local HTTP/JSON service for the distances and footprints, for frontends that ask on every keystroke:
+    python fov_service.py [--host 127.0.0.1] [--port 8765] [--processes N] [--cache-size 65536]
+
+    POST /distances   {"face_vdeg": 45, "height": 250, "p_height": 170, "hfov": 90, "vfov": 52}
+                      the 8 distances of the info panel ('Inf', 'Invalid' as in the GUI)
+    POST /footprint   {"room_width": 10, "room_height": 10, "face_vdeg": 45, "face_hdeg": 90,
+                       "height": 250, "width": 500, "p_height": 170}
+                      the distances, footprint ([[x,y],...] in m) and area, same as the rows of batch_cli.py
+    GET  /health      cache and batch counters
+
+    hfov / vfov are optional (default HFOV, VFOV, or the effective FOV of "model", a camera model id of cameras.json),
+    "id" is copied to the result. A body can be one row (one result)
+    or a list of rows / {"rows": [...]} (a list of results). The rows of the requests that arrive together are
+    calculated as one vectorized batch in a process pool, the results are kept in one LRU cache for all clients.
+    The workers never import cv2 or tkinter.
+'''
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_cli import INPUT_COLUMNS
+from batch_cli import _get_row_fov
+from batch_cli import _to_scalar_distances
+from batch_cli import process_rows
+from fov_batch import cal_distances_batch
+from fov_cache import LRUCache
+
+## Constants ##
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# results kept for all clients together
+DEFAULT_SERVICE_CACHE_SIZE = 65536
+
+# a batch is sent this long after its first row came in, or as soon as it has MAX_BATCH_ROWS rows
+BATCH_WINDOW_S = 0.002
+MAX_BATCH_ROWS = 4096
+
+# larger request bodies are refused with 413
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+DISTANCE_INPUT_COLUMNS = ('face_vdeg', 'height', 'p_height')
+DISTANCE_COLUMNS = (
+    'min_v_distance', 'max_v_distance', 'min_h_distance', 'max_h_distance',
+    'min_v_distance_person', 'max_v_distance_person', 'min_h_distance_person', 'max_h_distance_person')
+
+# path -> (input columns, function calculating a list of rows in a worker)
+ENDPOINTS = {}
+
+HTTP_REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+## functions ##
+def process_distance_rows(rows):
+    ''' calculate the 8 distances of one batch of rows.
+
+    Args:
+        rows (list): dicts with the DISTANCE_INPUT_COLUMNS keys, hfov / vfov / model optional
+
+    Returns:
+        results (list): one dict of DISTANCE_COLUMNS and error per row, in order
+
+    '''
+
+    values = np.zeros((len(rows), len(DISTANCE_INPUT_COLUMNS) + 2))
+    errors = [None] * len(rows)
+    for i, row in enumerate(rows):
+        key = _get_cache_key(DISTANCE_INPUT_COLUMNS, row)
+        if isinstance(key, str):
+            errors[i] = key
+        else:
+            values[i] = key
+
+    face_vdeg, height, p_height, hfov, vfov = values.T
+    distance_columns = [_to_scalar_distances(d) for d in cal_distances_batch(face_vdeg, height, p_height, vfov/2, hfov/2)]
+    results = []
+    for i, row in enumerate(rows):
+        result = {'id': row.get('id', '') if isinstance(row, dict) else ''}
+        if errors[i] is None:
+            result.update(zip(DISTANCE_COLUMNS, (d[i] for d in distance_columns)), error='')
+        else:
+            result.update(dict.fromkeys(DISTANCE_COLUMNS, ''), error=errors[i])
+        results.append(result)
+    return results
+
+
+ENDPOINTS['/distances'] = (DISTANCE_INPUT_COLUMNS, process_distance_rows)
+ENDPOINTS['/footprint'] = (INPUT_COLUMNS, process_rows)
+
+
+def _get_cache_key(columns, row):
+    # the row values as floats (hfov / vfov filled in like batch_cli._parse_rows()), an error string for a bad row
+    if not isinstance(row, dict):
+        return f'not a row: {row!r:.100}'
+    try:
+        return tuple(float(row[c]) for c in columns) + _get_row_fov(row)
+    except (KeyError, TypeError, ValueError) as e:
+        return f'{type(e).__name__}: {e}'
+
+
+class MicroBatcher:
+    ''' coalesces the rows of concurrent calls into one call of a batch function in an executor.
+
+        batcher = MicroBatcher(process_rows, executor)
+        results = await batcher.submit(rows)
+
+        The first row of a batch starts a window of `window` seconds, every row submitted until then goes into the
+        same batch. A batch with max_batch rows is sent at once.
+
+    '''
+
+    def __init__(self, func, executor=None, window=BATCH_WINDOW_S, max_batch=MAX_BATCH_ROWS):
+        self.func = func
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        # (rows, future) of the batch being collected
+        self.pending = []
+        self.pending_rows = 0
+        self.timer = None
+        self.batch_count = 0
+        self.row_count = 0
+
+    async def submit(self, rows):
+        ''' calculate rows in the next batch, returns their results in order '''
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((rows, future))
+        self.pending_rows += len(rows)
+        if self.pending_rows >= self.max_batch:
+            self._flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.pending:
+            batch, self.pending, self.pending_rows = self.pending, [], 0
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        rows = [row for rows, _ in batch for row in rows]
+        self.batch_count += 1
+        self.row_count += len(rows)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.func, rows)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        start = 0
+        for rows, future in batch:
+            if not future.done():
+                future.set_result(results[start:start + len(rows)])
+            start += len(rows)
+
+
+class FovService:
+    ''' the endpoints of the service with their batchers and the shared result cache.
+
+        service = FovService(processes=4)
+        host, port = await service.start('127.0.0.1', 0)     # port 0: any free port
+        ...
+        await service.close()
+
+        handle() answers one request without a socket.
+
+    '''
+
+    def __init__(self, processes=None, cache_size=DEFAULT_SERVICE_CACHE_SIZE, window=BATCH_WINDOW_S, max_batch=MAX_BATCH_ROWS):
+        if processes is None:
+            processes = os.cpu_count() or 1
+        # processes 0: the batches run in the default thread pool of the loop.
+        # spawn, a forked worker would keep the client sockets open at the time of the fork.
+        # the workers ignore Ctrl+C, the server shuts them down
+        self.executor = None
+        if processes > 0:
+            self.executor = ProcessPoolExecutor(processes, multiprocessing.get_context('spawn'),
+                                                initializer=signal.signal, initargs=(signal.SIGINT, signal.SIG_IGN))
+        self.cache = LRUCache(cache_size)
+        self.batchers = {path: MicroBatcher(func, self.executor, window, max_batch) for path, (_, func) in ENDPOINTS.items()}
+        # (path, key) -> future of a row that is being calculated, the same row of another client waits for it
+        self.in_flight = {}
+        self.server = None
+        # task -> writer of the open connections
+        self.connections = {}
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        ''' start the workers and listen on host:port, returns the (host, port) it listens on '''
+        if self.executor is not None:
+            # the first request should not wait for the workers to import numpy
+            await asyncio.get_running_loop().run_in_executor(self.executor, process_distance_rows, [])
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        ''' stop listening, close the open connections and shut the process pool down '''
+        if self.server is not None:
+            self.server.close()
+            # a keep-alive connection waits for its next request: closed, it reads the end of the stream and returns
+            for writer in self.connections.values():
+                writer.close()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+    def stats(self):
+        ''' the counters of /health '''
+        return {
+            'status': 'ok',
+            'cache': self.cache.stats(),
+            'in_flight': len(self.in_flight),
+            'batches': {path: {'batches': b.batch_count, 'rows': b.row_count} for path, b in self.batchers.items()},
+        }
+
+    async def calculate(self, path, rows):
+        ''' the results of rows for an endpoint: from the cache, from a row in flight, or from the next batch '''
+        columns, _ = ENDPOINTS[path]
+        loop = asyncio.get_running_loop()
+        results = [None] * len(rows)
+        waiting = []
+        new_index = []
+        for i, row in enumerate(rows):
+            key = _get_cache_key(columns, row)
+            if isinstance(key, str):
+                new_index.append((i, None))
+                continue
+            key = (path, key)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            elif key in self.in_flight:
+                waiting.append((i, self.in_flight[key]))
+            else:
+                self.in_flight[key] = loop.create_future()
+                new_index.append((i, key))
+
+        if new_index:
+            try:
+                new_results = await self.batchers[path].submit([rows[i] for i, _ in new_index])
+                for (i, key), result in zip(new_index, new_results):
+                    results[i] = result
+                    if key is not None:
+                        self.cache.put(key, result)
+                        self.in_flight.pop(key).set_result(result)
+            finally:
+                # failed or cancelled: the keys must not stay in flight. Cancelled, not set_exception(), a future
+                # nobody waits for would log its exception, the waiting rows are calculated by their own request.
+                for _, key in new_index:
+                    future = self.in_flight.pop(key, None) if key is not None else None
+                    if future is not None:
+                        future.cancel()
+        for i, future in waiting:
+            try:
+                # shielded, a cancelled request must not cancel the row another request is calculating
+                results[i] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                results[i] = (await self.calculate(path, [rows[i]]))[0]
+
+        # the cached results are shared, only the id is the one of this request
+        return [dict(result, id=row.get('id', '') if isinstance(row, dict) else '') for row, result in zip(rows, results)]
+
+    async def handle(self, method, path, body):
+        ''' answer one request.
+
+        Args:
+            method (str): 'GET', 'POST', ...
+            path (str): the request path
+            body (bytes): the request body
+
+        Returns:
+            status (int): HTTP status
+            payload (object): the JSON response
+
+        '''
+
+        path = path.split('?')[0]
+        if path == '/health':
+            return (200, self.stats()) if method == 'GET' else (405, {'error': 'use GET'})
+        if path not in ENDPOINTS:
+            return 404, {'error': f'unknown path {path}, use /distances, /footprint or /health'}
+        if method != 'POST':
+            return 405, {'error': 'use POST with a JSON body'}
+        try:
+            request = json.loads(body or b'null')
+        except ValueError as e:
+            return 400, {'error': f'bad JSON: {e}'}
+
+        if isinstance(request, dict) and isinstance(request.get('rows'), list):
+            return 200, await self.calculate(path, request['rows'])
+        if isinstance(request, list):
+            return 200, await self.calculate(path, request)
+        if isinstance(request, dict):
+            return 200, (await self.calculate(path, [request]))[0]
+        return 400, {'error': 'the body must be a row, a list of rows or {"rows": [...]}'}
+
+    async def _handle_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive, one request after the other on a connection
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                if length > MAX_BODY_BYTES:
+                    status, payload, keep_alive = 413, {'error': f'body larger than {MAX_BODY_BYTES} bytes'}, False
+                elif method == 'OPTIONS':
+                    status, payload = 204, None
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    try:
+                        status, payload = await self.handle(method, path, body)
+                    except Exception as e:
+                        status, payload = 500, {'error': f'{type(e).__name__}: {e}'}
+                writer.write(_format_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.connections.pop(task, None)
+            writer.close()
+
+
+def _format_response(status, payload, keep_alive):
+    body = b'' if payload is None else json.dumps(payload).encode()
+    headers = [
+        f'HTTP/1.1 {status} {HTTP_REASONS.get(status, "")}',
+        'Content-Type: application/json',
+        f'Content-Length: {len(body)}',
+        f'Connection: {"keep-alive" if keep_alive else "close"}',
+        # the frontend is served from another local port
+        'Access-Control-Allow-Origin: *',
+        'Access-Control-Allow-Methods: GET, POST, OPTIONS',
+        'Access-Control-Allow-Headers: Content-Type',
+    ]
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body
+
+
+async def _serve(host, port, processes, cache_size):
+    service = FovService(processes, cache_size)
+    host, port = await service.start(host, port)
+    print(f'listening on http://{host}:{port}', file=sys.stderr, flush=True)
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='serve the distances and footprints over local HTTP/JSON')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='0 for any free port')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes, 0 to calculate in a thread')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_SERVICE_CACHE_SIZE)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port, args.processes, args.cache_size))
+    except KeyboardInterrupt:
+        pass
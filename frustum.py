@@ -0,0 +1,131 @@
+import numpy as np
+
+from clipping import clip_convex_polygon_by_halfplanes_batch
+from fov_batch import CHUNK_SIZE
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import get_room_polygon
+from polygon import PolygonBatch
+
+## Constants ##
+
+# a FOV above this is no longer a convex frustum
+MAX_FOV = 180
+
+
+## functions ##
+def get_camera_rotation_batch(face_vdeg, face_hdeg, roll_deg=0):
+    ''' get the rotation of many cameras from the camera frame (x right, y up, z along the optical axis)
+        to the room frame (x, y of get_room_polygon() on the floor, z up).
+
+    Args:
+        face_vdeg (array_like): pitch, the vertical camera face degree. 0 faces horizontal, 90 faces the floor
+        face_hdeg (array_like): yaw, the horizontal camera face degree. 0 faces -x, 90 faces -y, 180 faces +x
+        roll_deg (array_like): roll around the optical axis, > 0 turns the right side of the image up
+
+    Returns:
+        rotation (ndarray): (..., 3, 3) the columns are the right, up and forward directions of the camera
+
+    '''
+
+    pitch, yaw, roll = np.broadcast_arrays(*(np.radians(np.asarray(v, dtype=float)) for v in (face_vdeg, face_hdeg, roll_deg)))
+    cos_p, sin_p = np.cos(pitch), np.sin(pitch)
+    cos_r, sin_r = np.cos(roll), np.sin(roll)
+    zero = np.zeros_like(pitch)
+
+    # horizontal face direction and its right side, same directions as get_rotate_polygon()
+    face = np.stack([-np.cos(yaw), -np.sin(yaw), zero], axis=-1)
+    side = np.stack([-face[..., 1], face[..., 0], zero], axis=-1)
+    z = np.array([0.0, 0.0, 1.0])
+
+    forward = cos_p[..., None] * face - sin_p[..., None] * z
+    up = sin_p[..., None] * face + cos_p[..., None] * z
+    right = cos_r[..., None] * side + sin_r[..., None] * up
+    up = cos_r[..., None] * up - sin_r[..., None] * side
+    return np.stack([right, up, forward], axis=-1)
+
+
+def get_frustum_halfplanes_batch(rotation, cam_pos, plane_z, half_hfov, half_vfov):
+    ''' cut the 4 side planes of the camera frustums with a horizontal plane.
+
+    Args:
+        rotation (ndarray): (..., 3, 3) from get_camera_rotation_batch()
+        cam_pos (array_like): (..., 3) x, y, z of the cameras in m
+        plane_z (array_like): height of the horizontal plane in m, 0 for the floor
+        half_hfov (float/array_like): the half of camera horizontal FOV, one or one per camera. valid range: 0-90 degree
+        half_vfov (float/array_like): the half of camera vertical FOV, one or one per camera. valid range: 0-90 degree
+
+    Returns:
+        halfplanes (ndarray): (..., 4, 3) (a, b, c), the point (x, y) of the plane is in the frustum
+                              when a*x + b*y + c >= 0 for all 4
+
+    '''
+
+    # inward normals of the left, right, bottom and top planes in the camera frame:
+    # |x| <= tan(half_hfov) * z and |y| <= tan(half_vfov) * z, scaled by cos to stay finite at 90 degree
+    h, v = np.radians(np.asarray(half_hfov, dtype=float)), np.radians(np.asarray(half_vfov, dtype=float))
+    cos_h, sin_h, cos_v, sin_v = np.broadcast_arrays(np.cos(h), np.sin(h), np.cos(v), np.sin(v))
+    zero = np.zeros_like(cos_h)
+    normals = np.stack([
+        np.stack([cos_h, zero, sin_h], axis=-1),
+        np.stack([-cos_h, zero, sin_h], axis=-1),
+        np.stack([zero, cos_v, sin_v], axis=-1),
+        np.stack([zero, -cos_v, sin_v], axis=-1),
+    ], axis=-2)
+    normals = np.einsum('...kj,...ij->...ki', normals, rotation)
+
+    cam_pos = np.asarray(cam_pos, dtype=float)
+    cx, cy, cz = cam_pos[..., 0:1], cam_pos[..., 1:2], cam_pos[..., 2:3]
+    a, b = normals[..., 0], normals[..., 1]
+    c = normals[..., 2] * (np.asarray(plane_z, dtype=float)[..., None] - cz) - a * cx - b * cy
+    return np.stack([a, b, c], axis=-1)
+
+
+def project_frustum_batch(room, cameras, fov=(HFOV, VFOV), p_height=None, roll_deg=0):
+    ''' intersect the real camera frustums with the floor, cut at the room walls:
+        project_frustum_batch((10.0, 10.0), [(45, 90, 250, 500), ...], (90, 52), 170)
+
+        With p_height a floor point is only kept when the point p_height above it is in the frustum too.
+        The frustum is convex, so the whole person between feet and head is in the image.
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        cameras (array_like): [(face_vdeg, face_hdeg, cam_height, cam_width), ...] same as compute_footprint(),
+                              the cameras are placed on the y = room_height side
+        fov (tuple): (HFOV, VFOV) in degree, each one or one per camera. valid range: 0-180 degree
+        p_height (float/array_like): human height in cm, one or one per camera. None for the floor only
+        roll_deg (float/array_like): the camera roll in degree, one or one per camera
+
+    Returns:
+        footprints (PolygonBatch): the visible polygon of every camera, anti-clockwise, count 0 if nothing is visible
+
+    '''
+
+    room_width, room_height = room
+    h_fov, v_fov = (np.asarray(f, dtype=float) for f in fov)
+    if not (np.all((0 <= h_fov) & (h_fov <= MAX_FOV)) and np.all((0 <= v_fov) & (v_fov <= MAX_FOV))):
+        raise ValueError(f'fov must be within 0-{MAX_FOV} degree, got {fov}')
+
+    face_vdeg, face_hdeg, height, width = np.asarray(cameras, dtype=float).reshape(-1, 4).T
+    rotation = get_camera_rotation_batch(face_vdeg, face_hdeg, np.broadcast_to(roll_deg, face_vdeg.shape))
+    cam_pos = np.stack([width/100, np.full_like(width, room_height), height/100], axis=-1)
+
+    halfplanes = get_frustum_halfplanes_batch(rotation, cam_pos, 0.0, h_fov/2, v_fov/2)
+    if p_height is not None:
+        p_height = np.broadcast_to(np.asarray(p_height, dtype=float), face_vdeg.shape)
+        head = get_frustum_halfplanes_batch(rotation, cam_pos, p_height/100, h_fov/2, v_fov/2)
+        halfplanes = np.concatenate([halfplanes, head], axis=1)
+
+    # the far side of the frustum ends at the room walls
+    room_polygon = get_room_polygon(room_width, room_height)
+    vertices = np.full((len(halfplanes), len(room_polygon) + halfplanes.shape[1], 2), np.nan)
+    counts = np.zeros(len(halfplanes), dtype=np.int64)
+    for start in range(0, len(halfplanes), CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        vertices[chunk], counts[chunk], _ = clip_convex_polygon_by_halfplanes_batch(room_polygon, halfplanes[chunk])
+    return PolygonBatch(vertices, counts)
+
+
+def compute_frustum_footprint(room, camera, fov=(HFOV, VFOV), p_height=None, roll_deg=0):
+    ''' project_frustum_batch() of one camera, as the [[x,y],...] list of compute_footprint() '''
+    return project_frustum_batch(room, [camera], fov, p_height, roll_deg)[0].tolist()
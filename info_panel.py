@@ -0,0 +1,98 @@
+import numpy as np
+
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import get_distance_color
+from stage_timer import NULL_TIMER
+
+## Constants ##
+
+INFO_PANEL_SHAPE = (400, 1400, 3)
+
+# one line per distance, in the argument order of draw_info_panel(): (text, origin)
+VALUE_LINES = (
+    ('the min vertical distance is {} m', (20,140)),
+    ('the max vertical distance is {} m', (20,100)),
+    ('the min horizontal distance is {} m', (20,220)),
+    ('the max horizontal distance is {} m', (20,180)),
+    ('the min vertical distance is {} m', (600,140)),
+    ('the max vertical distance is {} m', (600,100)),
+    ('the min horizontal distance is {} m', (600,220)),
+    ('the max horizontal distance is {} m', (600,180)),
+)
+
+# the rows above / below the baseline of a value line that are cleared before it is drawn again
+LINE_ASCENT = 28
+LINE_DESCENT = 12
+# the right column starts here
+COLUMN_SPLIT = 600
+
+
+## functions ##
+def _put_text(img, text, origin, color, font_scale=0.75):
+    import cv2
+    cv2.putText(img, text, origin, cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, 1, cv2.LINE_AA)
+
+
+class InfoPanelRenderer:
+    ''' draws the same info panel as draw_info_panel() into a reused uint8 frame buffer.
+        The FOV header and the before / after banners never change, they are drawn once into a static layer.
+        A distance line is only drawn again when its text or color changed, its rows are restored from the
+        static layer first.
+
+        renderer = InfoPanelRenderer()
+        img = renderer.render(*distances, *person_distances)
+
+        The returned image is the frame buffer, the next render() draws over it.
+
+    '''
+
+    def __init__(self, hfov=HFOV, vfov=VFOV):
+        self.hfov = hfov
+        self.vfov = vfov
+        self.static = None
+        self.buffer = None
+        # (text, color) of every value line as it is in the buffer
+        self.lines = [None] * len(VALUE_LINES)
+        # value lines drawn so far, to see what a change costs
+        self.draw_count = 0
+
+    def _draw_static_layer(self):
+        static = np.zeros(INFO_PANEL_SHAPE, np.uint8)
+        _put_text(static, f'Horizontal FOV: {self.hfov:g} degree, Vertical FOV: {self.vfov:g} degree', (20,20), (255,255,255))
+        _put_text(static, f'==== Before Consider human height ====', (20,60), (255,255,255))
+        _put_text(static, f'==== After Consider human height ====', (600,60), (0,155,255))
+        return static
+
+    def render(self, min_v_distance, max_v_distance, min_h_distance, max_h_distance, min_v_distance_person, max_v_distance_person, min_h_distance_person, max_h_distance_person, timer=NULL_TIMER):
+        ''' draw the distances as text for the WINDOW_NAME window.
+
+        Args:
+            min_v_distance ... max_h_distance (float/str): from cal_theorical_min_max_distance()
+            min_v_distance_person ... max_h_distance_person (float/str): from cal_min_max_distance_with_human_height()
+            timer (StageTimer): times the text drawing
+
+        Returns:
+            img (ndarray): the frame buffer, uint8 (400, 1400, 3)
+
+        '''
+
+        if self.buffer is None:
+            self.static = self._draw_static_layer()
+            self.buffer = self.static.copy()
+
+        distances = (min_v_distance, max_v_distance, min_h_distance, max_h_distance,
+                     min_v_distance_person, max_v_distance_person, min_h_distance_person, max_h_distance_person)
+        with timer.stage('info_panel.text'):
+            for i, ((text, origin), distance) in enumerate(zip(VALUE_LINES, distances)):
+                line = (text.format(distance), get_distance_color(distance))
+                if line == self.lines[i]:
+                    continue
+                x, y = origin
+                rows = slice(max(y - LINE_ASCENT, 0), y + LINE_DESCENT)
+                columns = slice(0, COLUMN_SPLIT) if x < COLUMN_SPLIT else slice(COLUMN_SPLIT, None)
+                self.buffer[rows, columns] = self.static[rows, columns]
+                _put_text(self.buffer, line[0], origin, line[1])
+                self.lines[i] = line
+                self.draw_count += 1
+        return self.buffer
@@ -0,0 +1,178 @@
+import numpy as np
+
+from clipping import clip_convex_polygon
+from clipping import clip_convex_polygon_batch
+from clipping import polygon_signed_area
+from coverage import DEFAULT_CELL_SIZE
+from coverage import CoverageGrid
+from fov_batch import cal_theorical_min_max_distance_batch
+from fov_batch import get_rotate_polygon_batch
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import get_room_polygon
+
+
+## functions ##
+def compute_footprints(room, cameras, fov=(HFOV, VFOV)):
+    ''' calculate the footprints of many cameras of one room at once, same as compute_footprint().
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        cameras (list): [(face_vdeg, face_hdeg, cam_height, cam_width), ...] same as compute_footprint()
+        fov (tuple): (HFOV, VFOV) in degree
+
+    Returns:
+        footprints (list): [[[x,y],...], ...] one visible polygon per camera, [] if nothing is visible
+
+    '''
+
+    if len(cameras) == 0:
+        return []
+    room_width, room_height = room
+    h_fov, v_fov = fov
+    face_vdeg, face_hdeg, height, width = np.asarray(cameras, dtype=float).T
+    distances = cal_theorical_min_max_distance_batch(face_vdeg, height, v_fov/2, h_fov/2)
+    rotate_polygon = get_rotate_polygon_batch(width/100, room_height, face_hdeg, height, h_fov/2, *distances)
+    vertices, counts, _ = clip_convex_polygon_batch(rotate_polygon, get_room_polygon(room_width, room_height))
+    return [v[:c].tolist() for v, c in zip(vertices, counts)]
+
+
+def get_bounding_boxes(polygons):
+    ''' get the (x_min, y_min, x_max, y_max) of every polygon, nan for an empty one '''
+    boxes = np.full((len(polygons), 4), np.nan)
+    for i, polygon in enumerate(polygons):
+        if polygon:
+            points = np.asarray(polygon, dtype=float)
+            boxes[i, :2] = points.min(axis=0)
+            boxes[i, 2:] = points.max(axis=0)
+    return boxes
+
+
+def get_overlapping_pairs(boxes):
+    ''' get the index pairs (i < j) whose bounding boxes overlap.
+        Sweep over x: only boxes still open at the x_min of a box are tested,
+        so the cost follows the number of overlaps instead of all n^2 pairs.
+
+    Args:
+        boxes (ndarray): (n, 4) from get_bounding_boxes()
+
+    Returns:
+        pairs (list): [(i, j), ...]
+
+    '''
+
+    valid = np.flatnonzero(~np.isnan(boxes[:, 0]))
+    order = valid[np.argsort(boxes[valid, 0], kind='stable')]
+    pairs = []
+    active = []
+    for i in order:
+        x_min, y_min, _, y_max = boxes[i]
+        active = [j for j in active if boxes[j, 2] >= x_min]
+        for j in active:
+            if boxes[j, 1] <= y_max and boxes[j, 3] >= y_min:
+                pairs.append((min(i, j), max(i, j)))
+        active.append(i)
+    return sorted((int(i), int(j)) for i, j in pairs)
+
+
+def get_pairwise_overlaps(footprints):
+    ''' get the overlap area of every pair of footprints that overlap.
+
+    Args:
+        footprints (list): convex polygons, e.g. from compute_footprints()
+
+    Returns:
+        overlaps (list): [(i, j, area m^2, polygon), ...] only pairs with an area > 0
+
+    '''
+
+    overlaps = []
+    for i, j in get_overlapping_pairs(get_bounding_boxes(footprints)):
+        polygon = clip_convex_polygon(footprints[i], footprints[j])
+        if polygon:
+            overlaps.append((i, j, abs(polygon_signed_area(polygon)), polygon))
+    return overlaps
+
+
+def get_blind_spots(grid, min_cells=1):
+    ''' get the connected regions of the cells no footprint sees.
+
+    Args:
+        grid (CoverageGrid): the coverage of the room
+        min_cells (int): smaller regions are ignored
+
+    Returns:
+        blind_spots (list): [{'cells', 'area' (m^2), 'bbox' (x_min, y_min, x_max, y_max) m, 'centroid' (x, y) m}, ...]
+                            sorted by area, largest first
+
+    '''
+
+    import cv2
+    blind = (grid.counts <= 0).astype(np.uint8)
+    n_labels, _, stats, centroids = cv2.connectedComponentsWithStats(blind, connectivity=4)
+    cell = grid.cell_size
+    blind_spots = []
+    # label 0 is the covered cells
+    for label in range(1, n_labels):
+        col, row, n_cols, n_rows, n_cells = (int(v) for v in stats[label])
+        if n_cells < min_cells:
+            continue
+        blind_spots.append({
+            'cells': n_cells,
+            'area': n_cells * cell ** 2,
+            'bbox': (col * cell, row * cell, (col + n_cols) * cell, (row + n_rows) * cell),
+            'centroid': (float(centroids[label][0] + 0.5) * cell, float(centroids[label][1] + 0.5) * cell),
+        })
+    blind_spots.sort(key=lambda spot: -spot['cells'])
+    return blind_spots
+
+
+def compute_room_coverage(room, cameras, fov=(HFOV, VFOV), cell_size=DEFAULT_CELL_SIZE):
+    ''' union, pairwise overlaps and blind spots of many cameras in one room.
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        cameras (list): [(face_vdeg, face_hdeg, cam_height, cam_width), ...] same as compute_footprint()
+        fov (tuple): (HFOV, VFOV) in degree
+        cell_size (float): cell size in m of the union raster
+
+    Returns:
+        coverage (dict):
+            'footprints': one visible polygon per camera
+            'grid': CoverageGrid with the number of cameras per cell
+            'union_area': area seen by at least one camera in m^2 (raster)
+            'coverage_ratio': union_area / room area (raster, 0-1)
+            'overlaps': [(i, j, area m^2, polygon), ...] exact, pairs with an area > 0
+            'blind_spots': get_blind_spots() of the grid
+
+    '''
+
+    footprints = compute_footprints(room, cameras, fov)
+    grid = CoverageGrid(room[0], room[1], cell_size)
+    for footprint in footprints:
+        grid.add_footprint(footprint)
+    return {
+        'footprints': footprints,
+        'grid': grid,
+        'union_area': grid.covered_area(),
+        'coverage_ratio': grid.coverage_ratio(),
+        'overlaps': get_pairwise_overlaps(footprints),
+        'blind_spots': get_blind_spots(grid),
+    }
+
+
+def compute_site_coverage(site, fov=(HFOV, VFOV), cell_size=DEFAULT_CELL_SIZE):
+    ''' compute_room_coverage() of every room of a site, one room at a time.
+
+    Args:
+        site (iterable): [(room, cameras), ...]
+        fov (tuple): (HFOV, VFOV) in degree
+        cell_size (float): cell size in m of the union raster
+
+    Returns:
+        coverages (generator): compute_room_coverage() result of each room in order
+
+    '''
+
+    for room, cameras in site:
+        yield compute_room_coverage(room, cameras, fov, cell_size)
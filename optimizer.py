@@ -0,0 +1,203 @@
+''' search the camera mount with the largest floor area where a person is visible:
+    python optimizer.py ROOM_WIDTH ROOM_HEIGHT P_HEIGHT [--top 5] [--processes N]
+
+    CamFacVDeg, CamFacHDeg, CamLoc_H and CamLoc_W are searched on a coarse grid first,
+    then the best grid points are refined by a local search down to 1 degree / 1 cm.
+    Both steps are split over a process pool.
+'''
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from clipping import clip_convex_polygon_batch
+from fov_batch import cal_distances_batch
+from fov_batch import get_rotate_polygon_batch
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import get_room_polygon
+
+## Constants ##
+
+# (min, max) of CamFacVDeg, CamFacHDeg and CamLoc_H, CamLoc_W goes up to the room width in cm
+FACE_VDEG_RANGE = (0, 90)
+FACE_HDEG_RANGE = (0, 180)
+HEIGHT_RANGE = (150, 300)
+
+# coarse grid step of (face_vdeg, face_hdeg, height, width), degree, degree, cm, cm
+COARSE_STEPS = (5, 10, 25, 100)
+
+# best configurations returned, each coarse winner is refined on its own
+DEFAULT_TOP = 5
+# refine more coarse points than returned, several of them end at the same optimum
+REFINE_FACTOR = 4
+
+# mounts evaluated together in one batch
+EVALUATE_CHUNK_SIZE = 65536
+
+
+## functions ##
+def evaluate_placements(room_width, room_height, p_height, face_vdeg, face_hdeg, height, width, hfov=HFOV, vfov=VFOV):
+    ''' get the floor range where a person of p_height is visible for many mounts at once.
+        Same as compute_person_footprint(), the mount arguments are broadcast against each other.
+
+    Args:
+        room_width (float): the room width in m
+        room_height (float): the room height in m
+        p_height (array_like): human height in cm
+        face_vdeg (array_like): the vertical camera face degree
+        face_hdeg (array_like): the horizontal camera face degree
+        height (array_like): the height to set the camera in cm
+        width (array_like): the camera position on the wall in cm
+        hfov (float): camera horizontal FOV in degree
+        vfov (float): camera vertical FOV in degree
+
+    Returns:
+        vertices (ndarray): (..., 8, 2) the visible polygons, nan padded
+        counts (ndarray): (...) number of vertices
+        areas (ndarray): (...) visible area in m^2, 0 for 'Invalid'
+
+    '''
+
+    half_hfov = hfov/2
+    half_vfov = vfov/2
+    distances = cal_distances_batch(face_vdeg, height, p_height, half_vfov, half_hfov)
+    rotate_polygon = get_rotate_polygon_batch(np.asarray(width)/100, room_height, face_hdeg, height, half_hfov, *distances[4:])
+    return clip_convex_polygon_batch(rotate_polygon, get_room_polygon(room_width, room_height))
+
+
+def _get_ranges(room_width):
+    return np.array([FACE_VDEG_RANGE, FACE_HDEG_RANGE, HEIGHT_RANGE, (0, int(room_width*100))])
+
+
+def _keep_top(configs, areas, top):
+    if len(areas) > top:
+        index = np.argpartition(-areas, top - 1)[:top]
+        configs, areas = configs[index], areas[index]
+    return configs, areas
+
+
+def _grid_worker(task):
+    # best `top` mounts of one slice of the coarse grid
+    room_width, room_height, p_height, hfov, vfov, vdeg_values, hdeg_values, height_values, width_values, top = task
+    best_configs = np.zeros((0, 4), dtype=int)
+    best_areas = np.zeros(0)
+    hdeg_chunk = max(1, EVALUATE_CHUNK_SIZE // (len(height_values) * len(width_values)))
+    for face_vdeg in vdeg_values:
+        for start in range(0, len(hdeg_values), hdeg_chunk):
+            hdeg = hdeg_values[start:start + hdeg_chunk]
+            areas = evaluate_placements(room_width, room_height, p_height,
+                face_vdeg, hdeg[:, None, None], height_values[None, :, None], width_values[None, None, :], hfov, vfov)[2]
+            configs = np.stack(np.broadcast_arrays(face_vdeg, hdeg[:, None, None], height_values[None, :, None], width_values[None, None, :]), axis=-1)
+            best_configs, best_areas = _keep_top(
+                np.concatenate([best_configs, configs.reshape(-1, 4)]),
+                np.concatenate([best_areas, areas.ravel()]), top)
+    return best_configs, best_areas
+
+
+def _refine_worker(task):
+    # local search on the integer grid: try every neighbour at +-step, move to the best,
+    # halve the steps when nothing is better, stop at step 1
+    room_width, room_height, p_height, hfov, vfov, start, steps, ranges = task
+    current = np.array(start, dtype=int)
+    steps = np.array(steps, dtype=int)
+    directions = np.array([d for d in itertools.product((-1, 0, 1), repeat=4) if any(d)])
+    best_area = evaluate_placements(room_width, room_height, p_height, *current, hfov, vfov)[2]
+    n_evaluations = 1
+    while True:
+        candidates = np.clip(current + directions * steps, ranges[:, 0], ranges[:, 1])
+        candidates = np.unique(candidates, axis=0)
+        areas = evaluate_placements(room_width, room_height, p_height, *candidates.T, hfov, vfov)[2]
+        n_evaluations += len(candidates)
+        i = int(np.argmax(areas))
+        if areas[i] > best_area:
+            current, best_area = candidates[i], areas[i]
+        elif np.all(steps == 1):
+            break
+        else:
+            steps = np.maximum(steps // 2, 1)
+    return current, float(best_area), n_evaluations
+
+
+def optimize_placement(room_width, room_height, p_height, hfov=HFOV, vfov=VFOV, top=DEFAULT_TOP,
+                       coarse_steps=COARSE_STEPS, processes=None):
+    ''' find the mounts with the largest floor area where a person of p_height is visible.
+        The camera is on the y = room_height wall like in the GUI.
+
+    Args:
+        room_width (float): the room width in m
+        room_height (float): the room height in m
+        p_height (int): human height in cm
+        hfov (float): camera horizontal FOV in degree
+        vfov (float): camera vertical FOV in degree
+        top (int): number of configurations to return
+        coarse_steps (tuple): grid step of (face_vdeg, face_hdeg, height, width)
+        processes (int): worker processes, None for all cores, 1 to run in this process
+
+    Returns:
+        results (list): up to top dicts sorted by area, largest first:
+            {'face_vdeg', 'face_hdeg', 'height', 'width', 'area' (m^2), 'footprint' ([[x,y],...])}
+
+    '''
+
+    ranges = _get_ranges(room_width)
+    axis_values = [np.arange(low, high + 1, step) for (low, high), step in zip(ranges, coarse_steps)]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    n_refine = top * REFINE_FACTOR
+
+    vdeg_chunks = [c for c in np.array_split(axis_values[0], processes * 4) if len(c)]
+    grid_tasks = [(room_width, room_height, p_height, hfov, vfov, c, *axis_values[1:], n_refine) for c in vdeg_chunks]
+
+    executor = ProcessPoolExecutor(processes) if processes > 1 else None
+    try:
+        run = executor.map if executor is not None else map
+        grid_results = list(run(_grid_worker, grid_tasks))
+        configs, areas = _keep_top(
+            np.concatenate([r[0] for r in grid_results]),
+            np.concatenate([r[1] for r in grid_results]), n_refine)
+
+        refine_tasks = [(room_width, room_height, p_height, hfov, vfov, c, coarse_steps, ranges) for c in configs]
+        refine_results = list(run(_refine_worker, refine_tasks))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # several starts end at the same mount
+    refined = {}
+    for config, area, _ in refine_results:
+        refined[tuple(int(v) for v in config)] = area
+    best = sorted(refined.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+    results = []
+    for config, area in best:
+        vertices, counts, _ = evaluate_placements(room_width, room_height, p_height, *config, hfov, vfov)
+        face_vdeg, face_hdeg, height, width = config
+        results.append({
+            'face_vdeg': face_vdeg,
+            'face_hdeg': face_hdeg,
+            'height': height,
+            'width': width,
+            'area': area,
+            'footprint': vertices[:int(counts)].tolist(),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='search the camera mount with the largest visible floor area')
+    parser.add_argument('room_width', type=float, help='m')
+    parser.add_argument('room_height', type=float, help='m')
+    parser.add_argument('p_height', type=int, help='cm')
+    parser.add_argument('--hfov', type=float, default=HFOV)
+    parser.add_argument('--vfov', type=float, default=VFOV)
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    results = optimize_placement(args.room_width, args.room_height, args.p_height, args.hfov, args.vfov, args.top, processes=args.processes)
+    for result in results:
+        print(f"CamFacVDeg {result['face_vdeg']}, CamFacHDeg {result['face_hdeg']}, CamLoc_H {result['height']} cm, "
+              f"CamLoc_W {result['width']} cm: {result['area']:.2f} m^2")
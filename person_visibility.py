@@ -0,0 +1,192 @@
+import numpy as np
+
+from fov_checker import HFOV
+from fov_checker import VFOV
+from frustum import get_camera_rotation_batch
+
+## Constants ##
+
+# the Person_H trackbar range in cm, the heights are sampled from it by default
+PERSON_HEIGHT_RANGE = (130, 200)
+
+# samples per chunk, drawn once for all cameras
+SAMPLE_CHUNK_SIZE = 65536
+
+# the temporaries of one sample and camera in whole_body_visible_batch(), about 65 bytes measured
+BYTES_PER_SAMPLE_CAMERA = 100
+# the cameras of a chunk are checked in blocks of about this many bytes of temporaries
+SAMPLE_MEMORY_BUDGET = 64 * 2**20
+
+# stop when the confidence interval of every fraction is within +- tolerance
+DEFAULT_TOLERANCE = 0.005
+# normal quantile of the interval, 1.96 = 95 %
+CONFIDENCE_Z = 1.96
+# no stop before this many samples, a small sample can look converged by chance
+MIN_SAMPLES = 10000
+MAX_SAMPLES = 10000000
+
+
+## functions ##
+def project_points_batch(rotation, cam_pos, points):
+    ''' project room points through the pinhole of many cameras.
+
+    Args:
+        rotation (ndarray): (C, 3, 3) from frustum.get_camera_rotation_batch()
+        cam_pos (ndarray): (C, 3) x, y, z of the cameras in m
+        points (ndarray): (..., 3) x, y, z in m, broadcast against (C, 1)
+
+    Returns:
+        u (ndarray): x / z in the image plane at distance 1, > 0 is right of the image center
+        v (ndarray): y / z in the image plane at distance 1, > 0 is above the image center
+        depth (ndarray): distance along the optical axis, <= 0 behind the camera
+
+    '''
+
+    offset = points - cam_pos[:, None, :]
+    # rotation columns are right, up, forward: camera coordinates are offset @ rotation
+    x = np.einsum('cni,ci->cn', offset, rotation[:, :, 0])
+    y = np.einsum('cni,ci->cn', offset, rotation[:, :, 1])
+    depth = np.einsum('cni,ci->cn', offset, rotation[:, :, 2])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return x / depth, y / depth, depth
+
+
+def in_frame(u, v, depth, half_hfov, half_vfov):
+    ''' True for the projected points inside the image of the HFOV x VFOV camera '''
+    return (depth > 0) & (np.abs(u) <= np.tan(np.radians(half_hfov))) & (np.abs(v) <= np.tan(np.radians(half_vfov)))
+
+
+def whole_body_visible_batch(rotation, cam_pos, positions, p_height, fov=(HFOV, VFOV)):
+    ''' check if standing persons are in frame from feet to head.
+        The frustum is convex, so feet and head in frame means the whole body between them is.
+
+    Args:
+        rotation (ndarray): (C, 3, 3) from frustum.get_camera_rotation_batch()
+        cam_pos (ndarray): (C, 3) x, y, z of the cameras in m
+        positions (ndarray): (N, 2) floor positions of the persons in m
+        p_height (float/ndarray): human height in cm, one or (N,)
+        fov (tuple): (HFOV, VFOV) in degree
+
+    Returns:
+        visible (ndarray): bool (C, N)
+
+    '''
+
+    h_fov, v_fov = fov
+    positions = np.asarray(positions, dtype=float)
+    head_z = np.broadcast_to(np.asarray(p_height, dtype=float) / 100, positions.shape[:1])
+    feet = np.concatenate([positions, np.zeros((len(positions), 1))], axis=1)
+    head = np.concatenate([positions, head_z[:, None]], axis=1)
+    visible = in_frame(*project_points_batch(rotation, cam_pos, feet), h_fov/2, v_fov/2)
+    visible &= in_frame(*project_points_batch(rotation, cam_pos, head), h_fov/2, v_fov/2)
+    return visible
+
+
+def get_confidence_half_width(hits, samples, z=CONFIDENCE_Z):
+    ''' half width of the Agresti-Coull interval of hits / samples, it stays > 0 when the fraction is 0 or 1 '''
+    n = samples + z**2
+    p = (hits + z**2 / 2) / n
+    return z * np.sqrt(p * (1 - p) / n)
+
+
+def get_camera_block_size(chunk_size, memory_budget=SAMPLE_MEMORY_BUDGET):
+    ''' the number of cameras checked together against a chunk of samples, at least 1 '''
+    return max(1, int(memory_budget // (chunk_size * BYTES_PER_SAMPLE_CAMERA)))
+
+
+def iter_whole_body_estimates(room, cameras, fov=(HFOV, VFOV), p_height=PERSON_HEIGHT_RANGE, roll_deg=0, chunk_size=SAMPLE_CHUNK_SIZE,
+                              seed=None, memory_budget=SAMPLE_MEMORY_BUDGET):
+    ''' sample standing persons uniformly over the floor, one chunk at a time, and yield the running estimate
+        after every chunk. Only one chunk of samples is in memory, the cameras are checked against it in blocks
+        so the temporaries stay within memory_budget whatever the number of cameras.
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        cameras (array_like): [(face_vdeg, face_hdeg, cam_height, cam_width), ...] same as compute_footprint()
+        fov (tuple): (HFOV, VFOV) in degree
+        p_height (float/tuple): human height in cm, or (min, max) to sample it uniformly
+        roll_deg (float/array_like): the camera roll in degree, one or one per camera
+        chunk_size (int): samples per chunk
+        seed (int): seed of the samples, None for a random one
+        memory_budget (int): bytes of temporaries per camera block, a block has at least one camera
+
+    Yields:
+        hits (ndarray): (C,) samples whose whole body was in frame, per camera, so far
+        union_hits (int): samples whose whole body was in frame of at least one camera, so far
+        samples (int): samples so far
+
+    '''
+
+    room_width, room_height = room
+    face_vdeg, face_hdeg, height, width = np.asarray(cameras, dtype=float).reshape(-1, 4).T
+    rotation = get_camera_rotation_batch(face_vdeg, face_hdeg, np.broadcast_to(roll_deg, face_vdeg.shape))
+    cam_pos = np.stack([width/100, np.full_like(width, room_height), height/100], axis=-1)
+
+    rng = np.random.default_rng(seed)
+    hits = np.zeros(len(cam_pos), dtype=np.int64)
+    union_hits = 0
+    samples = 0
+    block_size = get_camera_block_size(chunk_size, memory_budget)
+    while True:
+        positions = rng.random((chunk_size, 2)) * (room_width, room_height)
+        if np.ndim(p_height) == 0:
+            heights = p_height
+        else:
+            heights = rng.uniform(p_height[0], p_height[1], chunk_size)
+        # the samples in frame of any camera so far, collected over the camera blocks
+        seen = np.zeros(chunk_size, dtype=bool)
+        for start in range(0, len(cam_pos), block_size):
+            block = slice(start, start + block_size)
+            visible = whole_body_visible_batch(rotation[block], cam_pos[block], positions, heights, fov)
+            hits[block] += np.count_nonzero(visible, axis=1)
+            seen |= visible.any(axis=0)
+        union_hits += int(np.count_nonzero(seen))
+        samples += chunk_size
+        yield hits, union_hits, samples
+
+
+def estimate_whole_body_coverage(room, cameras, fov=(HFOV, VFOV), p_height=PERSON_HEIGHT_RANGE, roll_deg=0,
+                                 tolerance=DEFAULT_TOLERANCE, chunk_size=SAMPLE_CHUNK_SIZE, max_samples=MAX_SAMPLES, seed=None,
+                                 memory_budget=SAMPLE_MEMORY_BUDGET):
+    ''' estimate the fraction of the floor where a whole standing person is in frame, per camera and of
+        at least one camera:
+        estimate_whole_body_coverage((10.0, 10.0), [(45, 90, 250, 500)], (90, 52), (150, 190))
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        cameras (array_like): [(face_vdeg, face_hdeg, cam_height, cam_width), ...] same as compute_footprint()
+        fov (tuple): (HFOV, VFOV) in degree
+        p_height (float/tuple): human height in cm, or (min, max) to sample it uniformly
+        roll_deg (float/array_like): the camera roll in degree, one or one per camera
+        tolerance (float): stop when the CONFIDENCE_Z interval of every fraction is within +- tolerance
+        chunk_size (int): samples per chunk
+        max_samples (int): stop here even if not converged
+        seed (int): seed of the samples, None for a random one
+        memory_budget (int): bytes of temporaries per camera block, see iter_whole_body_estimates()
+
+    Returns:
+        result (dict): 'fraction' (C,), 'area' (C,) in m^2, 'half_width' (C,) of the interval,
+                       'union_fraction', 'union_area', 'union_half_width' of the floor seen by at least one camera,
+                       'samples', 'converged'
+
+    '''
+
+    room_width, room_height = room
+    for hits, union_hits, samples in iter_whole_body_estimates(room, cameras, fov, p_height, roll_deg, chunk_size, seed, memory_budget):
+        half_width = get_confidence_half_width(hits, samples)
+        union_half_width = get_confidence_half_width(union_hits, samples)
+        converged = samples >= MIN_SAMPLES and bool(np.all(half_width <= tolerance)) and union_half_width <= tolerance
+        if converged or samples >= max_samples:
+            break
+    fraction = hits / samples
+    union_fraction = union_hits / samples
+    return {
+        'fraction': fraction,
+        'area': fraction * room_width * room_height,
+        'half_width': half_width,
+        'union_fraction': union_fraction,
+        'union_area': union_fraction * room_width * room_height,
+        'union_half_width': float(union_half_width),
+        'samples': samples,
+        'converged': converged,
+    }
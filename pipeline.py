@@ -0,0 +1,213 @@
+import numpy as np
+
+from camera_catalog import get_fov
+from fov_checker import H_HFOV
+from fov_checker import H_VFOV
+from fov_checker import cal_min_max_distance_with_human_height
+from fov_checker import cal_theorical_min_max_distance
+from fov_checker import get_room_polygon
+from fov_checker import get_rotate_polygon
+from fov_checker import get_visible_polygon
+from frustum import compute_frustum_footprint
+from info_panel import InfoPanelRenderer
+from room_renderer import RoomRenderer
+from stage_timer import NULL_TIMER
+
+
+## Constants ##
+
+# the values read from the trackbars / Tk window
+PIPELINE_INPUTS = ('face_vdeg', 'face_hdeg', 'height', 'width', 'p_height', 'room_width', 'room_height')
+
+
+## functions ##
+def _same_value(a, b):
+    # stage outputs are floats, 'Inf'/'Invalid' strings, point lists or images.
+    # The layers are frame buffers drawn over in place, the same object is the same value
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and a.shape == b.shape and np.array_equal(a, b)
+    try:
+        return bool(a == b)
+    except ValueError:
+        return False
+
+
+def _translate_polygon(polygon, dx, dy):
+    return [[x + dx, y + dy] for x, y in polygon]
+
+
+class FramePipeline:
+    ''' the per frame calculation as a small dependency graph of cached stages.
+
+        stage          depends on
+        distances      face_vdeg, height
+        person         distances, p_height, height, face_vdeg
+        rotation       distances, face_hdeg, height (trapezoid around the camera at (0,0))
+        translation    rotation, width, room_height
+        room           room_width, room_height
+        clipping       translation, room
+                       with an atlas: face_vdeg, face_hdeg, height, width, room_width, room_height,
+                       rotation and translation only run for the setups that are not on the atlas grid
+                       with frustum: face_vdeg, face_hdeg, height, width, room_width, room_height,
+                       the floor cut of the camera frustum, rotation and translation do not run
+        text_layer     distances, person
+        room_layer     room_width, room_height, clipping
+
+        update() sets the inputs, get() only recalculates the stages downstream of a changed input.
+        A stage whose new output equals the old one does not invalidate the stages after it.
+
+        pipeline = FramePipeline()                  # or FramePipeline(model='wide-110')
+        pipeline.update(face_vdeg=45, face_hdeg=90, height=250, width=500, p_height=170, room_width=10.0, room_height=10.0)
+        visible_polygon = pipeline.get('clipping')
+
+    '''
+
+    def __init__(self, half_hfov=H_HFOV, half_vfov=H_VFOV, atlas=None, cache=None, timer=NULL_TIMER, renderer=None, frustum=False,
+                 model=None):
+        # a model id of cameras.json or a CameraModel, its effective FOV replaces half_hfov / half_vfov
+        if model is not None:
+            hfov, vfov = get_fov(model)
+            half_hfov, half_vfov = hfov/2, vfov/2
+        if atlas is not None and (atlas.hfov/2 != half_hfov or atlas.vfov/2 != half_vfov):
+            raise ValueError(f'atlas is built for HFOV {atlas.hfov}, VFOV {atlas.vfov}')
+        self.half_hfov = half_hfov
+        self.half_vfov = half_vfov
+        # atlas.FovAtlas, the distances and footprints of setups on its grid are looked up instead of calculated
+        self.atlas = atlas
+        # clip with frustum.project_frustum_batch() instead of the trapezoid, the atlas then only gives the distances
+        self.frustum = frustum
+        # fov_cache.FovCache, keeps the distances of the values the sliders go back to
+        self.cache = cache
+        # stage_timer.StageTimer, every stage calculation is timed under the stage name
+        self.timer = timer
+        # room_renderer.RoomRenderer, draws the room_layer at the display size into its frame buffer
+        self.renderer = renderer if renderer is not None else RoomRenderer()
+        # info_panel.InfoPanelRenderer, draws the text_layer over its static layer, only the changed lines again
+        self.info_panel = InfoPanelRenderer(2*half_hfov, 2*half_vfov)
+        self.stages = {
+            'distances': (('face_vdeg', 'height'), self._distances),
+            'person': (('distances', 'p_height', 'height', 'face_vdeg'), self._person),
+            'rotation': (('distances', 'face_hdeg', 'height'), self._rotation),
+            'translation': (('rotation', 'width', 'room_height'), self._translation),
+            'room': (('room_width', 'room_height'), get_room_polygon),
+            'clipping': (('translation', 'room'), get_visible_polygon),
+            'text_layer': (('distances', 'person'), self._text_layer),
+            'room_layer': (('room_width', 'room_height', 'clipping'), self._room_layer),
+        }
+        if frustum:
+            self.stages['clipping'] = (('face_vdeg', 'face_hdeg', 'height', 'width', 'room_width', 'room_height'), self._frustum_clipping)
+        elif atlas is not None:
+            self.stages['clipping'] = (('face_vdeg', 'face_hdeg', 'height', 'width', 'room_width', 'room_height'), self._atlas_clipping)
+        # name -> value / version, versions only go up when the value changes
+        self.values = {}
+        self.versions = {}
+        # stage name -> versions of its dependencies when it was last calculated
+        self.dep_versions = {}
+        # stage name -> times it was calculated, to see what a change costs
+        self.calc_counts = {name: 0 for name in self.stages}
+
+    def update(self, **inputs):
+        ''' set input values, unchanged values keep their version.
+
+        Args:
+            **inputs: any of PIPELINE_INPUTS
+
+        Returns:
+            changed (list): the names of the inputs whose value changed
+
+        '''
+
+        changed = []
+        for name, value in inputs.items():
+            if name not in PIPELINE_INPUTS:
+                raise KeyError(f'unknown pipeline input: {name}')
+            if name in self.values and _same_value(self.values[name], value):
+                continue
+            self.values[name] = value
+            self.versions[name] = self.versions.get(name, 0) + 1
+            changed.append(name)
+        return changed
+
+    def get(self, name):
+        ''' get the output of a stage (or an input), recalculating only what is out of date.
+
+        Args:
+            name (str): stage or input name
+
+        Returns:
+            value: the output of the stage
+
+        '''
+
+        if name not in self.stages:
+            if name not in self.values:
+                raise KeyError(f'pipeline input not set: {name}')
+            return self.values[name]
+
+        deps, func = self.stages[name]
+        dep_values = [self.get(dep) for dep in deps]
+        dep_versions = tuple(self.versions[dep] for dep in deps)
+        if self.dep_versions.get(name) == dep_versions:
+            return self.values[name]
+
+        with self.timer.stage(name):
+            value = func(*dep_values)
+        self.calc_counts[name] += 1
+        self.dep_versions[name] = dep_versions
+        if name not in self.values or not _same_value(self.values[name], value):
+            self.values[name] = value
+            self.versions[name] = self.versions.get(name, 0) + 1
+        return self.values[name]
+
+    def _distances(self, face_vdeg, height):
+        if self.atlas is not None:
+            distances = self.atlas.get_distances(face_vdeg, height)
+            if distances is not None:
+                return distances
+        if self.cache is not None:
+            return self.cache.cal_theorical_min_max_distance(face_vdeg, height, self.half_vfov, self.half_hfov)
+        return cal_theorical_min_max_distance(face_vdeg, height, self.half_vfov, self.half_hfov)
+
+    def _person(self, distances, p_height, height, face_vdeg):
+        if self.atlas is not None:
+            person_distances = self.atlas.get_person_distances(face_vdeg, height, p_height)
+            if person_distances is not None:
+                return person_distances
+        min_v_distance, max_v_distance = distances[0], distances[1]
+        if self.cache is not None:
+            return self.cache.cal_min_max_distance_with_human_height(p_height, height, min_v_distance, max_v_distance, face_vdeg, self.half_vfov, self.half_hfov)
+        return cal_min_max_distance_with_human_height(p_height, height, min_v_distance, max_v_distance, face_vdeg, self.half_vfov, self.half_hfov)
+
+    def _rotation(self, distances, face_hdeg, height):
+        # rotate around the origin, CamLoc_W then only moves the polygon
+        return get_rotate_polygon(0.0, 0.0, face_hdeg, height, self.half_hfov, *distances)
+
+    def _translation(self, rotation, width, room_height):
+        cam_x_pos = width/100 # x position in m
+        cam_y_pos = room_height
+        return _translate_polygon(rotation, cam_x_pos, cam_y_pos)
+
+    def _atlas_clipping(self, face_vdeg, face_hdeg, height, width, room_width, room_height):
+        # the footprints of the atlas are only valid for the room it is built for
+        if (room_width, room_height) != (self.atlas.room_width, self.atlas.room_height):
+            raise ValueError(f'atlas is built for a {self.atlas.room_width} x {self.atlas.room_height} m room, '
+                             f'not {room_width} x {room_height} m')
+        visible_polygon = self.atlas.get_footprint(face_vdeg, face_hdeg, height, width)
+        if visible_polygon is not None:
+            return visible_polygon
+        # not on the grid: the trig path, its stages depend on the same inputs as this one
+        return get_visible_polygon(self.get('translation'), self.get('room'))
+
+    def _frustum_clipping(self, face_vdeg, face_hdeg, height, width, room_width, room_height):
+        camera = (face_vdeg, face_hdeg, height, width)
+        if self.cache is not None:
+            return self.cache.compute_footprint((room_width, room_height), camera, (2*self.half_hfov, 2*self.half_vfov), frustum=True)
+        return compute_frustum_footprint((room_width, room_height), camera, (2*self.half_hfov, 2*self.half_vfov))
+
+    def _text_layer(self, distances, person):
+        return self.info_panel.render(*distances, *person, timer=self.timer)
+
+    def _room_layer(self, room_width, room_height, visible_polygon):
+        return self.renderer.render(room_width, room_height, visible_polygon, self.timer)
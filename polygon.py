@@ -0,0 +1,212 @@
+import numpy as np
+
+from clipping import _signed_area_batch
+from clipping import clip_convex_polygon_batch
+
+## Constants ##
+
+# empty (0, 2) points, shared by empty polygons
+_NO_POINTS = np.zeros((0, 2))
+_NO_POINTS.flags.writeable = False
+
+
+## functions ##
+def as_points(polygon):
+    ''' get the vertices of a Polygon, an (N, 2) array or a [[x,y],...] list as a float64 (N, 2) array,
+        without a copy when it already is one.
+    '''
+    return np.asarray(polygon, dtype=float).reshape(-1, 2)
+
+
+def previous_vertices(points):
+    ''' vertex i-1 for every vertex i of (..., N, 2) points, np.roll(points, 1, axis=-2) without its overhead '''
+    return points[..., np.arange(-1, points.shape[-2] - 1), :]
+
+
+def _inside_counts(points, polygons):
+    # for every point and polygon, the number of edges the point is left / right of (same formula as _point_in_polygon)
+    # points (..., 2), polygons (..., N, 2), edge i goes from vertex i to vertex i-1
+    x1, y1 = polygons[..., 0], polygons[..., 1]
+    previous = previous_vertices(polygons)
+    x2, y2 = previous[..., 0], previous[..., 1]
+    px, py = points[..., 0:1], points[..., 1:2]
+    result = (py - y1) * (x2 - x1) - (px - x1) * (y2 - y1)
+    return result > 0, result < 0
+
+
+class Polygon:
+    ''' one polygon as a contiguous float64 (N, 2) array of its vertices.
+
+        polygon = Polygon([[0,0],[0,10],[10,10],[10,0]])
+        np.asarray(polygon)        # the (N, 2) buffer, no copy
+        polygon.contains((5, 5)), polygon.area()
+        cv2.fillPoly(img, [polygon.to_pixels(100, 20)], color)
+
+        It can be indexed and iterated like the [[x,y],...] lists (each vertex is a view of the buffer).
+
+    '''
+
+    __slots__ = ('points',)
+
+    def __init__(self, points=_NO_POINTS):
+        self.points = np.ascontiguousarray(points, dtype=float).reshape(-1, 2)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or np.dtype(dtype) == self.points.dtype:
+            return self.points.copy() if copy else self.points
+        return self.points.astype(dtype)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, index):
+        return self.points[index]
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __repr__(self):
+        return f'Polygon({self.points.tolist()})'
+
+    def tolist(self):
+        ''' the vertices as [[x,y],...] '''
+        return self.points.tolist()
+
+    def signed_area(self):
+        ''' shoelace area, > 0 for anti-clockwise vertices (y axis up) '''
+        x, y = self.points[:, 0], self.points[:, 1]
+        previous = previous_vertices(self.points)
+        return float(np.dot(previous[:, 0], y) - np.dot(x, previous[:, 1])) / 2
+
+    def area(self):
+        ''' the area in m^2 '''
+        return abs(self.signed_area())
+
+    def bounds(self):
+        ''' (x_min, y_min, x_max, y_max), nan for an empty polygon '''
+        if not len(self.points):
+            return (np.nan,) * 4
+        return (*self.points.min(axis=0).tolist(), *self.points.max(axis=0).tolist())
+
+    def contains(self, points):
+        ''' True for the points strictly inside the convex polygon (either vertex order), same as _point_in_polygon().
+
+        Args:
+            points (array_like): one (x, y) point or (M, 2) points
+
+        Returns:
+            inside (bool/ndarray): one bool per point
+
+        '''
+
+        points = np.asarray(points, dtype=float)
+        left, right = _inside_counts(points, self.points)
+        n = len(self.points)
+        return (left.sum(axis=-1) == n) | (right.sum(axis=-1) == n)
+
+    def to_pixels(self, scale=1.0, offset=0.0, shift=0):
+        ''' the vertices as the int32 (N, 1, 2) pixel points of cv2.fillPoly / cv2.polylines.
+
+        Args:
+            scale (float): pixels per m
+            offset (float): pixels added to x and y
+            shift (int): fractional bits, give the same shift to cv2
+
+        Returns:
+            pts (ndarray): int32 (N, 1, 2)
+
+        '''
+
+        pixels = (self.points * scale + offset) * (1 << shift)
+        return np.round(pixels).astype(np.int32).reshape(-1, 1, 2)
+
+
+class PolygonBatch:
+    ''' many polygons in one nan padded float64 (M, capacity, 2) buffer and their vertex counts,
+        the layout of clip_convex_polygon_batch().
+
+        batch = PolygonBatch.from_polygons([rotate_polygon, ...])
+        visible = batch.clip(room_polygon)
+        visible.areas(), visible[0]
+
+    '''
+
+    __slots__ = ('vertices', 'counts')
+
+    def __init__(self, vertices, counts=None):
+        self.vertices = np.ascontiguousarray(vertices, dtype=float).reshape(-1, np.shape(vertices)[-2], 2)
+        if counts is None:
+            counts = np.full(len(self.vertices), self.vertices.shape[1])
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_polygons(cls, polygons, capacity=None):
+        ''' pack a list of polygons (lists, arrays or Polygon) into one batch '''
+        polygons = [as_points(p) for p in polygons]
+        counts = np.array([len(p) for p in polygons], dtype=np.int64)
+        if capacity is None:
+            capacity = int(counts.max()) if len(counts) else 0
+        vertices = np.full((len(polygons), capacity, 2), np.nan)
+        for i, p in enumerate(polygons):
+            vertices[i, :len(p)] = p
+        return cls(vertices, counts)
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def __getitem__(self, index):
+        # a Polygon on a view of the buffer
+        return Polygon(self.vertices[index, :self.counts[index]])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def tolist(self):
+        ''' the polygons as [[[x,y],...], ...] '''
+        return [v[:c].tolist() for v, c in zip(self.vertices, self.counts)]
+
+    def areas(self):
+        ''' the area of every polygon in m^2 '''
+        return np.abs(_signed_area_batch(np.nan_to_num(self.vertices), self.counts))
+
+    def contains(self, points):
+        ''' contains() of every convex polygon with one point each.
+
+        Args:
+            points (array_like): (M, 2) one point per polygon, or one (x, y) for all
+
+        Returns:
+            inside (ndarray): (M,) bool
+
+        '''
+
+        points = np.broadcast_to(np.asarray(points, dtype=float), (len(self), 2))
+        # the padding edges have zero length, they count as neither side
+        left, right = _inside_counts(points, self._repeat_last())
+        return (left.sum(axis=-1) == self.counts) | (right.sum(axis=-1) == self.counts)
+
+    def clip(self, clip, capacity=None):
+        ''' clip every polygon with one convex polygon, see clip_convex_polygon_batch().
+
+        Args:
+            clip (array_like): convex polygon, any vertex order
+            capacity (int): vertex capacity of the result
+
+        Returns:
+            clipped (PolygonBatch): anti-clockwise results, count 0 when nothing is left
+
+        '''
+
+        vertices, counts, _ = clip_convex_polygon_batch(self._repeat_last(), as_points(clip), capacity)
+        return PolygonBatch(vertices, counts)
+
+    def _repeat_last(self):
+        # the padding filled with the last vertex of each polygon, a repeated vertex does not change a clip
+        index = np.minimum(np.arange(self.vertices.shape[1]), np.maximum(self.counts, 1)[:, None] - 1)
+        return np.take_along_axis(self.vertices, index[:, :, None], axis=1)
+
+    def to_pixels(self, scale=1.0, offset=0.0, shift=0):
+        ''' Polygon.to_pixels() of every polygon, the list cv2.fillPoly / cv2.polylines take '''
+        pixels = np.round((np.nan_to_num(self.vertices) * scale + offset) * (1 << shift)).astype(np.int32)
+        return [p[:c].reshape(-1, 1, 2) for p, c in zip(pixels, self.counts)]
@@ -0,0 +1,140 @@
+import numpy as np
+
+from fov_checker import ROOM_LINE_BIAS_PERCENTAGE
+from fov_checker import WINDOW_BIAS_PERCENTAGE
+from fov_checker import get_room_polygon
+from stage_timer import NULL_TIMER
+
+## Constants ##
+
+# pixels on the longer side of the ROOM image, same as draw_room()
+ROOM_DISPLAY_SIZE = 600
+
+# fractional bits of the polygon points given to cv2, 4 bits = 1/16 pixel
+POINT_SHIFT = 4
+
+# the line widths (px) and label font of the display image
+FOOTPRINT_LINE_WIDTH = 2
+ROOM_LINE_WIDTH = 2
+LABEL_FONT_SCALE = 1.0
+LABEL_THICKNESS = 1
+
+
+## functions ##
+def get_room_layout(room_width, room_height, display_size=ROOM_DISPLAY_SIZE):
+    ''' get the layout of draw_room() scaled to the display size.
+
+    Args:
+        room_width (float): the room width in m
+        room_height (float): the room height in m
+        display_size (int): pixels on the longer side
+
+    Returns:
+        scale (float): pixels per m
+        offset (float): pixels from the image border to the room corner (0,0)
+        size (tuple): (width, height) of the image in pixels
+
+    '''
+
+    # draw_room() draws 1 px per cm with this bias around the room, then resizes the longer side to display_size
+    window_bias = max(room_height, room_width) * 100 * WINDOW_BIAS_PERCENTAGE / 100
+    room_line_bias = window_bias * ROOM_LINE_BIAS_PERCENTAGE / 100
+    window_height = max(int(room_height*100 + window_bias), 1)
+    window_width = max(int(room_width*100 + window_bias), 1)
+    ratio = display_size / max(window_height, window_width)
+    size = (max(round(window_width * ratio), 1), max(round(window_height * ratio), 1))
+    return 100 * ratio, room_line_bias * ratio, size
+
+
+class RoomRenderer:
+    ''' draws the ROOM image straight at the display size into a reused frame buffer, instead of
+        1 px per cm followed by a resize. The time and memory of a frame do not depend on the room size.
+
+        renderer = RoomRenderer()
+        img = renderer.render(10.0, 10.0, visible_polygon)
+
+        The room outline and corner labels only change with the room size, they are drawn once into a static
+        layer and copied over the footprint every frame. The returned image is the frame buffer, the next
+        render() draws over it.
+
+    '''
+
+    def __init__(self, display_size=ROOM_DISPLAY_SIZE):
+        self.display_size = display_size
+        self.buffer = None
+        # the static layer of one room size: flat indices of its drawn pixels and their colors
+        self.static_key = None
+        self.static_index = None
+        self.static_pixels = None
+
+    def _get_buffer(self, size):
+        # only allocate when the image size changes (a new room size)
+        width, height = size
+        if self.buffer is None or self.buffer.shape[:2] != (height, width):
+            self.buffer = np.zeros((height, width, 3), np.uint8)
+        else:
+            self.buffer.fill(0)
+        return self.buffer
+
+    def _to_pixels(self, points, scale, offset):
+        # fixed point pixel coordinates for the shift argument of cv2
+        pixels = (np.asarray(points, dtype=float) * scale + offset) * (1 << POINT_SHIFT)
+        return np.round(pixels).astype(np.int32).reshape((-1, 1, 2))
+
+    def _draw_labels(self, img, points, pts):
+        import cv2
+        for (x, y), pt in zip(points, pts):
+            origin = (int(pt[0][0]) >> POINT_SHIFT, int(pt[0][1]) >> POINT_SHIFT)
+            cv2.putText(img, f'({x:.1f},{y:.1f}) ', origin, cv2.FONT_HERSHEY_COMPLEX_SMALL, LABEL_FONT_SCALE, (0,0,255), LABEL_THICKNESS, cv2.LINE_AA)
+
+    def _update_static_layer(self, room_width, room_height, scale, offset, size):
+        # room coordinate labels and the room outline, only drawn again for a new room size
+        import cv2
+        key = (room_width, room_height, self.display_size)
+        if key == self.static_key:
+            return
+        width, height = size
+        layer = np.zeros((height, width, 3), np.uint8)
+        room_polygon = get_room_polygon(room_width, room_height)
+        room_pts = self._to_pixels(room_polygon, scale, offset)
+        self._draw_labels(layer, room_polygon, room_pts)
+        cv2.polylines(layer, [room_pts], True, (255,255,255), ROOM_LINE_WIDTH, cv2.LINE_AA, POINT_SHIFT)
+        pixels = layer.reshape(-1, 3)
+        self.static_index = np.flatnonzero(pixels[:, 0] | pixels[:, 1] | pixels[:, 2])
+        self.static_pixels = pixels[self.static_index]
+        self.static_key = key
+
+    def render(self, room_width, room_height, visible_polygon, timer=NULL_TIMER):
+        ''' draw the room and the visible range for the ROOM_WINDOW_NAME window, same picture as draw_room().
+
+        Args:
+            room_width (float): the room width in m
+            room_height (float): the room height in m
+            visible_polygon (list/ndarray/Polygon): [[x,y],...] from get_visible_polygon()
+            timer (StageTimer): times the fill, text and composite steps
+
+        Returns:
+            img (ndarray): the frame buffer, uint8 about display_size pixel on the longer side
+
+        '''
+
+        import cv2
+
+        scale, offset, size = get_room_layout(room_width, room_height, self.display_size)
+        img = self._get_buffer(size)
+        self._update_static_layer(room_width, room_height, scale, offset, size)
+
+        # plot the visible range
+        if len(visible_polygon):
+            rot_point_pts = self._to_pixels(visible_polygon, scale, offset)
+            with timer.stage('room_renderer.fill'):
+                cv2.fillPoly(img, [rot_point_pts], (255,50,255), cv2.LINE_AA, POINT_SHIFT)
+                cv2.polylines(img, [rot_point_pts], True, (255,50,255), FOOTPRINT_LINE_WIDTH, cv2.LINE_AA, POINT_SHIFT)
+            # print rotation coordinate
+            with timer.stage('room_renderer.text'):
+                self._draw_labels(img, visible_polygon, rot_point_pts)
+
+        # the room coordinates and outline go on top, as in draw_room()
+        with timer.stage('room_renderer.composite'):
+            img.reshape(-1, 3)[self.static_index] = self.static_pixels
+        return img
@@ -0,0 +1,261 @@
+''' find a small set of camera mounts that covers a part of the floor:
+    python set_cover.py ROOM_WIDTH ROOM_HEIGHT [--target 0.95] [--cell-size 0.1] [--no-lazy]
+
+    Candidate mounts are enumerated along the 4 walls, every footprint is stored as a
+    packed bitset over the floor cells and the set cover is solved greedily with AND + popcount.
+'''
+import argparse
+import heapq
+from itertools import product
+
+import numpy as np
+
+from coverage import CoverageGrid
+from coverage import rasterize_convex_polygon
+from fov_checker import HFOV
+from fov_checker import VFOV
+from multi_camera import compute_footprints
+
+## Constants ##
+
+# the GUI camera is on the 'top' (y = room_height) wall
+WALLS = ('top', 'bottom', 'left', 'right')
+
+# default candidate mounts
+POSITION_STEP = 50  # cm along the wall
+FACE_VDEG_VALUES = (30, 45, 60, 75)
+FACE_HDEG_VALUES = tuple(range(0, 181, 15))
+HEIGHT_VALUES = (250,)
+
+DEFAULT_CELL_SIZE = 0.1
+DEFAULT_TARGET = 0.95
+
+# refuse to store more candidate bitsets than this
+MAX_BITSET_BYTES = 256 * 2**20
+
+# popcount of every byte, when np.bitwise_count is missing (numpy < 2.0)
+_POPCOUNT_LUT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+## functions ##
+def _popcount(words):
+    # number of set bits per row of a (n, words) uint64 array
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _POPCOUNT_LUT[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def get_wall_room(room, wall):
+    ''' get the (width, height) of the room seen from a wall, the camera is on its y = height side '''
+    room_width, room_height = room
+    return (room_width, room_height) if wall in ('top', 'bottom') else (room_height, room_width)
+
+
+def to_room_coordinates(polygon, room, wall):
+    ''' map a footprint of get_wall_room() back to the room coordinates of get_room_polygon() '''
+    room_width, room_height = room
+    if wall == 'top':
+        return [[x, y] for x, y in polygon]
+    if wall == 'bottom':
+        return [[room_width - x, room_height - y] for x, y in polygon]
+    if wall == 'left':
+        return [[room_width - y, x] for x, y in polygon]
+    if wall == 'right':
+        return [[y, room_height - x] for x, y in polygon]
+    raise ValueError(f'unknown wall: {wall}, use one of {WALLS}')
+
+
+def enumerate_wall_candidates(room, walls=WALLS, position_step=POSITION_STEP, face_vdeg_values=FACE_VDEG_VALUES,
+                              face_hdeg_values=FACE_HDEG_VALUES, height_values=HEIGHT_VALUES):
+    ''' get the candidate mounts along the walls.
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        walls (tuple): any of WALLS
+        position_step (int): cm between mounts along a wall, CamLoc_W
+        face_vdeg_values (tuple): CamFacVDeg values
+        face_hdeg_values (tuple): CamFacHDeg values, 90 faces straight into the room
+        height_values (tuple): CamLoc_H values in cm
+
+    Returns:
+        candidates (list): [(wall, face_vdeg, face_hdeg, cam_height, cam_width), ...]
+
+    '''
+
+    candidates = []
+    for wall in walls:
+        wall_width = get_wall_room(room, wall)[0]
+        positions = range(0, int(wall_width*100) + 1, position_step)
+        for face_vdeg, face_hdeg, height, width in product(face_vdeg_values, face_hdeg_values, height_values, positions):
+            candidates.append((wall, face_vdeg, face_hdeg, height, width))
+    return candidates
+
+
+def compute_candidate_footprints(room, candidates, fov=(HFOV, VFOV)):
+    ''' get the footprints of wall candidates in room coordinates.
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        candidates (list): from enumerate_wall_candidates()
+        fov (tuple): (HFOV, VFOV) in degree
+
+    Returns:
+        footprints (list): [[[x,y],...], ...] one polygon per candidate
+
+    '''
+
+    footprints = [None] * len(candidates)
+    for wall in WALLS:
+        index = [i for i, c in enumerate(candidates) if c[0] == wall]
+        if not index:
+            continue
+        wall_room = get_wall_room(room, wall)
+        wall_footprints = compute_footprints(wall_room, [candidates[i][1:] for i in index], fov)
+        for i, footprint in zip(index, wall_footprints):
+            footprints[i] = to_room_coordinates(footprint, room, wall)
+    return footprints
+
+
+class FootprintBitsets:
+    ''' footprints as packed bitsets over the floor cells of a CoverageGrid, one row of uint64 per footprint.
+        Bit k of a row is cell k of grid.counts.ravel().
+
+        bitsets = FootprintBitsets(10.0, 10.0, footprints, cell_size=0.1)
+        gains = bitsets.count_new_cells(uncovered)
+
+    '''
+
+    def __init__(self, room_width, room_height, footprints, cell_size=DEFAULT_CELL_SIZE, max_bytes=MAX_BITSET_BYTES):
+        grid = CoverageGrid(room_width, room_height, cell_size, dtype=np.uint8)
+        self.n_rows = grid.n_rows
+        self.n_cols = grid.n_cols
+        self.n_cells = grid.n_rows * grid.n_cols
+        self.n_words = (self.n_cells + 63) // 64
+        n_bytes = len(footprints) * self.n_words * 8
+        if n_bytes > max_bytes:
+            raise ValueError(f'{len(footprints)} bitsets need {n_bytes/2**20:.0f} MiB, more than max_bytes '
+                             f'({max_bytes/2**20:.0f} MiB). Use fewer candidates, a bigger cell_size or raise max_bytes.')
+
+        self.cell_size = cell_size
+        self.words = np.zeros((len(footprints), self.n_words), dtype=np.uint64)
+        mask = np.zeros((self.n_rows, self.n_cols), dtype=bool)
+        for i, footprint in enumerate(footprints):
+            row0, col0, footprint_mask = rasterize_convex_polygon(footprint, cell_size, self.n_rows, self.n_cols)
+            if not footprint_mask.any():
+                continue
+            mask[...] = False
+            mask[row0:row0 + footprint_mask.shape[0], col0:col0 + footprint_mask.shape[1]] = footprint_mask
+            self.words[i] = self.pack(mask)
+        self.n_footprint_cells = _popcount(self.words)
+
+    def pack(self, mask):
+        ''' pack a bool (n_rows, n_cols) mask into n_words uint64 '''
+        packed = np.zeros(self.n_words * 8, dtype=np.uint8)
+        bits = np.packbits(mask.ravel())
+        packed[:len(bits)] = bits
+        return packed.view(np.uint64)
+
+    def unpack(self, words):
+        ''' unpack n_words uint64 into a bool (n_rows, n_cols) mask '''
+        bits = np.unpackbits(np.ascontiguousarray(words).view(np.uint8))[:self.n_cells]
+        return bits.reshape(self.n_rows, self.n_cols).astype(bool)
+
+    def all_cells(self):
+        ''' a bitset with every floor cell set '''
+        return self.pack(np.ones((self.n_rows, self.n_cols), dtype=bool))
+
+    def count_new_cells(self, uncovered, index=None):
+        ''' popcount(footprint & uncovered) of every footprint (or of the footprints in index) '''
+        words = self.words if index is None else self.words[index]
+        return _popcount(words & uncovered)
+
+
+def _greedy(bitsets, uncovered, needed):
+    selected = []
+    covered = 0
+    while covered < needed:
+        gains = bitsets.count_new_cells(uncovered)
+        best = int(np.argmax(gains))
+        if gains[best] == 0:
+            break
+        selected.append(best)
+        covered += int(gains[best])
+        uncovered &= ~bitsets.words[best]
+    return selected, covered
+
+
+def _lazy_greedy(bitsets, uncovered, needed):
+    # gains only go down when more cells are covered, a gain calculated earlier is an upper bound.
+    # pop the best bound, recalculate it, keep it when it is still at least the next bound
+    heap = [(-int(n), i) for i, n in enumerate(bitsets.n_footprint_cells) if n > 0]
+    heapq.heapify(heap)
+    selected = []
+    covered = 0
+    while covered < needed and heap:
+        _, i = heapq.heappop(heap)
+        gain = int(bitsets.count_new_cells(uncovered, [i])[0])
+        if gain == 0:
+            continue
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, i))
+            continue
+        selected.append(i)
+        covered += gain
+        uncovered &= ~bitsets.words[i]
+    return selected, covered
+
+
+def solve_set_cover(room, candidates=None, target=DEFAULT_TARGET, fov=(HFOV, VFOV), cell_size=DEFAULT_CELL_SIZE,
+                    lazy=True, max_bytes=MAX_BITSET_BYTES):
+    ''' pick candidate mounts until target of the floor cells is covered.
+
+    Args:
+        room (tuple): (room_width, room_height) in m
+        candidates (list): from enumerate_wall_candidates(), None for the default candidates
+        target (float): part of the floor cells to cover, 0-1
+        fov (tuple): (HFOV, VFOV) in degree
+        cell_size (float): floor cell size in m
+        lazy (bool): lazy greedy (recalculates only the top of a heap) instead of all gains every step
+        max_bytes (int): memory budget of the candidate bitsets
+
+    Returns:
+        result (dict):
+            'cameras': [(wall, face_vdeg, face_hdeg, cam_height, cam_width), ...] in the order they were picked
+            'footprints': the footprint of each picked camera
+            'coverage_ratio': covered part of the floor cells, 0-1
+            'target_reached' (bool): False when the candidates can not cover target
+
+    '''
+
+    if candidates is None:
+        candidates = enumerate_wall_candidates(room)
+    footprints = compute_candidate_footprints(room, candidates, fov)
+    bitsets = FootprintBitsets(room[0], room[1], footprints, cell_size, max_bytes)
+
+    needed = int(np.ceil(target * bitsets.n_cells))
+    uncovered = bitsets.all_cells()
+    selected, covered = (_lazy_greedy if lazy else _greedy)(bitsets, uncovered, needed)
+    return {
+        'cameras': [candidates[i] for i in selected],
+        'footprints': [footprints[i] for i in selected],
+        'coverage_ratio': covered / bitsets.n_cells,
+        'target_reached': covered >= needed,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='find a small set of camera mounts that covers the floor')
+    parser.add_argument('room_width', type=float, help='m')
+    parser.add_argument('room_height', type=float, help='m')
+    parser.add_argument('--target', type=float, default=DEFAULT_TARGET)
+    parser.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE)
+    parser.add_argument('--hfov', type=float, default=HFOV)
+    parser.add_argument('--vfov', type=float, default=VFOV)
+    parser.add_argument('--no-lazy', action='store_true', help='recalculate every gain in every step')
+    args = parser.parse_args()
+
+    result = solve_set_cover((args.room_width, args.room_height), target=args.target, fov=(args.hfov, args.vfov),
+                             cell_size=args.cell_size, lazy=not args.no_lazy)
+    for camera in result['cameras']:
+        print(camera)
+    print(f"{len(result['cameras'])} cameras cover {result['coverage_ratio']*100:.1f}% of the floor")
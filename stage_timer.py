@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+## Constants ##
+
+# trace events kept in memory, the oldest are dropped first
+TRACE_MAX_EVENTS = 200000
+
+# weight of the newest frame in the smoothed frame time
+FRAME_TIME_SMOOTHING = 0.1
+
+# returned by a disabled timer, nullcontext can be entered again and again
+_NO_STAGE = nullcontext()
+
+
+## functions ##
+class _Stage:
+    # the context manager of one timed stage, ends the stage on exit
+    __slots__ = ('timer', 'name', 'start_ns')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, self.start_ns, time.perf_counter_ns() - self.start_ns)
+        return False
+
+
+class StageTimer:
+    ''' times the stages of the GUI loop, the per stage totals and a timeline that can be saved as a Chrome trace.
+
+        timer = StageTimer()
+        with timer.frame():
+            with timer.stage('clipping'):
+                ...
+        timer.fps, timer.summary()
+        timer.export_chrome_trace('trace.json')   # open in chrome://tracing or ui.perfetto.dev
+
+        A disabled timer (StageTimer(enabled=False) or NULL_TIMER) returns a shared no-op context
+        from stage() / frame() and records nothing.
+
+    '''
+
+    def __init__(self, enabled=True, max_events=TRACE_MAX_EVENTS):
+        self.enabled = enabled
+        # (name, start ns, duration ns, thread id) in the order the stages ended
+        self.events = deque(maxlen=max_events)
+        # name -> [count, total ns, max ns]
+        self.totals = {}
+        # name -> ns spent in the stage during the last whole frame, and during the frame running now
+        self.last_frame = {}
+        self.current_frame = {}
+        self.frame_count = 0
+        # smoothed frame time in ns, 0 before the first frame
+        self.frame_time_ns = 0.0
+        self.origin_ns = time.perf_counter_ns()
+
+    def stage(self, name):
+        ''' context manager timing one stage (they can be nested) '''
+        if not self.enabled:
+            return _NO_STAGE
+        return _Stage(self, name)
+
+    def frame(self):
+        ''' context manager timing one whole frame, updates frame_time_ms / fps '''
+        if not self.enabled:
+            return _NO_STAGE
+        return _Stage(self, 'frame')
+
+    def add(self, name, start_ns, duration_ns):
+        ''' record a stage that ran from start_ns (time.perf_counter_ns()) for duration_ns '''
+        self.events.append((name, start_ns, duration_ns, threading.get_ident()))
+        total = self.totals.get(name)
+        if total is None:
+            self.totals[name] = [1, duration_ns, duration_ns]
+        else:
+            total[0] += 1
+            total[1] += duration_ns
+            total[2] = max(total[2], duration_ns)
+        if name != 'frame':
+            self.current_frame[name] = self.current_frame.get(name, 0) + duration_ns
+        else:
+            self.last_frame, self.current_frame = self.current_frame, {}
+            self.frame_count += 1
+            if self.frame_count == 1:
+                self.frame_time_ns = float(duration_ns)
+            else:
+                self.frame_time_ns += FRAME_TIME_SMOOTHING * (duration_ns - self.frame_time_ns)
+
+    @property
+    def frame_time_ms(self):
+        ''' the smoothed time of a frame in ms '''
+        return self.frame_time_ns / 1e6
+
+    @property
+    def fps(self):
+        ''' frames per second the loop could draw at the smoothed frame time, 0 before the first frame '''
+        return 1e9 / self.frame_time_ns if self.frame_time_ns else 0.0
+
+    def summary(self):
+        ''' get the totals of every stage.
+
+        Returns:
+            summary (dict): name -> {'count', 'total_ms', 'mean_ms', 'max_ms'}, slowest total first
+
+        '''
+
+        summary = {}
+        for name, (count, total_ns, max_ns) in sorted(self.totals.items(), key=lambda item: -item[1][1]):
+            summary[name] = {
+                'count': count,
+                'total_ms': total_ns / 1e6,
+                'mean_ms': total_ns / count / 1e6,
+                'max_ms': max_ns / 1e6,
+            }
+        return summary
+
+    def reset(self):
+        ''' drop the events and the totals '''
+        self.events.clear()
+        self.totals.clear()
+        self.last_frame = {}
+        self.current_frame = {}
+        self.frame_count = 0
+        self.frame_time_ns = 0.0
+        self.origin_ns = time.perf_counter_ns()
+
+    def get_chrome_trace(self):
+        ''' the events in the Chrome trace event format, complete ('X') events in us '''
+        pid = os.getpid()
+        trace_events = [{
+            'name': name,
+            'cat': name.split('.')[0],
+            'ph': 'X',
+            'ts': (start_ns - self.origin_ns) / 1e3,
+            'dur': duration_ns / 1e3,
+            'pid': pid,
+            'tid': tid,
+        } for name, start_ns, duration_ns, tid in self.events]
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms', 'otherData': {'summary': self.summary()}}
+
+    def export_chrome_trace(self, path):
+        ''' write get_chrome_trace() as JSON to path '''
+        with open(path, 'w') as f:
+            json.dump(self.get_chrome_trace(), f)
+
+
+# for code that takes an optional timer
+NULL_TIMER = StageTimer(enabled=False)
@@ -0,0 +1,297 @@
+''' render the FOV checker windows offscreen for every step of a trackbar sweep, to a PNG sequence or a video:
+    python sweep_export.py OUTPUT --sweep CamFacHDeg=0:180:2 [--sweep CamFacVDeg=30:60:10] [--set CamLoc_H=280]
+                           [--room 10x10] [--camera MODEL_ID] [--processes N] [--fps 30]
+
+    OUTPUT is a directory for frame_000000.png, frame_000001.png, ... or a .mp4 / .avi file for cv2.VideoWriter.
+    --sweep NAME=START:STOP[:STEP] steps a trackbar (CamFacVDeg, CamFacHDeg, CamLoc_H, CamLoc_W, Person_H) or the room
+    size (room_width, room_height) from START to STOP included. Several sweeps are nested, the last one moves fastest.
+    The other values are the GUI defaults or --set NAME=VALUE.
+    Every frame is the info panel above the ROOM image, the values of the frame are written next to the room.
+    The frames are rendered in chunks in a process pool and written in sweep order, only a few chunks are held in memory.
+'''
+import argparse
+import itertools
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from fov_checker import H_HFOV
+from fov_checker import H_VFOV
+from info_panel import INFO_PANEL_SHAPE
+from pipeline import FramePipeline
+from pipeline import PIPELINE_INPUTS
+from room_renderer import ROOM_DISPLAY_SIZE
+
+## Constants ##
+
+# trackbar name -> pipeline input
+TRACKBAR_INPUTS = {
+    'CamFacVDeg': 'face_vdeg',
+    'CamFacHDeg': 'face_hdeg',
+    'CamLoc_H': 'height',
+    'CamLoc_W': 'width',
+    'Person_H': 'p_height',
+}
+
+# the values window_init() and the Tk dialog start with, CamLoc_W is the middle of the room when not given
+DEFAULT_INPUTS = {
+    'face_vdeg': 45,
+    'face_hdeg': 90,
+    'height': 250,
+    'p_height': 180,
+    'room_width': 10.0,
+    'room_height': 10.0,
+}
+
+# frames per task
+DEFAULT_CHUNK_SIZE = 8
+# chunks submitted but not written yet, per worker process: the reorder buffer
+IN_FLIGHT_PER_PROCESS = 2
+DEFAULT_FPS = 30
+
+FRAME_FILE_PATTERN = 'frame_{:06d}.png'
+# video file extension -> fourcc
+VIDEO_CODECS = {'.mp4': 'mp4v', '.avi': 'MJPG'}
+
+# the frame: info panel on top, the ROOM image below it on the left and the frame values on its right
+FRAME_SHAPE = (INFO_PANEL_SHAPE[0] + ROOM_DISPLAY_SIZE, INFO_PANEL_SHAPE[1], 3)
+VALUE_TEXT_ORIGIN = (ROOM_DISPLAY_SIZE + 40, INFO_PANEL_SHAPE[0] + 40)
+VALUE_LINE_HEIGHT = 40
+
+# the FramePipeline of a worker process, its stages are reused from one frame to the next
+_worker_pipeline = None
+
+
+## functions ##
+def parse_sweep(text):
+    ''' parse NAME=START:STOP[:STEP] into the pipeline input name and its values, STOP included.
+
+    Args:
+        text (str): e.g. 'CamFacHDeg=0:180:2' or 'room_width=5:10:0.5'
+
+    Returns:
+        name (str): one of PIPELINE_INPUTS
+        values (list): the steps, int when START, STOP and STEP are int
+
+    '''
+
+    name, _, value_range = text.partition('=')
+    name = _get_input_name(name)
+    parts = value_range.split(':')
+    if len(parts) not in (2, 3):
+        raise ValueError(f'expected NAME=START:STOP[:STEP], got {text!r}')
+    numbers = [_parse_number(p) for p in parts]
+    start, stop = numbers[:2]
+    step = numbers[2] if len(numbers) == 3 else 1
+    if step <= 0:
+        raise ValueError(f'the step of {text!r} must be > 0')
+    # counted in steps so a float step does not miss or add the last value
+    n_steps = int(np.floor((stop - start) / step + 1e-9)) + 1
+    if n_steps <= 0:
+        raise ValueError(f'{text!r} has no values')
+    return name, [start + i * step for i in range(n_steps)]
+
+
+def _parse_number(text):
+    text = text.strip()
+    return float(text) if any(c in text for c in '.eE') else int(text)
+
+
+def _get_input_name(name):
+    name = TRACKBAR_INPUTS.get(name.strip(), name.strip())
+    if name not in PIPELINE_INPUTS:
+        raise ValueError(f'unknown sweep parameter: {name}, use one of {list(TRACKBAR_INPUTS) + list(PIPELINE_INPUTS)}')
+    return name
+
+
+def iter_sweep_frames(sweeps, fixed=None):
+    ''' get the pipeline inputs of every frame of the nested sweeps.
+
+    Args:
+        sweeps (list): [(name, values), ...] from parse_sweep(), the last one moves fastest
+        fixed (dict): input name -> value for the inputs that are not swept, on top of DEFAULT_INPUTS
+
+    Yields:
+        inputs (dict): every name of PIPELINE_INPUTS -> value
+
+    '''
+
+    base = dict(DEFAULT_INPUTS, **(fixed or {}))
+    names = [name for name, _ in sweeps]
+    for values in itertools.product(*(values for _, values in sweeps)):
+        inputs = dict(base, **dict(zip(names, values)))
+        if 'width' not in inputs:
+            inputs['width'] = int(inputs['room_width']*100/2)
+        yield inputs
+
+
+def render_frame(pipeline, inputs, frame=None):
+    ''' draw one frame of the sweep offscreen.
+
+    Args:
+        pipeline (FramePipeline): keeps the stages of the previous frame
+        inputs (dict): the values of PIPELINE_INPUTS
+        frame (ndarray): uint8 FRAME_SHAPE buffer to draw into, None for a new array
+
+    Returns:
+        img (ndarray): uint8 FRAME_SHAPE
+
+    '''
+
+    import cv2
+
+    pipeline.update(**inputs)
+    if frame is None:
+        frame = np.zeros(FRAME_SHAPE, np.uint8)
+    else:
+        # the panel is copied over whole, only the room part can keep pixels of the last frame
+        frame[INFO_PANEL_SHAPE[0]:] = 0
+    panel = pipeline.get('text_layer')
+    frame[:panel.shape[0], :panel.shape[1]] = panel
+    room = pipeline.get('room_layer')
+    frame[INFO_PANEL_SHAPE[0]:INFO_PANEL_SHAPE[0] + room.shape[0], :room.shape[1]] = room
+
+    x, y = VALUE_TEXT_ORIGIN
+    names = {name: trackbar for trackbar, name in TRACKBAR_INPUTS.items()}
+    for name in PIPELINE_INPUTS:
+        cv2.putText(frame, f'{names.get(name, name)}: {inputs[name]}', (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255,255,255), 1, cv2.LINE_AA)
+        y += VALUE_LINE_HEIGHT
+    return frame
+
+
+def _render_chunk(task):
+    # runs in a worker process: PNG bytes for a sequence, the raw frames for the video writer
+    global _worker_pipeline
+    import cv2
+    frames, half_hfov, half_vfov, encode_png = task
+    pipeline = _worker_pipeline
+    if pipeline is None or (pipeline.half_hfov, pipeline.half_vfov) != (half_hfov, half_vfov):
+        pipeline = _worker_pipeline = FramePipeline(half_hfov, half_vfov)
+    results = []
+    # a PNG is encoded before the next frame is drawn, one buffer does for the whole chunk
+    buffer = np.zeros(FRAME_SHAPE, np.uint8) if encode_png else None
+    for inputs in frames:
+        frame = render_frame(pipeline, inputs, buffer)
+        if encode_png:
+            ok, png = cv2.imencode('.png', frame)
+            if not ok:
+                raise RuntimeError('PNG encoding failed')
+            frame = png.tobytes()
+        results.append(frame)
+    return results
+
+
+class _FrameWriter:
+    # writes the frames in the order they are given, to a PNG directory or a video file
+    def __init__(self, output, fps):
+        import cv2
+        self.output = output
+        self.count = 0
+        codec = VIDEO_CODECS.get(os.path.splitext(output)[1].lower())
+        self.video = None
+        if codec is None:
+            os.makedirs(output, exist_ok=True)
+        else:
+            height, width = FRAME_SHAPE[:2]
+            self.video = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+            if not self.video.isOpened():
+                raise RuntimeError(f'cv2.VideoWriter can not write {output} with the {codec} codec')
+
+    @property
+    def encode_png(self):
+        return self.video is None
+
+    def write(self, results):
+        for result in results:
+            if self.video is None:
+                with open(os.path.join(self.output, FRAME_FILE_PATTERN.format(self.count)), 'wb') as f:
+                    f.write(result)
+            else:
+                self.video.write(result)
+            self.count += 1
+
+    def close(self):
+        if self.video is not None:
+            self.video.release()
+
+
+def export_sweep(frames, output, half_hfov=H_HFOV, half_vfov=H_VFOV, processes=None, chunk_size=DEFAULT_CHUNK_SIZE, fps=DEFAULT_FPS):
+    ''' render the frames and write them in order.
+
+    Args:
+        frames (iterable): pipeline inputs of every frame, e.g. from iter_sweep_frames()
+        output (str): a directory for a PNG sequence, or a .mp4 / .avi file
+        half_hfov (float): the half of camera horizontal FOV in degree
+        half_vfov (float): the half of camera vertical FOV in degree
+        processes (int): worker processes, None for all cores, 1 to render in this process
+        chunk_size (int): frames per task
+        fps (float): frame rate of the video
+
+    Returns:
+        n_frames (int): number of frames written
+
+    '''
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    writer = _FrameWriter(output, fps)
+    frames = iter(frames)
+    tasks = iter(lambda: list(itertools.islice(frames, chunk_size)), [])
+    tasks = ((chunk, half_hfov, half_vfov, writer.encode_png) for chunk in tasks)
+    try:
+        if processes == 1:
+            for task in tasks:
+                writer.write(_render_chunk(task))
+            return writer.count
+
+        # the reorder buffer: a bounded queue of futures, the oldest is written first, so the frames keep the
+        # sweep order and at most max_in_flight chunks are in memory
+        max_in_flight = processes * IN_FLIGHT_PER_PROCESS
+        in_flight = deque()
+        with ProcessPoolExecutor(processes) as executor:
+            for task in tasks:
+                if len(in_flight) >= max_in_flight:
+                    writer.write(in_flight.popleft().result())
+                in_flight.append(executor.submit(_render_chunk, task))
+            while in_flight:
+                writer.write(in_flight.popleft().result())
+        return writer.count
+    finally:
+        writer.close()
+
+
+def _parse_value(text):
+    name, _, value = text.partition('=')
+    return _get_input_name(name), _parse_number(value)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='render a trackbar sweep of the FOV checker to PNG files or a video')
+    parser.add_argument('output', help='directory for the PNG sequence, or a .mp4 / .avi file')
+    parser.add_argument('--sweep', action='append', required=True, help='NAME=START:STOP[:STEP], can be given more than once')
+    parser.add_argument('--set', action='append', default=[], help='NAME=VALUE for a value that is not swept')
+    parser.add_argument('--room', help='room size WIDTHxHEIGHT in m, default 10x10')
+    parser.add_argument('--camera', help='use the FOV of this camera model of the catalog instead of HFOV / VFOV')
+    parser.add_argument('--catalog', help='the camera catalog file of --camera, default cameras.json')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--fps', type=float, default=DEFAULT_FPS)
+    args = parser.parse_args()
+
+    fixed = dict(_parse_value(text) for text in args.set)
+    if args.room:
+        room_width, _, room_height = args.room.lower().partition('x')
+        fixed.update(room_width=float(room_width), room_height=float(room_height))
+    half_hfov, half_vfov = H_HFOV, H_VFOV
+    if args.camera:
+        from camera_catalog import DEFAULT_CATALOG_FILE
+        from camera_catalog import load_catalog
+        model = load_catalog(args.catalog or DEFAULT_CATALOG_FILE)[args.camera]
+        half_hfov, half_vfov = model.half_hfov, model.half_vfov
+
+    frames = iter_sweep_frames([parse_sweep(text) for text in args.sweep], fixed)
+    n_frames = export_sweep(frames, args.output, half_hfov, half_vfov, args.processes, args.chunk_size, args.fps)
+    print(f'{n_frames} frames written to {args.output}', file=sys.stderr)
@@ -0,0 +1,74 @@
+''' the lookups of a FovAtlas are the results of the functions of fov_checker:
+    python -m pytest tests
+'''
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from atlas import FovAtlas
+from atlas import build_atlas
+from atlas import get_axis_values
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import cal_min_max_distance_with_human_height
+from fov_checker import cal_theorical_min_max_distance
+from fov_checker import compute_footprint
+from polygon import Polygon
+
+ROOM = (10.0, 8.0)
+FACE_VDEG_AXIS = (0, 90, 1)
+FACE_HDEG_AXIS = (0, 180, 30)
+HEIGHT_AXIS = (20, 300, 20)
+WIDTH_AXIS = (0, 1000, 250)
+P_HEIGHT_AXIS = (0, 200, 10)
+
+
+@pytest.fixture(scope='module')
+def atlas(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('atlas'))
+    build_atlas(directory, *ROOM, face_vdeg_axis=FACE_VDEG_AXIS, face_hdeg_axis=FACE_HDEG_AXIS, height_axis=HEIGHT_AXIS,
+                width_axis=WIDTH_AXIS, p_height_axis=P_HEIGHT_AXIS)
+    return FovAtlas(directory)
+
+
+def _area(polygon):
+    return Polygon(polygon).area() if len(polygon) else 0.0
+
+
+def test_distances(atlas):
+    # the same values and types: an exact 0 is the int 0 of cal_theorical_min_max_distance(), so it prints '0 m'
+    for face_vdeg in get_axis_values(FACE_VDEG_AXIS).tolist():
+        for height in get_axis_values(HEIGHT_AXIS).tolist():
+            distances = cal_theorical_min_max_distance(face_vdeg, height, VFOV/2, HFOV/2)
+            assert list(map(repr, atlas.get_distances(face_vdeg, height))) == list(map(repr, distances))
+            for p_height in get_axis_values(P_HEIGHT_AXIS).tolist():
+                person_distances = cal_min_max_distance_with_human_height(
+                    p_height, height, distances[0], distances[1], face_vdeg, VFOV/2, HFOV/2)
+                assert list(map(repr, atlas.get_person_distances(face_vdeg, height, p_height))) == list(map(repr, person_distances))
+
+
+def test_footprints(atlas):
+    for face_vdeg in range(0, 91, 15):
+        for face_hdeg in get_axis_values(FACE_HDEG_AXIS).tolist():
+            for height in (100, 200, 300):
+                for width in get_axis_values(WIDTH_AXIS).tolist():
+                    expected = _area(compute_footprint(ROOM, (face_vdeg, face_hdeg, height, width), (HFOV, VFOV)))
+                    assert _area(atlas.get_footprint(face_vdeg, face_hdeg, height, width)) == pytest.approx(expected, abs=1e-6)
+                    assert atlas.get_footprint_area(face_vdeg, face_hdeg, height, width) == pytest.approx(expected, abs=1e-6)
+
+
+def test_off_grid(atlas):
+    assert atlas.get_distances(45, 250) is None
+    assert atlas.get_distances(45, 0) is None
+    assert atlas.get_person_distances(45, 240, 175) is None
+    assert atlas.get_footprint(45, 45, 240, 500) is None
+    assert atlas.get_footprint_area(45, 90, 240, 1250) is None
+
+
+def test_height_axis_from_zero(tmp_path):
+    # CamLoc_H 0 divides by zero in the person distances
+    with pytest.raises(ValueError):
+        build_atlas(str(tmp_path), *ROOM, height_axis=(0, 300, 10))
@@ -0,0 +1,96 @@
+''' the Sutherland-Hodgman clipping of clipping.py sees the same floor as intersect() + get_visible_range_points_in_room():
+    python -m pytest tests
+'''
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from clipping import clip_convex_polygon
+from clipping import clip_convex_polygon_batch
+from clipping import clip_convex_polygon_by_halfplanes_batch
+from clipping import polygon_signed_area
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import cal_theorical_min_max_distance
+from fov_checker import get_room_polygon
+from fov_checker import get_rotate_polygon
+from fov_checker import get_visible_range_points_in_room
+from fov_checker import intersect
+from polygon import Polygon
+from polygon import previous_vertices
+
+SEED = 0
+N_SETUPS = 300
+# the 'Inf' trapezoids reach MAX_NUM_INF, the intersections with their edges are only this exact
+REL_TOLERANCE = 1e-7
+
+
+def _area(polygon):
+    return Polygon(polygon).area() if len(polygon) else 0.0
+
+
+# random rooms and trackbar values, the same as benchmarks/bench_clipping.py
+def _make_setups(n_setups):
+    rng = random.Random(SEED)
+    setups = []
+    for _ in range(n_setups):
+        room_width = rng.uniform(1.0, 30.0)
+        room_height = rng.uniform(1.0, 30.0)
+        face_vdeg = rng.randint(0, 90)
+        face_hdeg = rng.randint(0, 180)
+        height = rng.randint(150, 300)
+        width = rng.randint(0, int(room_width*100))
+        distances = cal_theorical_min_max_distance(face_vdeg, height, VFOV/2, HFOV/2)
+        rotate_polygon = get_rotate_polygon(width/100, room_height, face_hdeg, height, HFOV/2, *distances)
+        setups.append((rotate_polygon, get_room_polygon(room_width, room_height)))
+    return setups
+
+
+def _halfplanes(polygon):
+    # (a, b, c) of every edge of a convex polygon, a*x + b*y + c >= 0 on the inner (left, anti-clockwise) side
+    points = np.asarray(polygon, dtype=float)
+    if polygon_signed_area(polygon) < 0:
+        points = points[::-1]
+    start = previous_vertices(points)
+    a, b = start[:, 1] - points[:, 1], points[:, 0] - start[:, 0]
+    return np.stack([a, b, -(a * start[:, 0] + b * start[:, 1])], axis=1)
+
+
+@pytest.mark.parametrize('setup', _make_setups(N_SETUPS))
+def test_clip_vs_intersect(setup):
+    rotate_polygon, room_polygon = setup
+    expected = get_visible_range_points_in_room(rotate_polygon, room_polygon, intersect(room_polygon, rotate_polygon))
+    visible_polygon = clip_convex_polygon(rotate_polygon, room_polygon)
+    assert _area(visible_polygon) == pytest.approx(_area(expected), rel=REL_TOLERANCE, abs=1e-6)
+    if visible_polygon:
+        assert polygon_signed_area(visible_polygon) > 0
+
+
+def test_clip_batch():
+    # one room, many footprints: the rows of clip_convex_polygon_batch() are clip_convex_polygon()
+    setups = _make_setups(N_SETUPS)
+    room_polygon = get_room_polygon(10.0, 10.0)
+    rotate_polygons = [rotate_polygon for rotate_polygon, _ in setups]
+    vertices, counts, areas = clip_convex_polygon_batch(rotate_polygons, room_polygon)
+    for rotate_polygon, v, c, area in zip(rotate_polygons, vertices, counts, areas):
+        visible_polygon = clip_convex_polygon(rotate_polygon, room_polygon)
+        np.testing.assert_allclose(v[:c], np.reshape(visible_polygon, (-1, 2)), rtol=1e-12, atol=1e-9)
+        assert area == pytest.approx(_area(visible_polygon), rel=1e-9, abs=1e-9)
+        assert np.isnan(v[c:]).all()
+
+
+def test_clip_by_halfplanes_batch():
+    # the room clipped by the edges of every footprint (the frustum side planes of frustum.py) is the same floor
+    setups = _make_setups(N_SETUPS)
+    room_polygon = get_room_polygon(10.0, 10.0)
+    halfplanes = np.stack([_halfplanes(rotate_polygon) for rotate_polygon, _ in setups])
+    _, counts, areas = clip_convex_polygon_by_halfplanes_batch(room_polygon, halfplanes)
+    for (rotate_polygon, _), count, area in zip(setups, counts, areas):
+        expected = _area(clip_convex_polygon(rotate_polygon, room_polygon))
+        assert area == pytest.approx(expected, rel=REL_TOLERANCE, abs=1e-6)
+        assert (count > 0) == (expected > 0)
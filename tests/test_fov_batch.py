@@ -0,0 +1,90 @@
+''' the batch distances of fov_batch are the same as the scalar functions of fov_checker:
+    python -m pytest tests
+'''
+import os
+import sys
+from math import pi
+from math import tan
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fov_batch import cal_distances_batch
+from fov_batch import cal_min_max_distance_with_human_height_batch
+from fov_batch import cal_theorical_min_max_distance_batch
+from fov_batch import get_tan_tables
+from fov_batch import to_scalar_distance
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import cal_min_max_distance_with_human_height
+from fov_checker import cal_theorical_min_max_distance
+
+SEED = 0
+N_ROWS = 3000
+
+
+def _scalar_distances(face_vdeg, height, p_height, half_vfov, half_hfov):
+    distances = cal_theorical_min_max_distance(face_vdeg, height, half_vfov, half_hfov)
+    return distances + cal_min_max_distance_with_human_height(p_height, height, distances[0], distances[1], face_vdeg, half_vfov, half_hfov)
+
+
+def _assert_same(distances, face_vdeg, height, p_height, half_vfov, half_hfov):
+    rows = np.broadcast_arrays(face_vdeg, height, p_height, half_vfov, half_hfov)
+    for i in np.ndindex(rows[0].shape):
+        row = [r[i].item() for r in rows]
+        assert tuple(to_scalar_distance(d[i]) for d in distances) == _scalar_distances(*row), row
+
+
+# face_vdeg 0-90, height 1-300 and p_height 0-200 are the trackbar ranges, height 0 divides by zero
+def _random_rows(rng, n):
+    return rng.integers(0, 91, n), rng.integers(1, 301, n), rng.integers(0, 201, n)
+
+
+@pytest.mark.parametrize('fov', [(HFOV, VFOV), (60, 34), (120, 90), (45.5, 26.5)])
+def test_random_rows(fov):
+    face_vdeg, height, p_height = _random_rows(np.random.default_rng(SEED), N_ROWS)
+    distances = cal_distances_batch(face_vdeg, height, p_height, fov[1]/2, fov[0]/2)
+    _assert_same(distances, face_vdeg, height, p_height, fov[1]/2, fov[0]/2)
+
+
+def test_float_rows():
+    # not in the tan tables, np.tan is checked against math.tan
+    rng = np.random.default_rng(SEED)
+    face_vdeg, height, p_height = rng.uniform(0, 90, N_ROWS).round(1), rng.uniform(1, 300, N_ROWS).round(1), rng.uniform(0, 200, N_ROWS)
+    distances = cal_distances_batch(face_vdeg, height, p_height, VFOV/2, HFOV/2)
+    _assert_same(distances, face_vdeg, height, p_height, VFOV/2, HFOV/2)
+
+
+# FOV arrays are not in the tan tables, np.tan of 72 degree is not the same as math.tan and
+# its rows near a rounding boundary are calculated again
+@pytest.mark.parametrize('half_hfov', [72.0, 45.0])
+def test_fov_per_row(half_hfov):
+    face_vdeg, height = np.meshgrid(np.arange(91), np.arange(1, 301), indexing='ij')
+    p_height = np.random.default_rng(SEED).integers(0, 201, face_vdeg.shape)
+    half_vfov = np.full(face_vdeg.shape, VFOV/2)
+    half_hfov = np.full(face_vdeg.shape, half_hfov)
+    distances = cal_distances_batch(face_vdeg, height, p_height, half_vfov, half_hfov)
+    _assert_same(distances, face_vdeg, height, p_height, half_vfov, half_hfov)
+
+
+def test_broadcast():
+    face_vdeg, height, p_height = np.arange(0, 91, 5)[:, None, None], np.arange(150, 301, 25)[None, :, None], np.arange(100, 201, 20)
+    distances = cal_distances_batch(face_vdeg, height, p_height, VFOV/2, HFOV/2)
+    assert all(d.shape == (19, 7, 6) for d in distances)
+    _assert_same(distances, face_vdeg, height, p_height, VFOV/2, HFOV/2)
+
+    theorical = cal_theorical_min_max_distance_batch(face_vdeg, height, VFOV/2, HFOV/2)
+    person = cal_min_max_distance_with_human_height_batch(p_height, height, theorical[0], theorical[1], face_vdeg, VFOV/2, HFOV/2)
+    np.testing.assert_array_equal([np.broadcast_to(d, (19, 7, 6)) for d in theorical], distances[:4])
+    np.testing.assert_array_equal(person, distances[4:])
+
+
+def test_tan_tables():
+    tan_max_v, tan_min_v, tan_lower, tan_half_hfov = get_tan_tables(VFOV/2, HFOV/2)
+    for face_vdeg in range(91):
+        assert tan_max_v[face_vdeg] == tan((90 - (face_vdeg - VFOV/2)) * pi / 180)
+        assert tan_min_v[face_vdeg] == tan((90 - (face_vdeg + VFOV/2)) * pi / 180)
+        assert tan_lower[face_vdeg] == tan((VFOV/2 - face_vdeg) * pi / 180)
+    assert tan_half_hfov == tan(HFOV/2 * pi / 180)
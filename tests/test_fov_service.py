@@ -0,0 +1,132 @@
+''' concurrent requests to FovService give the results of batch_cli / process_distance_rows, rows in flight are shared:
+    python -m pytest tests
+'''
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from batch_cli import process_rows
+from fov_service import FovService
+from fov_service import process_distance_rows
+
+DISTANCE_ROW = {'face_vdeg': 45, 'height': 250, 'p_height': 170}
+FOOTPRINT_ROW = {'room_width': 10, 'room_height': 10, 'face_vdeg': 45, 'face_hdeg': 90, 'height': 250, 'width': 500, 'p_height': 170}
+# a window long enough that the concurrent requests of a test arrive while their rows are in flight
+WINDOW_S = 0.05
+# a request waiting for a row that is never calculated fails the test instead of hanging it
+TIMEOUT_S = 10
+
+
+async def _request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(f'{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+async def _post(port, path, payload):
+    return await _request(port, 'POST', path, payload)
+
+
+def _run(test, **kwargs):
+    # a service on any free port, the batches run in a thread
+    async def main():
+        service = FovService(processes=0, window=WINDOW_S, **kwargs)
+        _, port = await service.start('127.0.0.1', 0)
+        try:
+            return await asyncio.wait_for(test(service, port), TIMEOUT_S)
+        finally:
+            await service.close()
+    return asyncio.run(main())
+
+
+def test_concurrent_requests():
+    distance_rows = [dict(DISTANCE_ROW, face_vdeg=face_vdeg, id=f'd{face_vdeg}') for face_vdeg in range(0, 91, 10)]
+    footprint_rows = [dict(FOOTPRINT_ROW, face_hdeg=face_hdeg, id=f'f{face_hdeg}') for face_hdeg in range(0, 181, 20)]
+
+    async def test(service, port):
+        return await asyncio.gather(*[_post(port, '/distances', row) for row in distance_rows],
+                                    *[_post(port, '/footprint', row) for row in footprint_rows],
+                                    _post(port, '/footprint', {'rows': footprint_rows}))
+
+    responses = _run(test)
+    assert all(status == 200 for status, _ in responses)
+    results = [result for _, result in responses]
+    assert results[:len(distance_rows)] == process_distance_rows(distance_rows)
+    assert results[len(distance_rows):-1] == process_rows(footprint_rows)
+    assert results[-1] == process_rows(footprint_rows)
+
+
+def test_in_flight_rows_are_shared():
+    # the same row from many clients and with other ids: one row is calculated, in one batch
+    async def test(service, port):
+        responses = await asyncio.gather(*[_post(port, '/distances', dict(DISTANCE_ROW, id=i)) for i in range(8)])
+        _, health = await _request(port, 'GET', '/health')
+        return responses, health
+
+    responses, health = _run(test)
+    assert [result['id'] for _, result in responses] == list(range(8))
+    assert all(result == dict(responses[0][1], id=i) for i, (_, result) in enumerate(responses))
+    assert health['batches']['/distances'] == {'batches': 1, 'rows': 1}
+    assert health['in_flight'] == 0
+
+
+def test_cached_rows():
+    async def test(service, port):
+        await _post(port, '/footprint', FOOTPRINT_ROW)
+        await _post(port, '/footprint', dict(FOOTPRINT_ROW, id='again'))
+        _, health = await _request(port, 'GET', '/health')
+        return health
+
+    health = _run(test)
+    assert health['batches']['/footprint'] == {'batches': 1, 'rows': 1}
+    assert health['cache']['hits'] == 1
+
+
+def test_bad_rows():
+    rows = [DISTANCE_ROW, {'face_vdeg': 45}, dict(DISTANCE_ROW, height='high'), dict(DISTANCE_ROW, model='unknown'), 3]
+
+    async def test(service, port):
+        return await _post(port, '/distances', rows)
+
+    status, results = _run(test)
+    assert status == 200
+    assert results[0]['error'] == ''
+    assert all(result['error'] for result in results[1:])
+
+
+def test_cancelled_request():
+    # the request calculating a row is cancelled: its key leaves in_flight and the waiting request calculates the row
+    async def test(service, port):
+        first = asyncio.ensure_future(service.calculate('/distances', [DISTANCE_ROW]))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(service.calculate('/distances', [dict(DISTANCE_ROW, id='second')]))
+        await asyncio.sleep(0)
+        assert len(service.in_flight) == 1
+        first.cancel()
+        results = await second
+        return results, service.stats()
+
+    results, health = _run(test)
+    assert results == [dict(process_distance_rows([DISTANCE_ROW])[0], id='second')]
+    assert health['in_flight'] == 0
+
+
+def test_failed_batch():
+    def fail(rows):
+        raise RuntimeError('worker died')
+
+    async def test(service, port):
+        service.batchers['/distances'].func = fail
+        return await asyncio.gather(*[service.calculate('/distances', [DISTANCE_ROW]) for _ in range(2)],
+                                    return_exceptions=True), service.stats()
+
+    results, health = _run(test)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert health['in_flight'] == 0
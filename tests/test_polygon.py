@@ -0,0 +1,79 @@
+''' lists, (N, 2) arrays and Polygon / PolygonBatch give the same polygons and the same results:
+    python -m pytest tests
+'''
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fov_checker import HFOV
+from fov_checker import VFOV
+from fov_checker import _point_in_polygon
+from fov_checker import cal_theorical_min_max_distance
+from fov_checker import compute_footprint
+from fov_checker import get_room_polygon
+from fov_checker import get_rotate_polygon
+from fov_checker import get_visible_range_points_in_room
+from fov_checker import intersect
+from polygon import Polygon
+from polygon import PolygonBatch
+
+ROOM = (10.0, 10.0)
+POLYGONS = [
+    [[0.0, 0.0], [0.0, 10.0], [10.0, 10.0], [10.0, 0.0]],
+    [[1.5, 2.0], [4.0, 2.5], [3.0, 6.0]],
+    [[5.0, 5.0], [7.5, 4.0], [9.0, 6.5], [7.0, 9.0], [4.5, 7.5]],
+]
+
+
+def _rotate_polygon(face_vdeg, face_hdeg):
+    distances = cal_theorical_min_max_distance(face_vdeg, 250, VFOV/2, HFOV/2)
+    return get_rotate_polygon(5.0, ROOM[1], face_hdeg, 250, HFOV/2, *distances)
+
+
+@pytest.mark.parametrize('points', POLYGONS)
+def test_polygon_round_trip(points):
+    polygon = Polygon(points)
+    assert polygon.tolist() == points
+    assert len(polygon) == len(points)
+    assert [p.tolist() for p in polygon] == points
+    # the buffer is shared, not copied
+    assert np.asarray(polygon) is polygon.points
+    assert np.shares_memory(Polygon(polygon.points).points, polygon.points)
+    assert Polygon(np.array(points)).tolist() == points
+
+
+def test_polygon_batch_round_trip():
+    batch = PolygonBatch.from_polygons(POLYGONS)
+    assert batch.tolist() == POLYGONS
+    assert [p.tolist() for p in batch] == POLYGONS
+    assert PolygonBatch.from_polygons([Polygon(p) for p in POLYGONS]).tolist() == POLYGONS
+    np.testing.assert_allclose(batch.areas(), [Polygon(p).area() for p in POLYGONS])
+    for pixels, points in zip(batch.to_pixels(100, 20), POLYGONS):
+        np.testing.assert_array_equal(pixels, Polygon(points).to_pixels(100, 20))
+
+
+@pytest.mark.parametrize('convert', [list, np.array, Polygon])
+def test_same_results(convert):
+    # list, ndarray and Polygon inputs of the trapezoid path
+    room_polygon = get_room_polygon(*ROOM)
+    for face_vdeg, face_hdeg in [(45, 90), (30, 20), (60, 160), (10, 90)]:
+        rotate_polygon = _rotate_polygon(face_vdeg, face_hdeg)
+        expected = get_visible_range_points_in_room(rotate_polygon, room_polygon, intersect(room_polygon, rotate_polygon))
+        intersection = intersect(convert(room_polygon), convert(rotate_polygon))
+        visible_polygon = get_visible_range_points_in_room(convert(rotate_polygon), convert(room_polygon), intersection)
+        assert np.asarray(visible_polygon).tolist() == np.asarray(expected).tolist()
+        for point in [(5.0, 5.0), (0.5, 9.5), (9.9, 0.1), (20.0, 5.0)]:
+            assert _point_in_polygon(point, convert(rotate_polygon)) == _point_in_polygon(point, rotate_polygon)
+
+
+def test_draw_room():
+    pytest.importorskip('cv2')
+    from fov_checker import draw_room
+    visible_polygon = compute_footprint(ROOM, (45, 90, 250, 500), (HFOV, VFOV))
+    expected = draw_room(*ROOM, visible_polygon)
+    np.testing.assert_array_equal(draw_room(*ROOM, np.array(visible_polygon)), expected)
+    np.testing.assert_array_equal(draw_room(*ROOM, Polygon(visible_polygon)), expected)
@@ -0,0 +1,44 @@
+''' wall and corner mounted cameras of a rectangle floorplan see the same floor as compute_footprint():
+    python -m pytest tests
+'''
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fov_checker import compute_footprint
+from polygon import Polygon
+from visibility import Floorplan
+
+ROOM = (10.0, 10.0)
+FOV = (90, 52)
+
+
+def _area(polygon):
+    return Polygon(polygon).area() if len(polygon) else 0.0
+
+
+# heading 0 / 180 looks along the wall, CamLoc_W 0 and the room width are the corners
+@pytest.mark.parametrize('face_hdeg', [0, 45, 90, 135, 180])
+@pytest.mark.parametrize('width', [0, 500, 1000])
+@pytest.mark.parametrize('outer', [[[0,0],[0,10],[10,10],[10,0]], [[0,0],[10,0],[10,10],[0,10]]])
+def test_wall_mounted_camera(outer, width, face_hdeg):
+    floorplan = Floorplan(outer)
+    visible_polygon = floorplan.compute_footprint((width/100, ROOM[1]), (45, face_hdeg, 250), FOV)
+    expected = compute_footprint(ROOM, (45, face_hdeg, 250, width), FOV)
+    assert _area(visible_polygon) == pytest.approx(_area(expected), abs=1e-4)
+
+
+def test_reflex_corner_viewpoint():
+    floorplan = Floorplan([[0,0],[0,10],[6,10],[6,4],[12,4],[12,0]])
+    x, y = floorplan.get_viewpoint((6.0, 4.0))
+    assert x < 6.0 and y < 4.0 and floorplan.contains((x, y))
+    assert floorplan.get_viewpoint((1.0, 1.0)) == (1.0, 1.0)
+
+
+def test_viewpoint_outside():
+    floorplan = Floorplan([[0,0],[0,10],[6,10],[6,4],[12,4],[12,0]])
+    with pytest.raises(ValueError):
+        floorplan.compute_footprint((9.0, 9.0), (45, 90, 250), FOV)
@@ -0,0 +1,257 @@
+from bisect import insort
+from math import cos
+from math import pi
+from math import sin
+
+import numpy as np
+
+from clipping import CLIP_TOLERANCE
+from clipping import clip_convex_polygon
+from fov_cache import LRUCache
+from fov_checker import cal_theorical_min_max_distance
+from fov_checker import get_room_polygon
+from fov_checker import get_rotate_polygon
+
+## Constants ##
+
+# a camera on a wall looks from this far (in m) into the room, away from the walls it touches
+VIEWPOINT_OFFSET = 1e-6
+
+# visibility polygons kept per floorplan, they only depend on the camera position
+VISIBILITY_CACHE_SIZE = 64
+
+
+## functions ##
+def _orientation(ax, ay, bx, by, cx, cy):
+    # > 0 if c is left of a->b
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+def _same_point(p, q):
+    return abs(p[0] - q[0]) <= CLIP_TOLERANCE and abs(p[1] - q[1]) <= CLIP_TOLERANCE
+
+
+class _ActiveSegment:
+    # a wall seen from the viewpoint, ordered front to back. Walls do not cross each other,
+    # so the order of two walls that are both hit by the sweep ray never changes while they are hit
+    __slots__ = ('index', 'ax', 'ay', 'bx', 'by', 'px', 'py')
+
+    def __init__(self, index, ax, ay, bx, by, px, py):
+        self.index = index
+        self.ax, self.ay, self.bx, self.by = ax, ay, bx, by
+        self.px, self.py = px, py
+
+    def __lt__(self, other):
+        # self is in front of other when both ends of self are on the viewpoint side of other,
+        # or when self straddles the line of other and other is behind self
+        op = _orientation(other.ax, other.ay, other.bx, other.by, self.px, self.py)
+        o1 = _orientation(other.ax, other.ay, other.bx, other.by, self.ax, self.ay) * op
+        o2 = _orientation(other.ax, other.ay, other.bx, other.by, self.bx, self.by) * op
+        if o1 >= 0 and o2 >= 0:
+            return True
+        if o1 <= 0 and o2 <= 0:
+            return False
+        op = _orientation(self.ax, self.ay, self.bx, self.by, self.px, self.py)
+        o3 = _orientation(self.ax, self.ay, self.bx, self.by, other.ax, other.ay) * op
+        o4 = _orientation(self.ax, self.ay, self.bx, self.by, other.bx, other.by) * op
+        return o3 <= 0 and o4 <= 0
+
+    def hit(self, angle):
+        # the point of the segment on the ray from the viewpoint at angle
+        dx, dy = cos(angle), sin(angle)
+        ex, ey = self.bx - self.ax, self.by - self.ay
+        denominator = dx * ey - dy * ex
+        if denominator == 0:
+            # the ray runs along the segment, the near end is what is seen
+            if (self.ax - self.px) ** 2 + (self.ay - self.py) ** 2 <= (self.bx - self.px) ** 2 + (self.by - self.py) ** 2:
+                return (self.ax, self.ay)
+            return (self.bx, self.by)
+        t = ((self.ax - self.px) * ey - (self.ay - self.py) * ex) / denominator
+        return (self.px + t * dx, self.py + t * dy)
+
+
+def get_visibility_polygon(viewpoint, segments):
+    ''' get the region seen from viewpoint with an angular sweep, O(n log n) for n walls.
+        The events (wall ends) are sorted by angle once, the walls hit by the sweep ray are kept
+        in a list sorted front to back (bisect insort), the front wall is what is seen.
+
+    Args:
+        viewpoint (tuple): (x, y) in m, strictly inside the free space
+        segments (ndarray): (n, 2, 2) walls that do not cross each other (they may share ends)
+
+    Returns:
+        visibility_polygon (list): [[x,y],...] anti-clockwise (y axis up), star shaped around viewpoint
+
+    '''
+
+    px, py = float(viewpoint[0]), float(viewpoint[1])
+    segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+    a = segments[:, 0] - (px, py)
+    b = segments[:, 1] - (px, py)
+    # start every wall at its clockwise end, drop the ones seen edge on
+    cross = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+    keep = cross != 0
+    swap = cross < 0
+    starts = np.where(swap[:, None], segments[:, 1], segments[:, 0])[keep]
+    ends = np.where(swap[:, None], segments[:, 0], segments[:, 1])[keep]
+    start_angles = np.arctan2(starts[:, 1] - py, starts[:, 0] - px) % (2 * pi)
+    end_angles = np.arctan2(ends[:, 1] - py, ends[:, 0] - px) % (2 * pi)
+
+    walls = [_ActiveSegment(i, sx, sy, ex, ey, px, py) for i, ((sx, sy), (ex, ey)) in enumerate(zip(starts.tolist(), ends.tolist()))]
+    # the walls crossing the first ray (angle 0) are hit before any event
+    active = sorted(wall for wall, s, e in zip(walls, start_angles, end_angles) if s > e)
+    is_active = {wall.index for wall in active}
+
+    # (angle, 0 for end / 1 for start, wall index), ends first so a corner is left before the next wall is entered
+    events = sorted([(float(e), 0, i) for i, e in enumerate(end_angles)] + [(float(s), 1, i) for i, s in enumerate(start_angles)])
+
+    polygon = []
+    n_events = len(events)
+    k = 0
+    while k < n_events:
+        angle = events[k][0]
+        front = active[0] if active else None
+        while k < n_events and events[k][0] == angle:
+            _, is_start, i = events[k]
+            wall = walls[i]
+            if is_start:
+                if i not in is_active:
+                    insort(active, wall)
+                    is_active.add(i)
+            elif i in is_active:
+                active.remove(wall)
+                is_active.discard(i)
+            k += 1
+        new_front = active[0] if active else None
+        if new_front is not front:
+            for wall in (front, new_front):
+                if wall is None:
+                    continue
+                point = wall.hit(angle)
+                if not polygon or not _same_point(polygon[-1], point):
+                    polygon.append(point)
+
+    if len(polygon) > 1 and _same_point(polygon[0], polygon[-1]):
+        polygon.pop()
+    return [[x, y] for x, y in polygon]
+
+
+def _polygon_segments(polygon):
+    points = np.asarray(polygon, dtype=float)
+    return np.stack([np.roll(points, 1, axis=0), points], axis=1)
+
+
+def _signed_area(polygon):
+    x, y = np.asarray(polygon, dtype=float).T
+    return 0.5 * float(np.sum(np.roll(x, 1) * y - x * np.roll(y, 1)))
+
+
+def _inward_normals(segments, free_left):
+    # unit normals of the walls pointing into the free space, left of a->b when free_left
+    direction = segments[:, 1] - segments[:, 0]
+    normals = np.stack([-direction[:, 1], direction[:, 0]], axis=1)
+    normals /= np.hypot(normals[:, 0], normals[:, 1])[:, None]
+    return normals if free_left else -normals
+
+
+def _contains_point(polygon, point):
+    # even-odd rule, works for concave polygons
+    points = np.asarray(polygon, dtype=float)
+    x, y = point
+    x1, y1 = np.roll(points, 1, axis=0).T
+    x2, y2 = points.T
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(crosses & (x < x_cross)) % 2)
+
+
+class Floorplan:
+    ''' a concave room with obstacles (pillars, shelving) that block the view.
+
+        floorplan = Floorplan([[0,0],[0,10],[6,10],[6,4],[12,4],[12,0]], obstacles=[[[2,2],[2,3],[3,3],[3,2]]])
+        visible_polygon = floorplan.compute_footprint((3.0, 10.0), (45, 90, 250), (90, 52))
+
+    '''
+
+    def __init__(self, outer, obstacles=()):
+        ''' Args:
+            outer (list): [[x,y],...] room boundary in m, any vertex order
+            obstacles (list): [[[x,y],...], ...] polygons inside the room, walls must not cross
+        '''
+
+        self.outer = [[float(x), float(y)] for x, y in outer]
+        self.obstacles = [[[float(x), float(y)] for x, y in obstacle] for obstacle in obstacles]
+        self.segments = np.concatenate([_polygon_segments(p) for p in [self.outer] + self.obstacles])
+        # the free space is inside the outer boundary and outside the obstacles
+        self.normals = np.concatenate([_inward_normals(_polygon_segments(self.outer), _signed_area(self.outer) > 0)] +
+                                      [_inward_normals(_polygon_segments(o), _signed_area(o) < 0) for o in self.obstacles])
+        self.visibility_cache = LRUCache(VISIBILITY_CACHE_SIZE)
+
+    @classmethod
+    def from_room(cls, room_width, room_height, obstacles=()):
+        ''' the rectangle of get_room_polygon() with obstacles '''
+        return cls(get_room_polygon(room_width, room_height), obstacles)
+
+    def contains(self, point):
+        ''' True if point is inside the room and outside every obstacle '''
+        return _contains_point(self.outer, point) and not any(_contains_point(o, point) for o in self.obstacles)
+
+    def get_viewpoint(self, camera_pos):
+        ''' the point the camera at camera_pos looks from: camera_pos itself in the free space,
+            or VIEWPOINT_OFFSET along the inward normals of the walls it is on (both walls in a corner)
+        '''
+
+        px, py = float(camera_pos[0]), float(camera_pos[1])
+        a, b = self.segments[:, 0], self.segments[:, 1]
+        ab = b - a
+        t = np.clip(((px - a[:, 0]) * ab[:, 0] + (py - a[:, 1]) * ab[:, 1]) / np.sum(ab * ab, axis=1), 0, 1)
+        distance = np.hypot(a[:, 0] + t * ab[:, 0] - px, a[:, 1] + t * ab[:, 1] - py)
+        on_wall = distance <= CLIP_TOLERANCE
+        if not np.any(on_wall):
+            return (px, py)
+        normal = self.normals[on_wall].sum(axis=0)
+        length = float(np.hypot(normal[0], normal[1]))
+        if length == 0:
+            # on both sides of a zero width wall, there is no free space to look from
+            raise ValueError(f'viewpoint {(px, py)} is not inside the floorplan')
+        return (px + VIEWPOINT_OFFSET * float(normal[0]) / length, py + VIEWPOINT_OFFSET * float(normal[1]) / length)
+
+    def get_visibility_polygon(self, viewpoint):
+        ''' get_visibility_polygon() of the floorplan walls, cached per viewpoint '''
+        key = (float(viewpoint[0]), float(viewpoint[1]))
+        polygon = self.visibility_cache.get(key)
+        if polygon is None:
+            if not self.contains(key):
+                raise ValueError(f'viewpoint {key} is not inside the floorplan')
+            polygon = get_visibility_polygon(key, self.segments)
+            self.visibility_cache.put(key, polygon)
+        return polygon
+
+    def compute_footprint(self, camera_pos, camera, fov):
+        ''' the floor range seen by a camera, the FOV trapezoid clipped by what the walls let it see.
+
+        Args:
+            camera_pos (tuple): (x, y) of the camera in m, usually on a wall
+            camera (tuple): (face_vdeg, face_hdeg, cam_height) degree, degree, cm.
+                            face_hdeg as in the GUI: 90 looks to -y, 0 to -x, 180 to +x
+            fov (tuple): (HFOV, VFOV) in degree
+
+        Returns:
+            visible_polygon (list): [[x,y],...] in m, [] if nothing is visible.
+                                    Parts split by an obstacle are joined by zero width edges.
+
+        '''
+
+        face_vdeg, face_hdeg, height = camera
+        h_fov, v_fov = fov
+        cam_x_pos, cam_y_pos = camera_pos
+
+        distances = cal_theorical_min_max_distance(face_vdeg, height, v_fov/2, h_fov/2)
+        rotate_polygon = get_rotate_polygon(cam_x_pos, cam_y_pos, face_hdeg, height, h_fov/2, *distances)
+
+        # look from just off the wall the camera hangs on, whatever way it faces
+        visibility_polygon = self.get_visibility_polygon(self.get_viewpoint(camera_pos))
+
+        # the trapezoid is convex, the visibility polygon (star shaped) is clipped by it
+        return clip_convex_polygon(visibility_polygon, rotate_polygon)